@@ -1,19 +1,31 @@
+import asyncio
 import logging
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
-import aiohttp
-import feedparser
+from typing import List, Dict, Any, Optional, Tuple
 from pydantic import Field
 from base_agent import BaseAgent
-from data_models import NewsItem
+from data_models import NewsItem, validate_news_items
+from tools.fetcher import FeedFetcher, FetchResult
+from tools.feed_cache import FeedCache
+from tools.feed_parsing import FeedParseError, FeedParserPool, StreamingFeedParser, parse_feed
+from tools.seen_store import SeenStore
+from tools.work_queue import Job, NewsSink, WorkQueue
 
 class CollectorAgent(BaseAgent):
     """
     Агент для сбора данных из RSS-лент.
+    В режиме воркера (run_worker) агент служит шаблоном: ленты берутся из общей
+    очереди заданий, а собранные новости складываются в общий приёмник.
     """
+    name: str = "CollectorAgent"
     region: str = Field(..., description="Регион, для которого собираются новости")
     source_urls: List[str] = Field(..., description="Список URL-источников")
     days_ago: int = Field(default=0, description="Количество дней назад, за которые нужно собрать данные")
+    fetcher: Optional[FeedFetcher] = Field(default=None, description="Общий движок загрузки лент; если не задан, создаётся на время вызова process")
+    feed_cache: Optional[FeedCache] = Field(default=None, description="Кеш лент для условных GET-запросов (ETag/Last-Modified)")
+    parser_pool: Optional[FeedParserPool] = Field(default=None, description="Пул процессов для разбора лент; если не задан, разбор идёт в событийном цикле")
+    seen_store: Optional[SeenStore] = Field(default=None, description="Индекс уже обработанных новостей; если задан, возвращаются только новые")
+    streaming: bool = Field(default=False, description="Разбирать ленты потоком и прекращать чтение на записях старше окна дат (для больших архивных лент)")
 
     @property
     def start_date(self) -> datetime:
@@ -26,48 +38,203 @@ class CollectorAgent(BaseAgent):
     async def process(self) -> List[NewsItem]:
         """
         Основной метод обработки данных.
+        Все ленты агента загружаются параллельно через общий FeedFetcher.
         :return: Список объектов NewsItem.
         """
         await self.log("Starting news collection...")
-        all_items = []
-        for url in self.source_urls:
-            items = await self.tool_fetch_rss(url)
-            all_items.extend(items)
+        own_fetcher = self.fetcher is None
+        fetcher = FeedFetcher() if own_fetcher else self.fetcher
+        try:
+            results = await asyncio.gather(*(self.tool_fetch_rss(url, fetcher) for url in self.source_urls))
+        finally:
+            if own_fetcher:
+                await fetcher.close()
 
+        all_items = [item for items in results for item in items]
         await self.log(f"Collected {len(all_items)} news items.")
-        # Преобразование словарей в объекты NewsItem
-        news_items = [NewsItem(**item) for item in all_items]
+        # Преобразование словарей в объекты NewsItem одним пакетом
+        news_items, errors = validate_news_items(all_items)
+        for record, error in errors:
+            await self.log(f"Skipping invalid news item {record.get('url')}: {error.error_count()} validation error(s)", level="WARNING")
+        if self.seen_store:
+            collected = len(news_items)
+            news_items = await asyncio.to_thread(self.seen_store.filter_unseen, news_items)
+            await self.log(f"Skipped {collected - len(news_items)} already processed news items.")
         return news_items
 
-    async def tool_fetch_rss(self, url: str) -> List[Dict[str, Any]]:
+    def for_source(self, source: Dict[str, Any]) -> "CollectorAgent":
+        """
+        Копия агента для одного источника в формате RSS_SOURCES (общие ресурсы переиспользуются).
+        """
+        return self.model_copy(update={
+            "region": source["region"],
+            "source_urls": [source["url"]],
+            "days_ago": source.get("days_ago", 0),
+            "streaming": source.get("streaming", self.streaming),
+        })
+
+    async def run_worker(
+        self,
+        queue: WorkQueue,
+        sink: NewsSink,
+        worker_id: str,
+        lease_seconds: float = 60.0,
+        poll_interval: float = 1.0,
+        exit_when_idle: bool = True,
+        stop: Optional[asyncio.Event] = None,
+    ) -> int:
+        """
+        Режим воркера: захватывает задания (источники в формате RSS_SOURCES) из очереди,
+        продлевает аренду, пока лента собирается, и складывает новости в приёмник.
+        Доставка «хотя бы один раз»: новости попадают в приёмник до отметки о выполнении,
+        поэтому после сбоя возможны повторы, которые отсекают дедупликация и SeenStore.
+
+        :param queue: Очередь заданий.
+        :param sink: Приёмник собранных новостей.
+        :param worker_id: Идентификатор воркера (для отладки владельца аренды).
+        :param lease_seconds: Срок аренды задания; пульс отправляется каждую треть срока.
+        :param poll_interval: Пауза между опросами пустой очереди.
+        :param exit_when_idle: Завершиться, когда в очереди нет ни ожидающих, ни выполняющихся заданий.
+        :param stop: Событие мягкой остановки: текущее задание дорабатывается, новые не берутся.
+        :return: Количество выполненных заданий.
+        """
+        completed = 0
+        while stop is None or not stop.is_set():
+            job = await asyncio.to_thread(queue.claim, worker_id, lease_seconds)
+            if job is None:
+                if exit_when_idle and await asyncio.to_thread(queue.is_idle):
+                    break
+                await asyncio.sleep(poll_interval)
+                continue
+            if await self._run_job(queue, sink, job, lease_seconds):
+                completed += 1
+        return completed
+
+    async def _run_job(self, queue: WorkQueue, sink: NewsSink, job: Job, lease_seconds: float) -> bool:
+        """
+        Выполняет одно задание под арендой.
+
+        :return: True, если задание выполнено и отмечено в очереди.
+        """
+        collect = asyncio.ensure_future(self.for_source(job.payload).process())
+        lost = False
+        while not collect.done():
+            await asyncio.wait([collect], timeout=lease_seconds / 3)
+            if not collect.done() and not await asyncio.to_thread(queue.heartbeat, job, lease_seconds):
+                # Аренда истекла и задание отдано другому воркеру: результат больше не нужен
+                lost = True
+                collect.cancel()
+                await asyncio.gather(collect, return_exceptions=True)
+        if lost:
+            await self.log(f"Lease lost for {job.key}, job abandoned.", level="WARNING")
+            return False
+        try:
+            items = collect.result()
+            await asyncio.to_thread(sink.put, items)
+        except Exception as e:
+            await self.log(f"Job {job.key} failed (attempt {job.attempts}): {e}", level="WARNING")
+            await asyncio.to_thread(queue.fail, job, str(e))
+            return False
+        if not await asyncio.to_thread(queue.complete, job):
+            await self.log(f"Lease lost for {job.key} after collecting {len(items)} items.", level="WARNING")
+            return False
+        await self.log(f"Job {job.key} done: {len(items)} items.")
+        return True
+
+    async def _stream_feed(
+        self, url: str, fetcher: FeedFetcher, headers: Optional[Dict[str, str]]
+    ) -> Tuple[FetchResult, Optional[Dict[str, Any]]]:
+        """
+        Загружает и разбирает ленту потоком, прекращая чтение на записях старше start_date.
+
+        :return: Результат загрузки и лента в формате parse_feed; None, если ответ 304,
+            загрузка не удалась или лента некорректна (тогда её разбирает feedparser).
+        """
+        parser = StreamingFeedParser(since=self.start_date)
+        entries: List[Dict[str, Any]] = []
+        malformed = False
+
+        async def consume(chunks) -> None:
+            nonlocal malformed
+            try:
+                async for entry in parser.entries(chunks):
+                    entries.append(entry)
+            except FeedParseError as e:
+                malformed = True
+                await self.log(f"Malformed feed {url} ({e}), falling back to feedparser.", level="WARNING")
+
+        result = await fetcher.fetch_stream(url, consume, headers=headers)
+        if not result.ok or result.status == 304 or malformed:
+            return result, None
+        await self.log(
+            f"Streamed {parser.bytes_read} bytes and {parser.entries_seen} entries from {url}"
+            + (" (stopped at the date window)" if parser.stopped_early else ""),
+            level="DEBUG",
+        )
+        return result, {"title": parser.title, "entries": entries}
+
+    async def tool_fetch_rss(self, url: str, fetcher: Optional[FeedFetcher] = None) -> List[Dict[str, Any]]:
         """
         Загружает RSS-ленту, обрабатывает и возвращает список новостей.
         :param url: URL RSS-ленты.
+        :param fetcher: Движок загрузки; по умолчанию используется self.fetcher.
         :return: Список новостей в виде словарей.
         """
-        headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers) as response:
-                    response.raise_for_status()
-                    content = await response.read()
-                    feed = feedparser.parse(content)
-        except Exception as e:
-            await self.log(f"Error fetching RSS feed from {url}: {e}", level="WARNING")
+        fetcher = fetcher or self.fetcher
+        if fetcher is None:
+            async with FeedFetcher() as fetcher:
+                return await self.tool_fetch_rss(url, fetcher)
+
+        headers = self.feed_cache.conditional_headers(url) if self.feed_cache else None
+        if self.streaming:
+            result, feed = await self._stream_feed(url, fetcher, headers)
+        else:
+            result, feed = await fetcher.fetch(url, headers=headers), None
+        if not result.ok:
+            await self.log(f"Error fetching RSS feed from {url}: {result.error}", level="WARNING")
             return []
+        await self.log(f"Fetched {url} in {result.elapsed:.2f}s (HTTP {result.status})", level="DEBUG")
+
+        if result.status == 304 and self.feed_cache:
+            cached = self.feed_cache.get(url)
+            if cached:
+                self.feed_cache.hits += 1
+                feed = cached["feed"]
+        elif feed is not None and self.feed_cache:
+            self.feed_cache.misses += 1
+            self.feed_cache.put(url, result.headers, feed)
+        if feed is None:
+            if result.status == 304 or self.streaming:
+                # Кеш пропал между запросом и ответом или лента некорректна для потокового разбора:
+                # загружаем её целиком для feedparser
+                result = await fetcher.fetch(url)
+                if not result.ok:
+                    await self.log(f"Error fetching RSS feed from {url}: {result.error}", level="WARNING")
+                    return []
+            try:
+                if self.parser_pool:
+                    feed = await self.parser_pool.parse(result.content)
+                else:
+                    feed = parse_feed(result.content)
+            except Exception as e:
+                await self.log(f"Error parsing RSS feed from {url}: {e}", level="WARNING")
+                return []
+            if self.feed_cache:
+                self.feed_cache.misses += 1
+                self.feed_cache.put(url, result.headers, feed)
 
         items = []
-        for entry in feed.entries:
+        for entry in feed["entries"]:
             try:
-                published_date = datetime(*entry.published_parsed[:6])
+                published_date = datetime(*entry["published"][:6])
                 if self.start_date <= published_date <= self.end_date:
                     items.append({
-                        "source": feed.feed.title,
-                        "title": entry.title,
-                        "description": entry.summary,
+                        "source": feed["title"],
+                        "title": entry["title"],
+                        "description": entry["summary"],
                         "date": published_date,
                         "region": self.region,
-                        "url": entry.link,
+                        "url": entry["link"],
                         "tags": [],
                         "category": None,
                         "language": None,
@@ -0,0 +1,49 @@
+import asyncio
+import time
+from typing import Any, List
+from pydantic import Field, PrivateAttr
+from base_agent import BaseAgent
+from data_models import NewsItem
+from tools.compression import TextCompressor
+from tools.metrics import METRICS
+
+
+class CompressorAgent(BaseAgent):
+    """
+    Агент локального сжатия описаний новостей перед ManagerAgent.
+    Убирает HTML и типовые хвосты RSS и оставляет самые информативные предложения
+    в пределах лимита токенов на новость, сокращая промпты и время ответа LLM.
+    """
+    max_tokens: int = Field(default=80, description="Лимит токенов описания одной новости")
+    prompt_tokens_per_second: float = Field(default=1000.0, description="Оценка скорости обработки входных токенов моделью")
+    _compressor: TextCompressor = PrivateAttr()
+
+    def __init__(self, **data: Any):
+        super().__init__(name="CompressorAgent", **data)
+        self._compressor = TextCompressor(max_tokens=self.max_tokens)
+
+    async def process(self, news_list: List[NewsItem]) -> List[NewsItem]:
+        """
+        Заменяет описания новостей сжатыми.
+
+        :param news_list: Список новостей.
+        :return: Список новостей со сжатыми описаниями в исходном порядке.
+        """
+        if not news_list:
+            return news_list
+        descriptions = [item.description for item in news_list]
+        started = time.perf_counter()
+        compressed = await asyncio.to_thread(
+            self._compressor.compress, descriptions, [item.title for item in news_list]
+        )
+        stats = self._compressor.stats(descriptions, compressed, time.perf_counter() - started)
+        saved = (stats.tokens_in - stats.tokens_out) / self.prompt_tokens_per_second - stats.seconds
+        METRICS.record_compression(self.name, stats.tokens_in, stats.tokens_out, stats.seconds, saved)
+        await self.log(
+            f"Compressed {len(news_list)} descriptions: {stats.tokens_in} -> {stats.tokens_out} tokens "
+            f"(ratio {stats.ratio:.2f}) in {stats.seconds * 1000:.1f} ms, estimated LLM time saved {saved:.2f}s."
+        )
+        return [
+            item.model_copy(update={"description": description})
+            for item, description in zip(news_list, compressed)
+        ]
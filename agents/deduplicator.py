@@ -0,0 +1,146 @@
+import asyncio
+from typing import Any, List, Optional
+import numpy as np
+from pydantic import Field, PrivateAttr
+from base_agent import BaseAgent
+from data_models import NewsItem, merge_related
+from tools.embeddings import Embedder
+from tools.minhash import MinHashLSH, near_duplicate_groups
+
+class DeduplicatorAgent(BaseAgent):
+    """
+    Агент для локального удаления дубликатов перед ManagerAgent.
+    Сначала дешёвый проход MinHash/LSH схлопывает перепечатки агентских новостей,
+    затем оставшиеся новости кодируются эмбеддингами и кластеризуются.
+    На каждый кластер остаётся один представитель с источниками остальных участников.
+    Конвейер передаёт новости пачками, поэтому представители запоминаются до вызова reset():
+    перепечатки уже пропущенных дальше новостей из следующих пачек отбрасываются.
+    """
+    minhash_threshold: float = Field(default=0.6, description="Минимальная оценка Жаккара для признания новостей перепечатками")
+    minhash_num_perm: int = Field(default=128, description="Количество хеш-функций MinHash")
+    minhash_bands: Optional[int] = Field(default=None, description="Количество LSH-полос; по умолчанию подбирается по порогу")
+    use_embeddings: bool = Field(default=True, description="Выполнять ли семантическую кластеризацию после MinHash")
+    similarity_threshold: float = Field(default=0.85, description="Минимальное косинусное сходство для признания новостей дубликатами")
+    min_cluster_size: int = Field(default=2, description="Минимальный размер кластера HDBSCAN")
+    _embedder: Embedder = PrivateAttr()
+    _seen_index: MinHashLSH = PrivateAttr()
+    _seen_vectors: Optional[np.ndarray] = PrivateAttr(default=None)
+
+    def __init__(self, embedder: Embedder = None, **data: Any):
+        super().__init__(name="DeduplicatorAgent", **data)
+        self._embedder = embedder or Embedder()
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Забывает представителей, пропущенных в предыдущих пачках (вызывается перед каждым прогоном).
+        """
+        self._seen_index = MinHashLSH(
+            threshold=self.minhash_threshold, num_perm=self.minhash_num_perm, bands=self.minhash_bands
+        )
+        self._seen_vectors = None
+
+    async def process(self, news_list: List[NewsItem]) -> List[NewsItem]:
+        """
+        Удаляет дубликаты из списка новостей.
+
+        :param news_list: Список новостей.
+        :return: Список представителей кластеров в исходном порядке.
+        """
+        if not news_list:
+            return news_list
+
+        texts = [f"{item.title}. {item.description}" for item in news_list]
+        groups = await asyncio.to_thread(
+            near_duplicate_groups,
+            texts,
+            threshold=self.minhash_threshold,
+            num_perm=self.minhash_num_perm,
+            bands=self.minhash_bands,
+        )
+        result = await asyncio.to_thread(self._drop_seen_texts, self._merge(news_list, groups))
+        await self.log(f"MinHash collapsed {len(news_list)} news items to {len(result)}.")
+
+        if self.use_embeddings and result:
+            texts = [f"{item.title}. {item.description}" for item in result]
+            vectors = await asyncio.to_thread(self._embedder.encode, texts)
+            clusters = sorted(await asyncio.to_thread(self._cluster, vectors), key=min)
+            representatives = vectors[[members[0] for members in clusters]]
+            result = self._drop_seen_vectors(self._merge(result, clusters), representatives)
+
+        await self.log(f"Reduced {len(news_list)} news items to {len(result)} after deduplication.")
+        return result
+
+    def _merge(self, news_list: List[NewsItem], clusters: List[List[int]]) -> List[NewsItem]:
+        """
+        Оставляет по одному представителю на кластер.
+
+        :param news_list: Список новостей.
+        :param clusters: Кластеры индексов; первый индекс — представитель.
+        :return: Представители кластеров в порядке первого появления.
+        """
+        result = []
+        for members in sorted(clusters, key=min):
+            result.append(merge_related(news_list[members[0]], [news_list[i] for i in members[1:]]))
+        return result
+
+    def _drop_seen_texts(self, news_list: List[NewsItem]) -> List[NewsItem]:
+        """
+        Отбрасывает перепечатки представителей предыдущих пачек и запоминает оставшиеся новости.
+        """
+        result = []
+        for item in news_list:
+            text = f"{item.title}. {item.description}"
+            if not self._seen_index.query(text):
+                self._seen_index.add(text)
+                result.append(item)
+        return result
+
+    def _drop_seen_vectors(self, news_list: List[NewsItem], vectors: np.ndarray) -> List[NewsItem]:
+        """
+        Отбрасывает новости, близкие к представителям предыдущих пачек, и запоминает эмбеддинги оставшихся.
+
+        :param news_list: Представители кластеров текущей пачки.
+        :param vectors: Их нормализованные эмбеддинги в том же порядке.
+        :return: Новости, не встречавшиеся в предыдущих пачках.
+        """
+        keep = np.ones(len(news_list), dtype=bool)
+        if self._seen_vectors is not None and len(self._seen_vectors):
+            keep = (vectors @ self._seen_vectors.T).max(axis=1) < self.similarity_threshold
+        kept = vectors[keep]
+        self._seen_vectors = kept if self._seen_vectors is None else np.vstack([self._seen_vectors, kept])
+        return [item for item, fresh in zip(news_list, keep) if fresh]
+
+    def _cluster(self, vectors: np.ndarray) -> List[List[int]]:
+        """
+        Группирует индексы новостей в кластеры дубликатов.
+        Первый индекс каждого кластера — его представитель (медоид).
+
+        :param vectors: Нормализованные эмбеддинги.
+        :return: Список кластеров, каждый — список индексов.
+        """
+        import hdbscan
+
+        n = len(vectors)
+        if n < self.min_cluster_size:
+            return [[i] for i in range(n)]
+
+        # Для нормализованных векторов евклидово расстояние выражается через косинусное сходство
+        epsilon = float(np.sqrt(max(0.0, 2.0 - 2.0 * self.similarity_threshold)))
+        labels = hdbscan.HDBSCAN(
+            min_cluster_size=self.min_cluster_size,
+            min_samples=1,
+            cluster_selection_epsilon=epsilon,
+            allow_single_cluster=True,
+        ).fit_predict(vectors.astype(np.float64))
+
+        clusters = [[i] for i in np.flatnonzero(labels == -1)]
+        for label in set(labels.tolist()) - {-1}:
+            members = np.flatnonzero(labels == label)
+            similarity = vectors[members] @ vectors[members].T
+            medoid = members[int(similarity.sum(axis=1).argmax())]
+            # HDBSCAN объединяет близкие темы; дубликатами считаем только близких к медоиду
+            close = vectors[members] @ vectors[medoid] >= self.similarity_threshold
+            clusters.append([int(medoid)] + [int(i) for i in members[close] if i != medoid])
+            clusters.extend([int(i)] for i in members[~close])
+        return [[int(i) for i in cluster] for cluster in clusters]
@@ -0,0 +1,138 @@
+import asyncio
+import functools
+from typing import Any, Dict, List, Optional
+from pydantic import Field, PrivateAttr
+from base_agent import BaseAgent
+from data_models import NewsItem
+from tools.compression import strip_html
+from tools.embeddings import Embedder
+
+# Ключевые леммы для определения категории новости
+CATEGORY_KEYWORDS: Dict[str, set] = {
+    "Politics": {"election", "president", "parliament", "minister", "government", "vote", "party", "senate", "congress", "referendum"},
+    "Conflict": {"war", "army", "military", "attack", "strike", "missile", "troop", "ceasefire", "soldier", "invasion"},
+    "Economy": {"economy", "market", "inflation", "bank", "trade", "tariff", "price", "stock", "budget", "growth"},
+    "Technology": {"technology", "ai", "software", "internet", "cyber", "chip", "app", "startup", "robot", "data"},
+    "Science": {"science", "research", "scientist", "space", "study", "discovery", "nasa", "physics", "species"},
+    "Health": {"health", "hospital", "disease", "virus", "vaccine", "doctor", "patient", "outbreak", "medical"},
+    "Environment": {"climate", "emission", "wildfire", "flood", "storm", "pollution", "environment", "drought", "heatwave"},
+    "Crime": {"police", "court", "arrest", "murder", "trial", "prison", "judge", "crime", "sentence", "charge"},
+    "Sports": {"football", "match", "tournament", "olympic", "champion", "league", "cup", "player", "coach"},
+    "Culture": {"film", "music", "art", "festival", "actor", "book", "museum", "celebrity", "award"},
+}
+
+# Типы именованных сущностей, которые используются как теги
+TAG_ENTITY_LABELS = {"GPE", "ORG", "PERSON", "NORP", "EVENT", "LOC"}
+
+
+@functools.lru_cache(maxsize=None)
+def load_spacy(model_name: str):
+    """
+    Загружает модель spaCy один раз на процесс.
+    """
+    import spacy
+    return spacy.load(model_name, disable=["parser"])
+
+
+class EnricherAgent(BaseAgent):
+    """
+    Агент локального обогащения новостей перед ManagerAgent.
+    Пакетно определяет язык, теги, категорию и тональность без обращения к LLM.
+    Модели загружаются один раз на процесс и переиспользуются между запусками.
+    """
+    spacy_model: str = Field(default="en_core_web_sm", description="Модель spaCy для извлечения сущностей и лемм")
+    use_keywords: bool = Field(default=True, description="Извлекать ли ключевые фразы KeyBERT")
+    batch_size: int = Field(default=64, description="Размер пачки для nlp.pipe")
+    n_process: int = Field(default=1, description="Количество процессов spaCy")
+    max_tags: int = Field(default=5, description="Максимальное количество тегов")
+    _detector_seeded: bool = PrivateAttr(default=False)
+    _embedder: Embedder = PrivateAttr()
+    _keybert: Any = PrivateAttr(default=None)
+
+    def __init__(self, embedder: Embedder = None, **data: Any):
+        super().__init__(name="EnricherAgent", **data)
+        # KeyBERT использует ту же модель эмбеддингов, что и дедупликация
+        self._embedder = embedder or Embedder()
+
+    async def process(self, news_list: List[NewsItem]) -> List[NewsItem]:
+        """
+        Заполняет пустые поля language, tags, category и sentiment.
+
+        :param news_list: Список новостей.
+        :return: Список обогащённых новостей в исходном порядке.
+        """
+        if not news_list:
+            return news_list
+        enriched = await asyncio.to_thread(self._enrich, news_list)
+        await self.log(f"Enriched {len(enriched)} news items.")
+        return enriched
+
+    def _enrich(self, news_list: List[NewsItem]) -> List[NewsItem]:
+        texts = [f"{item.title}. {strip_html(item.description)}" for item in news_list]
+        languages = self._detect_languages(texts)
+
+        # Сущности и леммы извлекаются только для английских текстов
+        english = [i for i, language in enumerate(languages) if language == "en"]
+        entities: Dict[int, List[str]] = {}
+        lemmas: Dict[int, set] = {}
+        nlp = load_spacy(self.spacy_model)
+        docs = nlp.pipe((texts[i] for i in english), batch_size=self.batch_size, n_process=self.n_process)
+        for i, doc in zip(english, docs):
+            entities[i] = list(dict.fromkeys(ent.text for ent in doc.ents if ent.label_ in TAG_ENTITY_LABELS))
+            lemmas[i] = {(token.lemma_ or token.text).lower() for token in doc if token.is_alpha}
+
+        keywords = self._extract_keywords([texts[i] for i in english])
+        keywords_by_index = dict(zip(english, keywords))
+
+        from textblob import TextBlob
+
+        result = []
+        for i, item in enumerate(news_list):
+            update: Dict[str, Any] = {}
+            if not item.language and languages[i]:
+                update["language"] = languages[i]
+            if not item.tags:
+                tags = list(dict.fromkeys(entities.get(i, []) + keywords_by_index.get(i, [])))
+                update["tags"] = tags[:self.max_tags]
+            if not item.category and i in lemmas:
+                update["category"] = self._categorize(lemmas[i])
+            if not item.sentiment and languages[i] == "en":
+                update["sentiment"] = round(max(-1.0, min(1.0, TextBlob(texts[i]).sentiment.polarity)), 3)
+            result.append(item.model_copy(update=update) if update else item)
+        return result
+
+    def _detect_languages(self, texts: List[str]) -> List[Optional[str]]:
+        from langdetect import DetectorFactory, detect
+        from langdetect.lang_detect_exception import LangDetectException
+
+        if not self._detector_seeded:
+            # Фиксированное зерно делает определение языка воспроизводимым
+            DetectorFactory.seed = 0
+            self._detector_seeded = True
+        languages = []
+        for text in texts:
+            try:
+                languages.append(detect(text))
+            except LangDetectException:
+                languages.append(None)
+        return languages
+
+    def _extract_keywords(self, texts: List[str]) -> List[List[str]]:
+        if not texts or not self.use_keywords:
+            return [[] for _ in texts]
+        if self._keybert is None:
+            from keybert import KeyBERT
+            self._keybert = KeyBERT(model=self._embedder.model)
+        keywords = self._keybert.extract_keywords(
+            texts, keyphrase_ngram_range=(1, 2), stop_words="english", top_n=3
+        )
+        # Для одного документа KeyBERT возвращает плоский список
+        if len(texts) == 1:
+            keywords = [keywords]
+        return [[phrase for phrase, _ in doc_keywords] for doc_keywords in keywords]
+
+    @staticmethod
+    def _categorize(lemmas: set) -> Optional[str]:
+        scores = {category: len(lemmas & words) for category, words in CATEGORY_KEYWORDS.items()}
+        category, score = max(scores.items(), key=lambda kv: kv[1])
+        return category if score else None
@@ -1,37 +1,74 @@
-from typing import List
+from typing import Any, List, Optional
 from base_agent import BaseAgent
-from data_models import NewsItem
-from pydantic_ai import Agent
-from pydantic_ai.models.openai import OpenAIModel
-from pydantic import PrivateAttr
-import os
-import csv
-import datetime
+from data_models import NewsCluster, NewsItem, merge_related
+from pydantic import Field, PrivateAttr
+from tools.batching import chunk_by_tokens, map_concurrent
+from tools.llm import LLMLimiter, build_agent, run_agent
+from tools.llm_cache import LLMCache
+from tools.archive import ArchiveStore
+from tools.vector_index import CoverageIndex
+
+SYSTEM_PROMPT = (
+    "You are a news aggregator and analyzer tasked with processing a corpus of raw news articles. "
+    "Your job is to deduplicate, merge related news items, and generate a structured list of concise and meaningful news summaries. "
+    "Each input news item starts with its numeric ID in square brackets. "
+    "Group the items into stories: combine news items about the same geographical locations, people, or events. "
+    "For each story return only: ids (the IDs of its items, the most informative first), title, description, tags and category. "
+    "Do not repeat sources, URLs, dates or regions: they are restored from the IDs. "
+    "Every ID may appear in at most one story; omit items that are not newsworthy. "
+    "Simplify overly complex descriptions while retaining the essential meaning. "
+    "When tags or category are provided for an item, reuse them instead of inventing new values. "
+    "Always return the result as a JSON list of NewsCluster objects."
+)
+
+REDUCE_PROMPT = (
+    "You are a news editor merging stories that were summarized in separate batches. "
+    "Each input story starts with its numeric ID in square brackets. "
+    "Find stories about the same event and return one NewsCluster per group of two or more: "
+    "ids (the most informative first), title, description, tags and category of the merged story. "
+    "Do not return stories that have no duplicates. "
+    "Always return the result as a JSON list of NewsCluster objects."
+)
 
 class ManagerAgent(BaseAgent):
     """
     Агент-менеджер для обработки новостей.
     Использует LLM для анализа, объединения и структурирования новостей.
+    Модель возвращает только ссылки на входные новости (ID) и новые поля,
+    а объекты NewsItem собираются локально из исходных новостей.
+    Большие корпуса разбиваются на пачки по бюджету токенов и обрабатываются параллельно,
+    после чего истории из разных пачек сводятся одним запросом по заголовкам.
     """
-    _agent: Agent = PrivateAttr()
-
-    def __init__(self):
-        super().__init__(name="ManagerAgent")
-        self._agent = Agent(
-            model=OpenAIModel(
-                "gpt-3.5-turbo",  # Или "gpt-4o"
-                api_key=os.getenv("OPENAI_API_KEY")
-            ),
-            result_type=List[NewsItem],
-            system_prompt=(
-                "You are a news aggregator and analyzer tasked with processing a corpus of raw news articles. "
-                "Your job is to deduplicate, merge related news items, and generate a structured list of concise and meaningful news summaries. "
-                "Each news item must include: source, title, description, date, region, URL (if available), tags, category, language, and sentiment. "
-                "When merging, combine news items about the same geographical locations, people, or events. "
-                "Simplify overly complex descriptions while retaining the essential meaning. "
-                "Always return the result as a JSON list of NewsItem objects."
-            )
-        )
+    token_budget: int = Field(default=3000, description="Бюджет токенов входного промпта на одну пачку")
+    max_parallel_batches: int = Field(default=4, description="Максимальное количество пачек, обрабатываемых одновременно")
+    llm_model: str = Field(default="gpt-3.5-turbo", description="Имя модели OpenAI")  # Или "gpt-4o"
+    llm_cache: Optional[LLMCache] = Field(default=None, description="Кеш ответов LLM")
+    llm_limiter: LLMLimiter = Field(default_factory=LLMLimiter, description="Лимиты, повторы и таймауты запросов к LLM")
+    archive: Optional[ArchiveStore] = Field(default=None, description="Архив обработанных новостей")
+    coverage: Optional[CoverageIndex] = Field(default=None, description="Семантический индекс уже опубликованных новостей")
+    suppress_days: float = Field(default=7.0, description="За сколько дней не повторять уже опубликованные истории")
+    suppress_threshold: float = Field(default=0.9, description="Косинусное сходство, при котором история считается уже опубликованной")
+    _agent: Any = PrivateAttr(default=None)
+    _reduce_agent: Any = PrivateAttr(default=None)
+
+    def __init__(self, **data: Any):
+        super().__init__(name="ManagerAgent", **data)
+
+    def _get_agent(self) -> Any:
+        """
+        Возвращает агента pydantic-ai, создавая его при первом обращении к LLM.
+        """
+        if self._agent is None:
+            self._agent = build_agent(self.llm_model, SYSTEM_PROMPT, List[NewsCluster])
+        return self._agent
+
+    def _get_reduce_agent(self) -> Any:
+        """
+        Возвращает агента для объединения историй из разных пачек.
+        """
+        if self._reduce_agent is None:
+            self._reduce_agent = build_agent(self.llm_model, REDUCE_PROMPT, List[NewsCluster])
+        return self._reduce_agent
 
     async def process(self, raw_news: List[NewsItem]) -> List[NewsItem]:
         """
@@ -43,39 +80,147 @@ class ManagerAgent(BaseAgent):
         if not raw_news:
             raise ValueError("No news provided for processing.")
 
-        # Преобразуем объекты NewsItem в строки для обработки
-        raw_corpus = "\n\n".join(
-            f"Source: {news.source}, Title: {news.title}, Description: {news.description}"
-            for news in raw_news
-        )
+        # Убираем истории, уже опубликованные за последние дни
+        if self.coverage:
+            fresh_news = await self.coverage.filter_published(raw_news, self.suppress_days, self.suppress_threshold)
+            await self.log(f"Suppressed {len(raw_news) - len(fresh_news)} already published news items.")
+            if not fresh_news:
+                return []
+            raw_news = fresh_news
+
+        # Разбиваем новости на пачки, укладывающиеся в бюджет токенов
+        batches = chunk_by_tokens(raw_news, self._format_news, self.token_budget)
+        await self.log(f"Processing {len(raw_news)} news items in {len(batches)} batch(es).")
 
-        # Передаём корпус текстов в модель
-        response = self._agent.run_sync(user_prompt=raw_corpus)
+        # Map: каждая пачка обрабатывается моделью отдельно
+        partial_results = await map_concurrent(self._process_batch, batches, self.max_parallel_batches)
 
-        if not response.data:
-            raise ValueError("Failed to generate structured news items.")
+        # Reduce: объединяем частичные результаты
+        news_list = [news for partial in partial_results for news in partial]
+        if not news_list:
+            # Модель вправе отбросить все новости как незначимые
+            await self.log(f"Model kept none of {len(raw_news)} news items.", level="WARNING")
+            return []
+        if sum(1 for partial in partial_results if partial) > 1:
+            # Одна история могла попасть в несколько пачек
+            news_list = await self._merge_stories(news_list)
 
-        # Записываем новости в CSV-файл
-        self._save_to_csv(response.data)
+        # Сохраняем новости в архив (запись выполняется вне событийного цикла);
+        # в индекс прошлого освещения они попадают только после публикации (main.run_digest)
+        if self.archive:
+            await self.archive.add_many(news_list)
 
-        return response.data
+        return news_list
 
-    def _save_to_csv(self, news_list: List[NewsItem]):
+    async def _process_batch(self, batch: List[NewsItem]) -> List[NewsItem]:
         """
-        Сохраняет новости в CSV-файл с минимальным форматированием.
+        Обрабатывает одну пачку новостей с помощью LLM.
 
-        :param news_list: Список объектов NewsItem.
+        :param batch: Пачка объектов NewsItem.
+        :return: Список структурированных объектов NewsItem.
         """
-        file_name = "news_archive.csv"
-        file_exists = os.path.isfile(file_name)
+        # Преобразуем объекты NewsItem в строки с ID (индекс новости в пачке)
+        raw_corpus = "\n\n".join(f"[{i}] {self._format_news(news)}" for i, news in enumerate(batch))
+
+        # Передаём корпус текстов в модель (с учётом кеша ответов)
+        clusters = await run_agent(
+            self._get_agent(),
+            raw_corpus,
+            model_name=self.llm_model,
+            system_prompt=SYSTEM_PROMPT,
+            result_type=List[NewsCluster],
+            cache=self.llm_cache,
+            limiter=self.llm_limiter,
+            agent_name=self.name,
+        )
+        return await self._rebuild(batch, clusters or [])
 
-        with open(file_name, mode="a", newline="", encoding="utf-8") as file:
-            writer = csv.writer(file, quoting=csv.QUOTE_NONE, escapechar='\\')
+    async def _rebuild(self, batch: List[NewsItem], clusters: List[NewsCluster]) -> List[NewsItem]:
+        """
+        Собирает NewsItem из исходных новостей по ссылкам из ответа модели.
+        Источник, URL, дата, регион, язык и тональность берутся у первой новости кластера,
+        источники остальных попадают в related_sources. Несуществующие и повторные ID отбрасываются.
 
-            # Пишем заголовки, если файл создаётся впервые
-            if not file_exists:
-                writer.writerow(["Date Generated", "News Item"])
+        :param batch: Пачка, отправленная модели.
+        :param clusters: Ответ модели.
+        :return: Список объектов NewsItem.
+        """
+        used = set()
+        invalid = []
+        news_list = []
+        for cluster in clusters:
+            ids = []
+            for i in cluster.ids:
+                if 0 <= i < len(batch) and i not in used:
+                    ids.append(i)
+                    used.add(i)
+                else:
+                    invalid.append(i)
+            if not ids:
+                continue
+            primary = batch[ids[0]]
+            news_list.append(merge_related(
+                primary,
+                [batch[i] for i in ids[1:]],
+                title=cluster.title or primary.title,
+                description=cluster.description or primary.description,
+                tags=cluster.tags or primary.tags,
+                category=cluster.category or primary.category,
+            ))
+        if invalid:
+            await self.log(f"Ignored invalid or repeated IDs in model output: {invalid}")
+        await self.log(f"Model grouped {len(used)} of {len(batch)} news items into {len(news_list)} stories.")
+        return news_list
+
+    async def _merge_stories(self, news_list: List[NewsItem]) -> List[NewsItem]:
+        """
+        Объединяет одинаковые истории из разных пачек.
+        Модели отправляются только заголовки; истории, не попавшие ни в одну группу, остаются как есть.
 
-            # Добавляем строки с датой и текстом новости
-            for news in news_list:
-                writer.writerow([datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"), f"{news.title}: {news.description}"])
+        :param news_list: Истории всех пачек.
+        :return: Список объектов NewsItem в порядке первого появления.
+        """
+        titles = "\n".join(f"[{i}] {news.title}" for i, news in enumerate(news_list))
+        clusters = await run_agent(
+            self._get_reduce_agent(),
+            titles,
+            model_name=self.llm_model,
+            system_prompt=REDUCE_PROMPT,
+            result_type=List[NewsCluster],
+            cache=self.llm_cache,
+            limiter=self.llm_limiter,
+            agent_name=self.name,
+        )
+        merged = {}
+        absorbed = set()
+        for cluster in clusters or []:
+            ids = list(dict.fromkeys(i for i in cluster.ids if 0 <= i < len(news_list) and i not in absorbed))
+            if len(ids) < 2:
+                continue
+            primary = news_list[ids[0]]
+            merged[min(ids)] = merge_related(
+                primary,
+                [news_list[i] for i in ids[1:]],
+                title=cluster.title or primary.title,
+                description=cluster.description or primary.description,
+                tags=cluster.tags or primary.tags,
+                category=cluster.category or primary.category,
+            )
+            absorbed.update(ids)
+        result = [merged.get(i, news) for i, news in enumerate(news_list) if i in merged or i not in absorbed]
+        await self.log(f"Merged {len(news_list)} stories from separate batches into {len(result)}.")
+        return result
+
+    @staticmethod
+    def _format_news(news: NewsItem) -> str:
+        """
+        Преобразует новость в строку для промпта.
+        """
+        text = f"Source: {news.source}, Title: {news.title}, Description: {news.description}"
+        if news.related_sources:
+            text += f", Also reported by: {', '.join(news.related_sources)}"
+        if news.tags:
+            text += f", Tags: {', '.join(news.tags)}"
+        if news.category:
+            text += f", Category: {news.category}"
+        return text
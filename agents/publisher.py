@@ -1,37 +1,116 @@
-
 from base_agent import BaseAgent
 from data_models import NewsDigest
 from pydantic import Field, PrivateAttr
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
 import os
-from telegram import Bot
+import random
+from tools.delivery import SentLog, digest_fingerprint, idempotency_key, split_message
+from tools.metrics import METRICS
+from tools.rate_limit import TokenBucket
+
+
+def _env_list(name: str) -> List[str]:
+    """
+    Читает список значений через запятую из переменной окружения.
+    """
+    return [value.strip() for value in (os.getenv(name) or "").split(",") if value.strip()]
+
 
 class PublisherAgent(BaseAgent):
     """
     Агент-публикатор для отправки дайджестов в Telegram.
+    Дайджест рассылается во все чаты из chat_ids и в чаты своего региона из region_chat_ids.
+    Длинные дайджесты делятся на части по 4096 символов. Чаты обслуживаются параллельно,
+    части внутри чата уходят по порядку с соблюдением лимитов Telegram (общего и на чат).
+    После RetryAfter и сетевых ошибок отправка повторяется, а журнал отправленных частей
+    не даёт повторной публикации продублировать уже доставленные сообщения.
+    Если группа переехала в супергруппу (ChatMigrated), оставшиеся части и следующие
+    дайджесты уходят по новому идентификатору чата.
     """
     telegram_bot_token: str = Field(default_factory=lambda: os.getenv("TELEGRAM_BOT_TOKEN"))
-    chat_id: str = Field(default_factory=lambda: os.getenv("TELEGRAM_CHAT_ID"))
-    _bot: Bot = PrivateAttr()
+    chat_ids: List[str] = Field(default_factory=lambda: _env_list("TELEGRAM_CHAT_ID"), description="Чаты, получающие все дайджесты (в окружении — через запятую)")
+    region_chat_ids: Dict[str, List[str]] = Field(default_factory=dict, description="Чаты, получающие только дайджесты своего региона")
+    api_base_url: Optional[str] = Field(default_factory=lambda: os.getenv("TELEGRAM_API_BASE_URL"), description="Адрес Bot API (например, локальный сервер)")
+    parse_mode: Optional[str] = Field(default="Markdown", description="Режим разметки сообщений")
+    max_concurrency: int = Field(default=8, description="Максимум одновременных запросов к Bot API")
+    global_per_second: float = Field(default=30.0, description="Общий лимит сообщений в секунду")
+    chat_per_minute: float = Field(default=20.0, description="Лимит сообщений в минуту для одного чата")
+    chat_burst: int = Field(default=3, description="Сколько сообщений подряд можно отправить в чат без паузы")
+    max_retries: int = Field(default=5, description="Количество повторов отправки одной части")
+    sent_log: Optional[SentLog] = Field(default=None, description="Журнал отправленных сообщений для идемпотентности")
+    _bot: Any = PrivateAttr(default=None)
+    _semaphore: asyncio.Semaphore = PrivateAttr()
+    _global_bucket: TokenBucket = PrivateAttr()
+    _chat_buckets: Dict[str, TokenBucket] = PrivateAttr(default_factory=dict)
+    _migrated_chats: Dict[str, str] = PrivateAttr(default_factory=dict)
 
-    def __init__(self):
-        super().__init__(name="PublisherAgent")
+    def __init__(self, **data: Any):
+        super().__init__(name="PublisherAgent", **data)
 
         # Проверка наличия необходимых переменных
-        if not self.telegram_bot_token or not self.chat_id:
+        if not self.telegram_bot_token or not (self.chat_ids or self.region_chat_ids):
             raise ValueError("Telegram bot token or chat ID not found in environment variables.")
 
-        # Инициализация бота
-        self._bot = Bot(token=self.telegram_bot_token)
+        self._semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+        # Общий лимит без запаса на всплеск: сообщения идут равномерно, не превышая global_per_second
+        self._global_bucket = TokenBucket(self.global_per_second * 60, capacity=1)
+
+    def _get_bot(self) -> Any:
+        """
+        Возвращает бота Telegram, создавая его при первой отправке.
+        Библиотека telegram импортируется здесь же: запуски без дайджеста её не загружают.
+        """
+        if self._bot is None:
+            from telegram import Bot
+            from telegram.request import HTTPXRequest
+
+            # По умолчанию у бота одно соединение, и параллельные отправки упирались бы в него
+            options = {"base_url": self.api_base_url} if self.api_base_url else {}
+            self._bot = Bot(
+                token=self.telegram_bot_token,
+                request=HTTPXRequest(connection_pool_size=self.max_concurrency),
+                **options,
+            )
+        return self._bot
+
+    def _chat_bucket(self, chat_id: str) -> TokenBucket:
+        if chat_id not in self._chat_buckets:
+            self._chat_buckets[chat_id] = TokenBucket(self.chat_per_minute, capacity=self.chat_burst)
+        return self._chat_buckets[chat_id]
+
+    def chats_for(self, digest: NewsDigest) -> List[str]:
+        """
+        Возвращает чаты, в которые нужно отправить дайджест.
+        """
+        chats = list(self.chat_ids)
+        for chat_id in self.region_chat_ids.get(digest.region or "", []):
+            if chat_id not in chats:
+                chats.append(chat_id)
+        return chats
 
-    async def process(self, data: NewsDigest) -> None:
+    async def process(self, data: NewsDigest) -> Dict[str, str]:
         """
         Отправляет дайджест в Telegram.
 
         :param data: Объект NewsDigest для публикации.
+        :return: Статус доставки по чатам: "sent", "skipped" (уже отправлен) или "failed: <ошибка>".
         """
-        await self.log("Preparing to publish digest...")
+        chats = self.chats_for(data)
+        if not chats:
+            await self.log(f"No chats configured for region {data.region}, digest is not published.")
+            return {}
         message = self._format_message(data)
-        await self._send_message(message)
+        parts = split_message(message)
+        await self.log(f"Publishing digest in {len(parts)} part(s) to {len(chats)} chat(s)...")
+
+        fingerprint = digest_fingerprint(data)
+        statuses = await asyncio.gather(*(self._deliver(chat_id, fingerprint, parts) for chat_id in chats))
+        report = dict(zip(chats, statuses))
+        if all(status.startswith("failed") for status in statuses):
+            raise RuntimeError(f"Failed to deliver digest to any chat: {report}")
+        return report
 
     def _format_message(self, digest: NewsDigest) -> str:
         """
@@ -43,25 +122,111 @@ class PublisherAgent(BaseAgent):
         message = f"*Date Generated:* {digest.date_generated}\n"
         if digest.region:
             message += f"*Region:* {digest.region}\n"
+        if digest.category:
+            message += f"*Category:* {digest.category}\n"
         message += "*Summary:*\n" + digest.summary
         return message
 
-    async def _send_message(self, message: str) -> None:
+    async def _deliver(self, chat_id: str, fingerprint: str, parts: List[str]) -> str:
         """
-        Отправляет сообщение в Telegram.
+        Отправляет части сообщения в один чат по порядку, пропуская уже доставленные.
 
-        :param message: Текст сообщения.
+        :param chat_id: Идентификатор чата.
+        :param fingerprint: Отпечаток дайджеста (основа ключей идемпотентности).
+        :param parts: Части сообщения.
+        :return: Статус доставки.
         """
-        try:
-            await self._bot.send_message(
-                chat_id=self.chat_id,
-                text=message,
-                parse_mode="Markdown"
-            )
-            await self.log("Digest successfully sent to Telegram.")
-        except Exception as e:
-            await self.log(f"Failed to send digest: {e}")
-            raise
+        chat_id = self._migrated_chats.get(chat_id, chat_id)
+        if self.sent_log:
+            chat_id = await asyncio.to_thread(self.sent_log.resolve_chat, chat_id)
+        sent = skipped = 0
+        for index, part in enumerate(parts):
+            key = idempotency_key(chat_id, fingerprint, index)
+            if self.sent_log and await asyncio.to_thread(self.sent_log.is_sent, key):
+                skipped += 1
+                continue
+            try:
+                delivered_to, message_id = await self._send_part(chat_id, part)
+            except Exception as e:
+                METRICS.record_delivery(self.name, sent=sent, skipped=skipped, failed=1)
+                await self.log(f"Failed to send part {index + 1}/{len(parts)} to chat {chat_id}: {e}")
+                return f"failed: {e}"
+            if delivered_to != chat_id:
+                await self._migrate_chat(chat_id, delivered_to, fingerprint, index)
+                chat_id = delivered_to
+                key = idempotency_key(chat_id, fingerprint, index)
+            if self.sent_log:
+                await asyncio.to_thread(self.sent_log.mark_sent, key, chat_id, message_id)
+            sent += 1
+        METRICS.record_delivery(self.name, sent=sent, skipped=skipped)
+        await self.log(f"Digest delivered to chat {chat_id}: {sent} sent, {skipped} already sent.")
+        return "sent" if sent else "skipped"
+
+    async def _migrate_chat(self, old_chat_id: str, new_chat_id: str, fingerprint: str, parts_sent: int) -> None:
+        """
+        Запоминает новый идентификатор чата и переносит на него отметки уже доставленных частей.
+
+        :param old_chat_id: Прежний идентификатор чата.
+        :param new_chat_id: Идентификатор супергруппы из ChatMigrated.
+        :param fingerprint: Отпечаток дайджеста.
+        :param parts_sent: Количество частей, доставленных по прежнему идентификатору.
+        """
+        self._migrated_chats[old_chat_id] = new_chat_id
+        if self.sent_log:
+            keys = {
+                idempotency_key(old_chat_id, fingerprint, index): idempotency_key(new_chat_id, fingerprint, index)
+                for index in range(parts_sent)
+            }
+            await asyncio.to_thread(self.sent_log.migrate_chat, old_chat_id, new_chat_id, keys)
+        METRICS.inc("chat_migrations", agent=self.name)
+        await self.log(f"Chat {old_chat_id} migrated to {new_chat_id}, sending to the new chat ID.", level="WARNING")
+
+    async def _send_part(self, chat_id: str, text: str) -> Tuple[str, Optional[int]]:
+        """
+        Отправляет одну часть сообщения с учётом лимитов и повторов.
+
+        :param chat_id: Идентификатор чата.
+        :param text: Текст части.
+        :return: Пара (идентификатор чата, куда доставлена часть, идентификатор сообщения);
+            чат отличается от переданного, если группа переехала в супергруппу.
+        """
+        from telegram.error import BadRequest, ChatMigrated, NetworkError, RetryAfter
+
+        parse_mode = self.parse_mode
+        attempt = 0
+        while True:
+            # Сначала токен чата: пока сообщение ждёт лимита своего чата, общий токен не простаивает
+            await self._chat_bucket(chat_id).acquire()
+            await self._global_bucket.acquire()
+            try:
+                async with self._semaphore:
+                    sent = await self._get_bot().send_message(chat_id=chat_id, text=text, parse_mode=parse_mode)
+                return chat_id, sent.message_id
+            except RetryAfter as e:
+                error = e
+                delay = e.retry_after.total_seconds() if isinstance(e.retry_after, timedelta) else float(e.retry_after)
+            except ChatMigrated as e:
+                error = e
+                new_chat_id = str(e.new_chat_id)
+                # Лимит на чат продолжает действовать под новым идентификатором
+                bucket = self._chat_buckets.pop(chat_id, None)
+                if bucket is not None:
+                    self._chat_buckets.setdefault(new_chat_id, bucket)
+                chat_id, delay = new_chat_id, 0.0
+            except BadRequest as e:
+                # Разбиение могло разорвать разметку, такую часть отправляем простым текстом
+                if not parse_mode or "parse entities" not in str(e).lower():
+                    raise
+                error = e
+                parse_mode, delay = None, 0.0
+            except NetworkError as e:
+                error = e
+                delay = random.uniform(0.5, 1.0) * min(30.0, 2.0 ** attempt)
+            attempt += 1
+            if attempt > self.max_retries:
+                raise error
+            METRICS.record_delivery(self.name, retries=1)
+            await asyncio.sleep(delay)
 
 
 # from base_agent import BaseAgent
@@ -1,40 +1,46 @@
 from base_agent import BaseAgent
-from typing import List
+from typing import Any, AsyncIterator, Dict, List, Optional
 from datetime import datetime
 from data_models import NewsItem, NewsDigest
-from pydantic_ai import Agent
-from pydantic_ai.models.openai import OpenAIModel
 from pydantic import Field, PrivateAttr
-import os
-import re
-from dotenv import load_dotenv
+from tools.batching import chunk_by_tokens, imap_concurrent, map_concurrent
+from tools.compression import split_sentences
+from tools.llm import LLMLimiter, build_agent, run_agent
+from tools.llm_cache import LLMCache
+from tools.vector_index import CoverageIndex
 
-# Загружаем переменные окружения
-load_dotenv(override=True)
+SYSTEM_PROMPT = (
+    "You are a professional summarizer. "
+    "Give reply in Russian language. "
+    "Group similar news items into one by merging their content and summarizing them concisely in 1 sentence. "
+    "Ensure all key points are included and avoid repetition. "
+    "The summary must be a numbered list where each item starts with a number followed by a period and a single space (e.g., '1. '), without additional line breaks between items."
+)
 
 class WriterAgent(BaseAgent):
     """
     Агент-писатель для создания дайджестов новостей.
+    Если новости не укладываются в бюджет токенов, сводки пачек строятся параллельно
+    и затем объединяются иерархически в пределах того же бюджета.
+    При заданном partition_by новости делятся по региону или категории,
+    и для каждой группы строится отдельный дайджест.
     """
     max_sentences: int = Field(default=3, description="Максимальное количество предложений для описания")
-    _agent: Agent = PrivateAttr()
+    token_budget: int = Field(default=3000, description="Бюджет токенов входного промпта на одну пачку")
+    max_parallel_batches: int = Field(default=4, description="Максимальное количество пачек, обрабатываемых одновременно")
+    partition_by: Optional[str] = Field(default=None, description="Поле для раздельных дайджестов: region, category или None — один общий дайджест")
+    max_parallel_digests: int = Field(default=4, description="Максимальное количество дайджестов, создаваемых одновременно")
+    llm_model: str = Field(default="gpt-3.5-turbo", description="Имя модели OpenAI")
+    llm_cache: Optional[LLMCache] = Field(default=None, description="Кеш ответов LLM")
+    llm_limiter: LLMLimiter = Field(default_factory=LLMLimiter, description="Лимиты, повторы и таймауты запросов к LLM")
+    coverage: Optional[CoverageIndex] = Field(default=None, description="Семантический индекс прошлых публикаций")
+    related_days: float = Field(default=30.0, description="Глубина поиска прошлого освещения в днях")
+    related_threshold: float = Field(default=0.75, description="Минимальное сходство для упоминания прошлого освещения")
+    _agent: Any = PrivateAttr(default=None)
 
-    def __init__(self, max_sentences: int = 3):
-        super().__init__(name="WriterAgent")
+    def __init__(self, max_sentences: int = 3, **data: Any):
+        super().__init__(name="WriterAgent", **data)
         self.max_sentences = max_sentences
-        self._agent = Agent(
-            model=OpenAIModel(
-                "gpt-3.5-turbo",
-                api_key=os.getenv("OPENAI_API_KEY")
-            ),
-            system_prompt=(
-                "You are a professional summarizer. "
-                "Give reply in Russian language. "
-                "Group similar news items into one by merging their content and summarizing them concisely in 1 sentence. "
-                "Ensure all key points are included and avoid repetition. "
-                "The summary must be a numbered list where each item starts with a number followed by a period and a single space (e.g., '1. '), without additional line breaks between items."
-            )
-        )
 
     async def process(self, news_list: List[NewsItem]) -> NewsDigest:
         """
@@ -46,15 +52,27 @@ class WriterAgent(BaseAgent):
         if not news_list:
             raise ValueError("The news list is empty. Cannot create a digest.")
 
-        # Формируем сообщение для LLM
-        user_message = self._prepare_message(news_list)
+        # Прошлое освещение тех же историй из семантического индекса
+        related = [[] for _ in news_list]
+        if self.coverage:
+            hits = await self.coverage.related(news_list, k=2, days=self.related_days)
+            related = [
+                [hit["label"]["title"] for hit in item_hits if hit["score"] >= self.related_threshold]
+                for item_hits in hits
+            ]
 
-        # Запрашиваем модель
-        response = await self._agent.run(user_message)
+        # Описания уже сжаты CompressorAgent до ManagerAgent, здесь только ограничиваем число предложений
+        descriptions = [" ".join(split_sentences(item.description)[:self.max_sentences]) for item in news_list]
 
-        # Проверяем ответ
-        if not response.data:
-            raise ValueError("Failed to generate a digest summary.")
+        # Разбиваем новости на пачки, укладывающиеся в бюджет токенов
+        entries = list(zip(news_list, related, descriptions))
+        batches = chunk_by_tokens(entries, lambda entry: self._format_item(*entry), self.token_budget)
+
+        # Map: сводка по каждой пачке
+        partial_summaries = await map_concurrent(self._summarize_batch, batches, self.max_parallel_batches)
+
+        # Reduce: объединяем частичные сводки в одну
+        summary = await self._reduce_summaries(partial_summaries)
 
         # Определяем общий регион
         region = (
@@ -62,36 +80,139 @@ class WriterAgent(BaseAgent):
             if all(item.region == news_list[0].region for item in news_list)
             else None
         )
+        category = (
+            news_list[0].category
+            if all(item.category == news_list[0].category for item in news_list)
+            else None
+        )
 
         # Создаём объект NewsDigest
         digest = NewsDigest(
             date_generated=datetime.now(),
             items=news_list,
-            summary=response.data.strip(),
-            region=region
+            summary=summary,
+            region=region,
+            category=category,
         )
         return digest
 
-    def _prepare_message(self, news_list: List[NewsItem]) -> str:
+    async def process_partitioned(self, news_list: List[NewsItem]) -> AsyncIterator[NewsDigest]:
         """
-        Формирует сообщение для LLM на основе списка новостей.
+        Строит отдельный дайджест для каждой группы новостей (по полю partition_by)
+        и отдаёт дайджесты по мере готовности. Группы обрабатываются параллельно,
+        не больше max_parallel_digests одновременно; общие лимиты запросов к LLM
+        соблюдаются через llm_limiter. Без partition_by отдаёт один общий дайджест.
 
         :param news_list: Список новостей.
+        :return: Асинхронный итератор объектов NewsDigest.
+        """
+        if not news_list:
+            raise ValueError("The news list is empty. Cannot create a digest.")
+        groups = list(self.partition(news_list).values())
+        await self.log(f"Writing {len(groups)} digest(s) partitioned by {self.partition_by}.")
+        async for digest in imap_concurrent(self.process, groups, self.max_parallel_digests):
+            yield digest
+
+    def partition(self, news_list: List[NewsItem]) -> Dict[Optional[str], List[NewsItem]]:
+        """
+        Делит новости на группы по значению поля partition_by в порядке первого появления.
+        Новости без значения поля попадают в общую группу с ключом None.
+        """
+        if not self.partition_by:
+            return {None: list(news_list)}
+        if self.partition_by not in ("region", "category"):
+            raise ValueError(f"Unsupported partition field: {self.partition_by}")
+        groups: Dict[Optional[str], List[NewsItem]] = {}
+        for item in news_list:
+            groups.setdefault(getattr(item, self.partition_by), []).append(item)
+        return groups
+
+    async def _summarize_batch(self, batch: List[tuple]) -> str:
+        """
+        Запрашивает у модели сводку по одной пачке новостей.
+
+        :param batch: Пачка троек (новость, заголовки прошлого освещения, сжатое описание).
+        :return: Текст сводки.
+        """
+        summary = await self._run(self._prepare_message(batch))
+        if not summary:
+            raise ValueError("Failed to generate a digest summary.")
+        return summary.strip()
+
+    async def _reduce_summaries(self, summaries: List[str]) -> str:
+        """
+        Иерархически объединяет частичные сводки: на каждом уровне сводки делятся на пачки
+        по тому же бюджету токенов и пачки объединяются параллельно, пока не останется одна сводка.
+
+        :param summaries: Частичные сводки.
+        :return: Итоговая сводка.
+        """
+        while len(summaries) > 1:
+            groups = chunk_by_tokens(summaries, lambda summary: summary, self.token_budget)
+            if all(len(group) == 1 for group in groups):
+                # Каждая сводка сама по себе больше бюджета: объединяем попарно, чтобы уровень сокращался
+                groups = [summaries[i:i + 2] for i in range(0, len(summaries), 2)]
+            summaries = await map_concurrent(self._merge_summaries, groups, self.max_parallel_batches)
+        return summaries[0]
+
+    async def _merge_summaries(self, summaries: List[str]) -> str:
+        """
+        Объединяет частичные сводки пачек в единый нумерованный список.
+
+        :param summaries: Частичные сводки.
+        :return: Итоговая сводка.
+        """
+        if len(summaries) == 1:
+            return summaries[0]
+        user_message = (
+            "Merge the following partial digests into a single numbered list. "
+            "Combine items about the same event and renumber the list:\n\n"
+            + "\n\n".join(summaries)
+        )
+        summary = await self._run(user_message)
+        if not summary:
+            raise ValueError("Failed to merge digest summaries.")
+        return summary.strip()
+
+    def _get_agent(self) -> Any:
+        """
+        Возвращает агента pydantic-ai, создавая его при первом обращении к LLM.
+        """
+        if self._agent is None:
+            self._agent = build_agent(self.llm_model, SYSTEM_PROMPT)
+        return self._agent
+
+    async def _run(self, user_message: str) -> str:
+        """
+        Запрашивает модель с учётом кеша ответов.
+        """
+        return await run_agent(
+            self._get_agent(),
+            user_message,
+            model_name=self.llm_model,
+            system_prompt=SYSTEM_PROMPT,
+            cache=self.llm_cache,
+            limiter=self.llm_limiter,
+            agent_name=self.name,
+        )
+
+    def _prepare_message(self, entries: List[tuple]) -> str:
+        """
+        Формирует сообщение для LLM на основе списка новостей.
+
+        :param entries: Список троек (новость, заголовки прошлого освещения, сжатое описание).
         :return: Сообщение для LLM.
         """
         user_message = "Please group and summarize the following news items:\n\n"
-        for idx, item in enumerate(news_list, start=1):
-            description = self._truncate_to_sentences(item.description or "", self.max_sentences)
-            user_message += f"{idx}. Title: {item.title}\n   Description: {description}\n\n"
+        for idx, entry in enumerate(entries, start=1):
+            user_message += f"{idx}. {self._format_item(*entry)}\n\n"
         return user_message
 
-    def _truncate_to_sentences(self, text: str, max_sentences: int) -> str:
+    def _format_item(self, item: NewsItem, related: Optional[List[str]] = None, description: Optional[str] = None) -> str:
         """
-        Ограничивает текст заданным количеством предложений с использованием регулярных выражений.
-
-        :param text: Исходный текст
-        :param max_sentences: Максимальное количество предложений
-        :return: Ограниченный текст
+        Преобразует новость в строку для промпта.
         """
-        sentences = re.split(r'(?<=[.!?]) +', text.strip())
-        return " ".join(sentences[:max_sentences])
+        text = f"Title: {item.title}\n   Description: {item.description if description is None else description}"
+        if related:
+            text += f"\n   Earlier coverage: {'; '.join(related)}"
+        return text
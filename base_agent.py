@@ -1,13 +1,49 @@
+import functools
 import logging
+import time
 from abc import ABC, abstractmethod
 from typing import Any, List
 from pydantic import BaseModel, ConfigDict
+from tools.metrics import METRICS
+
+
+def _count_items(data: Any) -> int:
+    """
+    Количество элементов во входных или выходных данных агента.
+    """
+    if data is None:
+        return 0
+    if isinstance(data, (list, tuple, set)):
+        return len(data)
+    return 1
+
+
+def _instrument(process):
+    """
+    Оборачивает метод process: замеряет длительность, считает элементы и ошибки.
+    """
+    @functools.wraps(process)
+    async def wrapper(self, *args, **kwargs):
+        items_in = _count_items(args[0]) if args else 0
+        started = time.perf_counter()
+        try:
+            result = await process(self, *args, **kwargs)
+        except Exception:
+            METRICS.observe_call(self.name, time.perf_counter() - started, items_in, 0, error=True)
+            raise
+        METRICS.observe_call(self.name, time.perf_counter() - started, items_in, _count_items(result))
+        return result
+
+    wrapper._instrumented = True
+    return wrapper
+
 
 class BaseAgent(BaseModel, ABC):
     """
     Базовый класс для всех агентов в проекте.
     Этот класс определяет общий интерфейс и базовую функциональность, 
     которую могут использовать дочерние классы.
+    Метод process каждого наследника автоматически собирает метрики в tools.metrics.METRICS.
     """
 
     model_config = ConfigDict(arbitrary_types_allowed=True)
@@ -15,6 +51,13 @@ class BaseAgent(BaseModel, ABC):
     name: str = "BaseAgent"
     logger: logging.Logger = logging.getLogger("BaseAgent")
 
+    def __init_subclass__(cls, **kwargs: Any):
+        super().__init_subclass__(**kwargs)
+        process = cls.__dict__.get("process")
+        if process is not None and not getattr(process, "__isabstractmethod__", False) \
+                and not getattr(process, "_instrumented", False):
+            cls.process = _instrument(process)
+
     @abstractmethod
     async def process(self, data: Any) -> Any:
         """
@@ -0,0 +1,95 @@
+"""
+Бенчмарк экстрактивного сжатия описаний (CompressorAgent) на синтетических RSS-описаниях:
+HTML-разметка, сущности, повтор заголовка в первой фразе и хвосты «The post ... appeared first on».
+Выводятся оценка токенов промпта ManagerAgent до и после сжатия, коэффициент сжатия,
+скорость сжатия и оценка сэкономленного времени обработки промпта моделью.
+
+Запуск из корня проекта:
+    python -m benchmarks.compression --items 5000 --batch 50
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime
+from agents.compressor import CompressorAgent
+from agents.manager import ManagerAgent
+from data_models import NewsItem
+from tools.batching import estimate_tokens
+from tools.metrics import METRICS
+
+VOCABULARY = (
+    "government minister election market inflation police court storm flood army talks ceasefire "
+    "president vaccine hospital climate summit trade tariff border protest strike bank growth budget "
+    "officials said on monday the country capital city thousands people were after week report new"
+).split()
+
+
+def make_items(n: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    now = datetime.now()
+    items = []
+    for i in range(n):
+        title = " ".join(rng.choices(VOCABULARY, k=rng.randint(6, 10))).capitalize()
+        sentences = [title + "."] + [
+            " ".join(rng.choices(VOCABULARY, k=rng.randint(10, 22))).capitalize() + "."
+            for _ in range(rng.randint(3, 9))
+        ]
+        body = "".join(f"<p>{sentence.replace(' and ', ' &amp; ')}</p>" for sentence in sentences)
+        if rng.random() < 0.5:
+            body += f'<p>The post <a href="https://example.com/{i}">{title}</a> appeared first on Example News.</p>'
+        items.append(NewsItem(
+            source="Example News",
+            title=title,
+            description=body,
+            date=now,
+            region="World",
+            url=f"https://example.com/news/{i}",
+        ))
+    return items
+
+
+async def run(args: argparse.Namespace) -> None:
+    items = make_items(args.items)
+    agent = CompressorAgent(max_tokens=args.max_tokens, prompt_tokens_per_second=args.prompt_tps)
+    METRICS.reset()
+    started = time.perf_counter()
+    compressed = []
+    for start in range(0, len(items), args.batch):
+        compressed.extend(await agent.process(items[start:start + args.batch]))
+    elapsed = time.perf_counter() - started
+
+    before = sum(estimate_tokens(ManagerAgent._format_news(item)) for item in items)
+    after = sum(estimate_tokens(ManagerAgent._format_news(item)) for item in compressed)
+    tokens_in = METRICS.counter("compression_tokens_in", agent=agent.name)
+    tokens_out = METRICS.counter("compression_tokens_out", agent=agent.name)
+    saved_seconds = METRICS.counter("compression_saved_seconds", agent=agent.name)
+    print(f"items={args.items} batch={args.batch} max_tokens={args.max_tokens}")
+    print(
+        f"  descriptions: {tokens_in:.0f} -> {tokens_out:.0f} tokens "
+        f"(ratio {tokens_out / max(1, tokens_in):.2f})"
+    )
+    print(f"  manager prompt: {before} -> {after} tokens (ratio {after / max(1, before):.2f})")
+    print(
+        f"  compression: {elapsed:.2f}s total, {len(items) / elapsed:.0f} items/s, "
+        f"{elapsed / -(-len(items) // args.batch) * 1000:.1f} ms per batch"
+    )
+    print(
+        f"  estimated prompt time saved at {args.prompt_tps:.0f} tokens/s: "
+        f"{(before - after) / args.prompt_tps:.1f}s (net of compression {saved_seconds:.1f}s)"
+    )
+    print(f"  example: {compressed[0].description!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=50, help="Размер пачки, как у стадии сжатия в конвейере")
+    parser.add_argument("--max-tokens", type=int, default=80)
+    parser.add_argument("--prompt-tps", type=float, default=1000.0, help="Оценка скорости обработки входных токенов моделью")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
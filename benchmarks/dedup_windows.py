@@ -0,0 +1,101 @@
+"""
+Проверка дедупликации перепечаток, пришедших в разные пачки конвейера.
+Источник отдаёт копии каждой истории в разных окнах: между окнами пауза дольше
+batch_timeout стадии, поэтому копии одной истории никогда не попадают в одну пачку
+(как у лент, завершившихся с разницей в несколько секунд). Эмбеддинги заменяются
+хешированием токенов, как в benchmarks/replay.py.
+Сравниваются дедупликатор, сбрасываемый перед каждой пачкой (сравнение только внутри
+пачки), и дедупликатор с общим индексом на весь прогон. Для второго количество
+оставшихся новостей должно совпасть с количеством историй; иначе код выхода 1.
+
+Запуск из корня проекта:
+    python -m benchmarks.dedup_windows --stories 200 --copies 3
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import AsyncIterator, List
+from agents.deduplicator import DeduplicatorAgent
+from benchmarks.minhash import make_corpus
+from benchmarks.replay import HashingEmbedder
+from data_models import NewsItem
+from pipeline import Pipeline, Stage
+
+
+def make_windows(stories: int, copies: int) -> List[List[NewsItem]]:
+    """
+    Делит перепечатки на окна: в окне k лежит k-я копия каждой истории от своего источника.
+    """
+    corpus = make_corpus(stories * copies, copies)
+    windows = []
+    for copy in range(copies):
+        window = []
+        for story, text in enumerate(corpus[copy::copies]):
+            words = text.split()
+            window.append(NewsItem(
+                source=f"Source {copy}",
+                title=" ".join(words[:8]),
+                description=" ".join(words[8:]),
+                date=datetime.now(),
+                region="World",
+                url=f"https://source{copy}.example.com/news/{story}",
+            ))
+        windows.append(window)
+    return windows
+
+
+async def run(windows: List[List[NewsItem]], args: argparse.Namespace, per_batch: bool, cache_path: str) -> int:
+    deduplicator = DeduplicatorAgent(embedder=HashingEmbedder(cache_path))
+
+    async def process(batch: List[NewsItem]) -> List[NewsItem]:
+        if per_batch:
+            deduplicator.reset()
+        return await deduplicator.process(batch)
+
+    async def source() -> AsyncIterator[NewsItem]:
+        for window in windows:
+            for item in window:
+                yield item
+            # Пауза дольше batch_timeout: следующее окно уходит отдельной пачкой
+            await asyncio.sleep(args.window * 1.5)
+
+    pipeline = Pipeline([
+        Stage(name=deduplicator.name, handler=process, batch_size=args.batch_size, batch_timeout=args.window, flatten=True),
+    ])
+    started = time.perf_counter()
+    kept = await pipeline.run(source())
+    elapsed = time.perf_counter() - started
+    label = "per batch" if per_batch else "whole run"
+    print(f"  {label:9s} kept {len(kept)} of {sum(map(len, windows))} items in {elapsed:.1f}s")
+    return len(kept)
+
+
+async def main_async(args: argparse.Namespace) -> bool:
+    windows = make_windows(args.stories, args.copies)
+    with tempfile.TemporaryDirectory() as directory:
+        cache_path = os.path.join(directory, "embeddings.sqlite3")
+        await run(windows, args, per_batch=True, cache_path=cache_path)
+        kept = await run(windows, args, per_batch=False, cache_path=cache_path)
+    ok = kept == args.stories
+    print(f"  stories {args.stories}: {'OK' if ok else 'MISMATCH'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stories", type=int, default=200)
+    parser.add_argument("--copies", type=int, default=3, help="Копий каждой истории, по одной на окно")
+    parser.add_argument("--batch-size", type=int, default=200, help="Размер пачки стадии (DEDUP_BATCH_SIZE)")
+    parser.add_argument("--window", type=float, default=0.5, help="batch_timeout стадии в секундах")
+    args = parser.parse_args()
+    print(f"stories={args.stories} copies={args.copies} batch_size={args.batch_size}")
+    if not asyncio.run(main_async(args)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
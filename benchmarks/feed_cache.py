@@ -0,0 +1,125 @@
+"""
+Проверка условных GET-запросов CollectorAgent.tool_fetch_rss с кешем лент (FeedCache).
+Локальный сервер отдаёт ленту с валидатором ETag или Last-Modified и отвечает 304,
+если запрос пришёл с совпадающим If-None-Match / If-Modified-Since.
+Для каждого валидатора и режима разбора выполняются два сбора с новыми экземплярами
+FeedCache на одном каталоге: первый должен получить 200 и разобрать ленту (промах кеша),
+второй — получить 304, взять записи из кеша (попадание) и не разбирать ленту заново.
+Выводится OK или MISMATCH по каждому случаю; при несовпадении код выхода 1.
+
+Запуск из корня проекта:
+    python -m benchmarks.feed_cache --entries 200
+"""
+import argparse
+import asyncio
+import sys
+import tempfile
+from typing import Any, Dict, List
+from aiohttp import web
+from agents.collector import CollectorAgent
+from benchmarks.feed_parsing import make_feed
+from tools.feed_cache import FeedCache
+from tools.feed_parsing import FeedParserPool
+from tools.fetcher import FeedFetcher
+
+LAST_MODIFIED = "Wed, 01 Jan 2025 00:00:00 GMT"
+
+
+class CountingParserPool(FeedParserPool):
+    """
+    Разбор в событийном цикле с подсчётом разобранных лент.
+    """
+
+    def __init__(self):
+        super().__init__(workers=0)
+        self.parsed = 0
+
+    async def parse(self, content: bytes) -> Dict[str, Any]:
+        self.parsed += 1
+        return await super().parse(content)
+
+
+async def serve(payload: bytes, port: int, statuses: List[int]) -> web.AppRunner:
+    etag = '"feed-v1"'
+
+    async def feed(request: web.Request) -> web.Response:
+        validator = request.match_info["validator"]
+        if validator == "etag" and request.headers.get("If-None-Match") == etag:
+            statuses.append(304)
+            return web.Response(status=304, headers={"ETag": etag})
+        if validator == "last-modified" and request.headers.get("If-Modified-Since") == LAST_MODIFIED:
+            statuses.append(304)
+            return web.Response(status=304, headers={"Last-Modified": LAST_MODIFIED})
+        statuses.append(200)
+        headers = {"ETag": etag} if validator == "etag" else {"Last-Modified": LAST_MODIFIED}
+        return web.Response(body=payload, content_type="application/rss+xml", headers=headers)
+
+    app = web.Application()
+    app.router.add_get("/{validator}.xml", feed)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+async def check(url: str, streaming: bool, statuses: List[int]) -> bool:
+    with tempfile.TemporaryDirectory() as directory:
+        runs = []
+        async with FeedFetcher() as fetcher:
+            for _ in range(2):
+                # Новый экземпляр кеша на том же каталоге: валидаторы и записи читаются с диска
+                feed_cache = FeedCache(directory)
+                parser_pool = CountingParserPool()
+                collector = CollectorAgent(
+                    region="World",
+                    source_urls=[url],
+                    streaming=streaming,
+                    fetcher=fetcher,
+                    feed_cache=feed_cache,
+                    parser_pool=parser_pool,
+                )
+                statuses.clear()
+                items = await collector.tool_fetch_rss(url)
+                runs.append((list(statuses), feed_cache.stats(), parser_pool.parsed, items))
+    (first_statuses, first_cache, first_parsed, first_items), (second_statuses, second_cache, second_parsed, second_items) = runs
+    ok = (
+        first_statuses == [200] and first_cache["misses"] == 1 and first_parsed == (0 if streaming else 1)
+        and second_statuses == [304] and second_cache["hits"] == 1 and second_cache["misses"] == 0
+        and second_parsed == 0
+        and bool(first_items) and [item["url"] for item in first_items] == [item["url"] for item in second_items]
+    )
+    print(
+        f"  {url.rsplit('/', 1)[-1]:17s} streaming={streaming!s:5s} "
+        f"first: HTTP {first_statuses} cache {first_cache['hits']}/{first_cache['misses']} parsed {first_parsed}; "
+        f"second: HTTP {second_statuses} cache {second_cache['hits']}/{second_cache['misses']} parsed {second_parsed}; "
+        f"items {len(first_items)}/{len(second_items)}: {'OK' if ok else 'MISMATCH'}"
+    )
+    return ok
+
+
+async def run(args: argparse.Namespace) -> bool:
+    statuses: List[int] = []
+    runner = await serve(make_feed(0, args.entries), args.port, statuses)
+    print("cache hits/misses and parsed feeds per run")
+    try:
+        results = [
+            await check(f"http://127.0.0.1:{args.port}/{validator}.xml", streaming, statuses)
+            for validator in ("etag", "last-modified")
+            for streaming in (False, True)
+        ]
+    finally:
+        await runner.cleanup()
+    return all(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=200, help="Записей в ленте")
+    parser.add_argument("--port", type=int, default=8779)
+    args = parser.parse_args()
+    if not asyncio.run(run(args)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Бенчмарк разбора лент: в событийном цикле против пула процессов.
+Помимо общего времени измеряется максимальная задержка событийного цикла,
+то есть насколько разбор тормозит параллельные загрузки.
+
+Запуск из корня проекта:
+    python -m benchmarks.feed_parsing --feeds 200 --entries 100
+    python -m benchmarks.feed_parsing --recorded path/to/feeds/*.xml
+"""
+import argparse
+import asyncio
+import glob
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
+from tools.feed_parsing import FeedParserPool
+
+
+def make_feed(index: int, entries: int, step_minutes: float = 1.0) -> bytes:
+    """
+    Синтетическая RSS-лента в формате BBC; записи идут от новых к старым через step_minutes минут.
+    """
+    now = datetime.now(timezone.utc)
+    items = []
+    for i in range(entries):
+        items.append(
+            f"<item><title>{escape(f'Feed {index} story {i}')}</title>"
+            f"<description>{escape('<p>' + 'Lorem ipsum dolor sit amet. ' * 8 + '</p>')}</description>"
+            f"<link>https://example.com/{index}/{i}</link>"
+            f"<guid isPermaLink=\"false\">{index}-{i}</guid>"
+            f"<pubDate>{format_datetime(now - timedelta(minutes=i * step_minutes))}</pubDate></item>"
+        )
+    return (
+        f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+        f"<title>Feed {index}</title><link>https://example.com/</link>{''.join(items)}</channel></rss>"
+    ).encode("utf-8")
+
+
+async def measure(payloads: list, workers: int) -> tuple:
+    max_lag = 0.0
+    running = True
+
+    async def ticker():
+        nonlocal max_lag
+        while running:
+            started = time.perf_counter()
+            await asyncio.sleep(0.005)
+            max_lag = max(max_lag, time.perf_counter() - started - 0.005)
+
+    tick = asyncio.create_task(ticker())
+    with FeedParserPool(workers) as pool:
+        # Прогрев процессов, чтобы не учитывать их запуск
+        await pool.parse(payloads[0])
+        started = time.perf_counter()
+        feeds = await asyncio.gather(*(pool.parse(payload) for payload in payloads))
+        elapsed = time.perf_counter() - started
+    running = False
+    await tick
+    return elapsed, max_lag, sum(len(feed["entries"]) for feed in feeds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--feeds", type=int, default=200)
+    parser.add_argument("--entries", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=None, help="Процессов в пуле (по умолчанию — число CPU)")
+    parser.add_argument("--recorded", nargs="*", help="Файлы с записанными лентами вместо синтетических")
+    args = parser.parse_args()
+
+    if args.recorded:
+        payloads = []
+        for pattern in args.recorded:
+            for path in glob.glob(pattern):
+                with open(path, "rb") as file:
+                    payloads.append(file.read())
+    else:
+        payloads = [make_feed(i, args.entries) for i in range(args.feeds)]
+
+    workers = args.workers or os.cpu_count() or 1
+    size = sum(len(payload) for payload in payloads) / 1e6
+    print(f"feeds={len(payloads)} size={size:.1f} MB workers={workers}")
+    for label, pool_workers in (("in-loop", 0), ("pooled", workers)):
+        elapsed, lag, entries = asyncio.run(measure(payloads, pool_workers))
+        print(f"  {label:8s} {elapsed:.2f}s, {entries / elapsed:.0f} entries/s, max loop lag {lag * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
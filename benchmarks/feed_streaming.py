@@ -0,0 +1,104 @@
+"""
+Бенчмарк потокового разбора больших лент: CollectorAgent.tool_fetch_rss с полной
+загрузкой и feedparser против потокового XMLPullParser с остановкой на окне дат.
+Ленты раздаёт http.server в отдельном процессе (чтобы его буферы не попадали
+в замер памяти); записи идут от новых к старым с шагом
+--step-minutes, поэтому в окно «сегодня» попадает лишь начало архивной ленты.
+Для каждого режима выводятся время, пик памяти Python (tracemalloc) и количество
+собранных новостей; результаты обоих режимов должны совпадать.
+
+Запуск из корня проекта:
+    python -m benchmarks.feed_streaming --entries 20000
+    python -m benchmarks.feed_streaming --recorded path/to/feeds/*.xml --days-ago 3
+"""
+import argparse
+import asyncio
+import glob
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from agents.collector import CollectorAgent
+from benchmarks.feed_parsing import make_feed
+from tools.fetcher import FeedFetcher
+
+
+def serve(directory: str, port: int) -> subprocess.Popen:
+    """
+    Запускает http.server в отдельном процессе и ждёт, пока он начнёт принимать соединения.
+    """
+    server = subprocess.Popen(
+        [sys.executable, "-m", "http.server", str(port), "--bind", "127.0.0.1", "--directory", directory],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    return server
+
+
+async def measure(url: str, streaming: bool, days_ago: int) -> tuple:
+    collector = CollectorAgent(region="World", source_urls=[url], days_ago=days_ago, streaming=streaming)
+    async with FeedFetcher() as fetcher:
+        # Прогрев соединения и импортов, чтобы не учитывать их в замерах
+        await fetcher.fetch(url)
+        started = time.perf_counter()
+        items = await collector.tool_fetch_rss(url, fetcher)
+        elapsed = time.perf_counter() - started
+        # tracemalloc сильно замедляет feedparser, поэтому память меряется отдельным прогоном
+        tracemalloc.start()
+        await collector.tool_fetch_rss(url, fetcher)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return elapsed, peak, items
+
+
+async def run(args: argparse.Namespace) -> None:
+    if args.recorded:
+        payloads = []
+        for path in sorted(p for pattern in args.recorded for p in glob.glob(pattern)):
+            with open(path, "rb") as file:
+                payloads.append(file.read())
+    else:
+        payloads = [make_feed(0, args.entries, step_minutes=args.step_minutes)]
+    with tempfile.TemporaryDirectory() as directory:
+        for index, payload in enumerate(payloads):
+            with open(os.path.join(directory, f"{index}.xml"), "wb") as file:
+                file.write(payload)
+        server = serve(directory, args.port)
+        try:
+            for index, payload in enumerate(payloads):
+                url = f"http://127.0.0.1:{args.port}/{index}.xml"
+                print(f"feed {index}: {len(payload) / 2 ** 20:.1f} MB")
+                results = {}
+                for label, streaming in (("feedparser", False), ("streaming", True)):
+                    elapsed, peak, items = await measure(url, streaming, args.days_ago)
+                    results[label] = items
+                    print(f"  {label:10s} {elapsed:7.3f}s  peak {peak / 2 ** 20:7.1f} MB  items {len(items)}")
+                match = [item["url"] for item in results["feedparser"]] == [item["url"] for item in results["streaming"]]
+                print(f"  same items: {match}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=20000, help="Записей в синтетической ленте")
+    parser.add_argument("--step-minutes", type=float, default=5.0, help="Интервал между записями синтетической ленты")
+    parser.add_argument("--recorded", nargs="+", help="Записанные ленты (*.xml) вместо синтетической")
+    parser.add_argument("--days-ago", type=int, default=0, help="Окно сбора в днях")
+    parser.add_argument("--port", type=int, default=8774)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Профиль времени импорта точек входа и защита от регрессий старта.
+Каждый модуль импортируется в чистом интерпретаторе с -X importtime; скрипт
+выводит самые тяжёлые зависимости и завершается с кодом 1, если при импорте
+загрузилась библиотека, которая должна подгружаться лениво, или время импорта
+превысило порог.
+
+Запуск из корня проекта:
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --module daemon --max-ms 800 --top 20
+"""
+import argparse
+import subprocess
+import sys
+
+# Библиотеки, которые загружаются только при первом использовании
+# (LLM, Telegram, разбор и загрузка лент, .env)
+LAZY_MODULES = ["pydantic_ai", "openai", "telegram", "feedparser", "aiohttp", "dotenv"]
+
+
+def profile_import(module: str) -> tuple:
+    """
+    Импортирует модуль в отдельном процессе.
+
+    :param module: Имя модуля.
+    :return: Общее время импорта в мс, список (время в мс, модуль) и множество загруженных модулей.
+    """
+    code = f"import sys, {module}; print(' '.join(sorted(sys.modules)))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = []
+    total_ms = 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        name = name.rstrip()
+        ms = int(cumulative) / 1000
+        timings.append((ms, name.strip()))
+        # Модули верхнего уровня записаны без отступа
+        if name.strip() == module:
+            total_ms = ms
+    return total_ms, timings, set(result.stdout.split())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--module", action="append", help="Модуль для проверки (по умолчанию main и daemon)")
+    parser.add_argument("--max-ms", type=float, default=None, help="Допустимое время импорта одного модуля")
+    parser.add_argument("--top", type=int, default=10, help="Сколько самых тяжёлых импортов показать")
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.module or ["main", "daemon"]:
+        # Первый запуск прогревает кеш байткода, чтобы не учитывать компиляцию
+        profile_import(module)
+        total_ms, timings, loaded = profile_import(module)
+        eager = [name for name in LAZY_MODULES if name in loaded]
+        print(f"{module}: {total_ms:.0f} ms")
+        for ms, name in sorted(timings, reverse=True)[1:args.top + 1]:
+            print(f"  {ms:8.1f} ms  {name}")
+        if eager:
+            print(f"  FAIL: imported eagerly: {', '.join(eager)}")
+            failed = True
+        if args.max_ms is not None and total_ms > args.max_ms:
+            print(f"  FAIL: import time {total_ms:.0f} ms exceeds {args.max_ms:.0f} ms")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
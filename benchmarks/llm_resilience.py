@@ -0,0 +1,127 @@
+"""
+Проверка слоя LLMLimiter на локальном фейковом сервере OpenAI.
+Сервер отвечает на /v1/chat/completions с настраиваемой задержкой, долей
+ответов 429 (с заголовком retry-after-ms) и 500, а также «хвостом» медленных
+ответов. Один и тот же набор запросов прогоняется без повторов, с повторами
+и с хеджированием; выводятся доля успешных вызовов, перцентили задержки,
+количество повторов и хеджирующих запросов.
+
+Запуск из корня проекта:
+    python -m benchmarks.llm_resilience --calls 200 --rate-limited 0.2 --errors 0.05 --tail 0.05
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from aiohttp import web
+from tools.llm import LLMLimiter, build_agent, run_agent
+from tools.metrics import METRICS
+
+
+def make_app(latency: float, tail: float, tail_latency: float, rate_limited: float, errors: float) -> web.Application:
+    async def completions(request: web.Request) -> web.Response:
+        body = await request.json()
+        roll = random.random()
+        if roll < rate_limited:
+            return web.json_response(
+                {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                status=429,
+                headers={"retry-after-ms": "200"},
+            )
+        if roll < rate_limited + errors:
+            return web.json_response({"error": {"message": "Internal error", "type": "server_error"}}, status=500)
+        await asyncio.sleep(tail_latency if random.random() < tail else random.uniform(0.5, 1.5) * latency)
+        return web.json_response({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "1. ok"}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 100, "completion_tokens": 10, "total_tokens": 110},
+        })
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", completions)
+    return app
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+async def measure(agent, label: str, limiter: LLMLimiter, calls: int) -> None:
+    METRICS.reset()
+    latencies = []
+    failures = 0
+
+    async def one(i: int) -> None:
+        nonlocal failures
+        started = time.perf_counter()
+        try:
+            await run_agent(
+                agent,
+                f"request {i}",
+                model_name="gpt-3.5-turbo",
+                system_prompt="You are a test model.",
+                limiter=limiter,
+                agent_name=label,
+            )
+            latencies.append(time.perf_counter() - started)
+        except Exception:
+            failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    elapsed = time.perf_counter() - started
+    stats = METRICS.agent(label)
+    print(
+        f"  {label:10s} ok {len(latencies)}/{calls} in {elapsed:.1f}s, "
+        f"p50 {percentile(latencies, 0.5):.2f}s p95 {percentile(latencies, 0.95):.2f}s "
+        f"p99 {percentile(latencies, 0.99):.2f}s, retries {stats.llm_retries}, "
+        f"timeouts {stats.llm_timeouts}, hedges {stats.llm_hedges}"
+    )
+
+
+async def run(args: argparse.Namespace) -> None:
+    runner = web.AppRunner(make_app(args.latency, args.tail, args.tail_latency, args.rate_limited, args.errors))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", args.port)
+    await site.start()
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+    print(
+        f"calls={args.calls} latency={args.latency}s tail={args.tail:.0%}x{args.tail_latency}s "
+        f"429={args.rate_limited:.0%} 500={args.errors:.0%}"
+    )
+    # Один клиент на все сценарии, как у агентов конвейера
+    agent = build_agent("gpt-3.5-turbo", "You are a test model.")
+    common = dict(max_concurrency=args.concurrency, base_delay=0.1, max_delay=2.0, timeout=args.tail_latency * 2)
+    try:
+        random.seed(0)
+        await measure(agent, "no-retry", LLMLimiter(max_retries=0, **common), args.calls)
+        random.seed(0)
+        await measure(agent, "retry", LLMLimiter(**common), args.calls)
+        random.seed(0)
+        await measure(agent, "hedged", LLMLimiter(hedge_after=args.latency * 3, **common), args.calls)
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.2, help="Типичная задержка ответа в секундах")
+    parser.add_argument("--tail", type=float, default=0.05, help="Доля медленных ответов")
+    parser.add_argument("--tail-latency", type=float, default=3.0, help="Задержка медленного ответа")
+    parser.add_argument("--rate-limited", type=float, default=0.2, help="Доля ответов 429")
+    parser.add_argument("--errors", type=float, default=0.05, help="Доля ответов 500")
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Бенчмарк MinHash/LSH против попарного сравнения шинглов.
+
+Запуск из корня проекта:
+    python -m benchmarks.minhash --items 2000
+"""
+import argparse
+import random
+import time
+from tools.minhash import MinHashLSH, shingles
+
+WORDS = (
+    "government minister election president army police court market economy bank oil gas war peace "
+    "talks summit climate storm fire flood city country border trade tariff deal report official "
+    "investigation protest strike vote parliament leader company shares prices growth inflation"
+).split()
+SUFFIXES = ["", " - Reuters", " (AP)", " | BBC News", " Read more."]
+
+
+def make_corpus(n: int, copies: int, seed: int = 42) -> list:
+    """
+    Генерирует корпус, где каждая исходная история повторяется copies раз с мелкими правками.
+    """
+    rng = random.Random(seed)
+    corpus = []
+    while len(corpus) < n:
+        story = [rng.choice(WORDS) for _ in range(40)]
+        for _ in range(copies):
+            edited = list(story)
+            for _ in range(rng.randint(0, 3)):
+                edited[rng.randrange(len(edited))] = rng.choice(WORDS)
+            corpus.append(" ".join(edited) + rng.choice(SUFFIXES))
+    return corpus[:n]
+
+
+def brute_force_pairs(texts: list, threshold: float) -> set:
+    sets = [set(shingles(text).tolist()) for text in texts]
+    pairs = set()
+    for i in range(len(sets)):
+        for j in range(i + 1, len(sets)):
+            if len(sets[i] & sets[j]) / len(sets[i] | sets[j]) >= threshold:
+                pairs.add((i, j))
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--copies", type=int, default=4)
+    parser.add_argument("--threshold", type=float, default=0.6)
+    parser.add_argument("--num-perm", type=int, default=128)
+    args = parser.parse_args()
+
+    texts = make_corpus(args.items, args.copies)
+
+    started = time.perf_counter()
+    index = MinHashLSH(threshold=args.threshold, num_perm=args.num_perm)
+    for text in texts:
+        index.add(text)
+    lsh_pairs = {(i, j) for i, j in index.candidate_pairs() if index.similarity(i, j) >= args.threshold}
+    lsh_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    exact_pairs = brute_force_pairs(texts, args.threshold)
+    brute_time = time.perf_counter() - started
+
+    found = len(lsh_pairs & exact_pairs)
+    print(f"items={len(texts)} bands={index.bands} rows={index.rows}")
+    print(f"minhash/lsh: {lsh_time:.3f}s, {len(lsh_pairs)} pairs")
+    print(f"brute force: {brute_time:.3f}s, {len(exact_pairs)} pairs")
+    print(f"recall={found / len(exact_pairs) if exact_pairs else 1.0:.3f} "
+          f"precision={found / len(lsh_pairs) if lsh_pairs else 1.0:.3f} "
+          f"speedup={brute_time / lsh_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
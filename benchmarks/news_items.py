@@ -0,0 +1,87 @@
+"""
+Микробенчмарк создания NewsItem: по одному объекту против пакетной валидации через TypeAdapter.
+Кроме корректных записей проверяются пакеты с некорректными: одна запись с неверным URL
+и доля записей без заголовка или описания (как у записей parse_feed с title/summary=None).
+
+Запуск из корня проекта:
+    python -m benchmarks.news_items --items 20000
+"""
+import argparse
+import gc
+import time
+from datetime import datetime
+from pydantic import ValidationError
+from data_models import NewsDigest, NewsItem, validate_news_items
+
+
+def make_records(n: int) -> list:
+    now = datetime.now()
+    return [
+        {
+            "source": "BBC News",
+            "title": f"Story {i}",
+            "description": "Lorem ipsum dolor sit amet. " * 4,
+            "date": now,
+            "region": "World",
+            "url": f"https://www.bbc.co.uk/news/world-{i}",
+            "tags": [],
+            "category": None,
+            "language": None,
+            "sentiment": None,
+        }
+        for i in range(n)
+    ]
+
+
+def one_by_one(records: list) -> list:
+    items = []
+    for record in records:
+        try:
+            items.append(NewsItem(**record))
+        except ValidationError:
+            pass
+    return items
+
+
+def rate(n: int, fn) -> float:
+    best = float("inf")
+    for _ in range(5):
+        # Сборка мусора от предыдущего прогона не должна попадать в замер
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return n / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=20000)
+    parser.add_argument("--missing", type=float, default=0.05, help="Доля записей без заголовка и описания")
+    args = parser.parse_args()
+
+    records = make_records(args.items)
+    items, _ = validate_news_items(records)
+    print(f"items={args.items}")
+    print(f"  NewsDigest(items=...) copy: {rate(args.items, lambda: NewsDigest(date_generated=datetime.now(), items=items, summary='s')):.0f} items/s")
+    step = max(1, round(1 / args.missing))
+    cases = [
+        ("valid", records),
+        ("one invalid URL", records[:-1] + [{**records[-1], "url": "not a url"}]),
+        (f"{args.missing:.0%} without title/summary", [
+            {**record, "title": None, "description": None} if i % step == 0 else record
+            for i, record in enumerate(records)
+        ]),
+    ]
+    for label, batch in cases:
+        kept, errors = validate_news_items(batch)
+        assert len(kept) == len(one_by_one(batch)) and len(kept) + len(errors) == len(batch)
+        single = rate(args.items, lambda: one_by_one(batch))
+        batched = rate(args.items, lambda: validate_news_items(batch))
+        print(
+            f"  {label:28s} one by one {single:.0f} items/s, batch {batched:.0f} items/s "
+            f"({batched / single:.2f}x), {len(errors)} rejected"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Проверка PublisherAgent на локальном фейковом сервере Bot API.
+Сервер принимает sendMessage, с заданной вероятностью отвечает 429 с retry_after
+и записывает время каждого сообщения. Длинный дайджест публикуется трижды:
+первый раз, повторно тот же объект и заново собранный из тех же новостей
+(с новым временем генерации, как при повторном запуске); оба повтора должны
+пропустить всё благодаря журналу отправленных сообщений. Часть чатов может
+«переехать» в супергруппу: сервер отвечает на старый идентификатор ошибкой
+migrate_to_chat_id, и все части должны дойти до нового чата без дублей.
+Выводятся время, количество частей, повторы, дубли на стороне сервера и
+максимальная наблюдаемая частота сообщений (на чат и общая).
+
+Запуск из корня проекта:
+    python -m benchmarks.publisher --chats 20 --length 10000 --rate-limited 0.1 --migrated 0.2
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, Optional
+from aiohttp import web
+from agents.publisher import PublisherAgent
+from data_models import NewsDigest, NewsItem
+from tools.delivery import SentLog
+from tools.metrics import METRICS
+
+
+class FakeBotAPI:
+    def __init__(self, rate_limited: float, retry_after: int, migrations: Optional[Dict[str, str]] = None):
+        self.rate_limited = rate_limited
+        self.retry_after = retry_after
+        self.migrations = migrations or {}
+        self.messages = []
+
+    async def send_message(self, request: web.Request) -> web.Response:
+        if request.content_type == "application/json":
+            params = await request.json()
+        else:
+            params = dict(await request.post())
+        if random.random() < self.rate_limited:
+            return web.json_response({
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {self.retry_after}",
+                "parameters": {"retry_after": self.retry_after},
+            }, status=429)
+        chat_id, text = str(params["chat_id"]), str(params["text"])
+        if chat_id in self.migrations:
+            return web.json_response({
+                "ok": False,
+                "error_code": 400,
+                "description": "Bad Request: group chat was upgraded to a supergroup chat",
+                "parameters": {"migrate_to_chat_id": int(self.migrations[chat_id])},
+            }, status=400)
+        self.messages.append((time.monotonic(), chat_id, text))
+        return web.json_response({"ok": True, "result": {
+            "message_id": len(self.messages),
+            "date": int(time.time()),
+            "chat": {"id": int(chat_id), "type": "group", "title": "test"},
+            "text": text,
+        }})
+
+    def max_rate(self, window: float, per_chat: bool) -> int:
+        """
+        Максимальное количество сообщений в одном скользящем окне.
+        """
+        groups = defaultdict(list)
+        for sent_at, chat_id, _ in self.messages:
+            groups[chat_id if per_chat else None].append(sent_at)
+        best = 0
+        for times in groups.values():
+            start = 0
+            for end in range(len(times)):
+                while times[end] - times[start] >= window:
+                    start += 1
+                best = max(best, end - start + 1)
+        return best
+
+
+async def run(args: argparse.Namespace) -> None:
+    random.seed(0)
+    chats = [str(-1000000000 - i) for i in range(args.chats)]
+    migrations = {chat: str(-1009000000000 - i) for i, chat in enumerate(chats[:round(args.chats * args.migrated)])}
+    api = FakeBotAPI(args.rate_limited, args.retry_after, migrations)
+    app = web.Application()
+    app.router.add_post("/bot{token}/sendMessage", api.send_message)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.port).start()
+
+    summary = "\n".join(f"{i + 1}. News item number {i + 1} with a short summary." for i in range(args.length // 45))
+    items = [
+        NewsItem(
+            source="Example News",
+            title=f"News item number {i + 1}",
+            description="",
+            date=datetime.now(),
+            region="World",
+            url=f"https://example.com/news/{i + 1}",
+        )
+        for i in range(args.length // 45)
+    ]
+
+    def build_digest() -> NewsDigest:
+        return NewsDigest(date_generated=datetime.now(), items=items, summary=summary, region="World")
+
+    digest = build_digest()
+    with tempfile.TemporaryDirectory() as directory:
+        sent_log = SentLog(os.path.join(directory, "sent.sqlite3"))
+        publisher = PublisherAgent(
+            telegram_bot_token="123:fake",
+            chat_ids=chats,
+            api_base_url=f"http://127.0.0.1:{args.port}/bot",
+            max_concurrency=args.concurrency,
+            sent_log=sent_log,
+        )
+        try:
+            for label, current in (("first", digest), ("repeat", digest), ("rebuilt", build_digest())):
+                METRICS.reset()
+                started = time.perf_counter()
+                report = await publisher.process(current)
+                elapsed = time.perf_counter() - started
+                sent, skipped, failed, retries, migrated = (
+                    int(METRICS.counter(metric, agent=publisher.name))
+                    for metric in ("messages_sent", "messages_skipped", "messages_failed", "send_retries", "chat_migrations")
+                )
+                print(
+                    f"  {label:7s} {elapsed:.1f}s, chats {Counter(report.values())}, sent {sent}, "
+                    f"skipped {skipped}, failed {failed}, retries {retries}, migrated {migrated}"
+                )
+        finally:
+            sent_log.close()
+            await runner.cleanup()
+
+    # Первая часть содержит время генерации, поэтому дубли считаются без первой строки
+    duplicates = sum(
+        count - 1 for count in Counter((chat, text.split("\n", 1)[-1]) for _, chat, text in api.messages).values()
+    )
+    receivers = {chat for _, chat, _ in api.messages}
+    print(
+        f"  server: {len(api.messages)} messages to {len(receivers)} chats "
+        f"({len(receivers & set(migrations.values()))} migrated), {duplicates} duplicates, "
+        f"max {api.max_rate(60.0, per_chat=True)}/min per chat, max {api.max_rate(1.0, per_chat=False)}/s overall"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chats", type=int, default=20)
+    parser.add_argument("--length", type=int, default=10000, help="Длина дайджеста в символах")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate-limited", type=float, default=0.1, help="Доля ответов 429")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--migrated", type=float, default=0.2, help="Доля чатов, переехавших в супергруппу")
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+    print(f"chats={args.chats} length={args.length} 429={args.rate_limited:.0%}")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
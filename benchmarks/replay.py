@@ -0,0 +1,418 @@
+"""
+Офлайн-прогон всего конвейера на записанных или синтетических лентах.
+Ленты раздаются локальным HTTP-сервером, LLM заменяется детерминированной
+FunctionModel с настраиваемой задержкой, Telegram — фейковым Bot API, а
+эмбеддинги — хешированием токенов (без загрузки моделей). Каждый размер
+прогоняется в отдельном процессе; выводятся пропускная способность, перцентили
+длительности по стадиям и пиковая память. Результаты можно сохранить как
+базовую линию и сравнивать с ней последующие прогоны.
+
+Запуск из корня проекта:
+    python -m benchmarks.replay --record recorded/               # записать живые ленты из RSS_SOURCES
+    python -m benchmarks.replay --recorded recorded/             # прогнать записанные ленты
+    python -m benchmarks.replay --sizes 10 1000 50000 --save-baseline baseline.json
+    python -m benchmarks.replay --sizes 10 1000 --baseline baseline.json --tolerance 0.2
+"""
+import argparse
+import asyncio
+import contextlib
+import glob
+import io
+import json
+import os
+import random
+import re
+import resource
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import zlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from typing import Any, Dict, List, Optional
+from xml.sax.saxutils import escape
+import numpy as np
+from aiohttp import web
+from benchmarks.publisher import FakeBotAPI
+from tools.embeddings import Embedder
+
+REGIONS = ["World", "Asia", "Europe", "Africa"]
+VOCABULARY = (
+    "government minister election vote parliament president court ruling police protest economy market "
+    "inflation bank rates trade deal tariff energy oil gas climate storm flood fire earthquake border "
+    "military troops ceasefire talks summit leaders agreement sanctions exports growth jobs strike union "
+    "health hospital vaccine outbreak school students university research scientists space mission launch "
+    "company shares profit merger technology software data privacy cyber attack hackers football match "
+    "final season coach record championship city capital village region province coast island river "
+    "bridge railway airport flights passengers tourists festival museum campaign opposition coalition "
+    "budget tax reform pension housing prices rent water drought harvest farmers food aid refugees"
+).split()
+# Метрики, по которым прогон сравнивается с базовой линией: больше — лучше или хуже
+HIGHER_IS_BETTER = ("throughput",)
+LOWER_IS_BETTER = ("peak_rss_mb", "tracemalloc_peak_mb")
+
+
+class HashingModel:
+    """
+    Детерминированная замена SentenceTransformer: мешок слов, хешированный в вектор фиксированной длины.
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def encode(self, texts: List[str], **options: Any) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in re.findall(r"\w+", text.lower()):
+                vectors[row, zlib.crc32(token.encode("utf-8")) % self.dim] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+class HashingEmbedder(Embedder):
+    def __init__(self, cache_path: str, dim: int = 256):
+        super().__init__(model_name=f"hashing-{dim}", cache_path=cache_path)
+        self._model = HashingModel(dim)
+
+
+def make_feeds(size: int, per_feed: int, duplicates: float, seed: int = 0) -> List[bytes]:
+    """
+    Синтетические RSS-ленты общим объёмом size записей.
+    Доля duplicates записей повторяет текст более ранних записей (перепечатки).
+    """
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    records = []
+    for _ in range(size):
+        if records and rng.random() < duplicates:
+            records.append(rng.choice(records))
+            continue
+        title = " ".join(rng.choices(VOCABULARY, k=rng.randint(6, 12))).capitalize()
+        description = " ".join(
+            " ".join(rng.choices(VOCABULARY, k=rng.randint(8, 16))).capitalize() + "." for _ in range(rng.randint(2, 4))
+        )
+        records.append((title, description))
+
+    feeds = []
+    for start in range(0, size, per_feed):
+        items = []
+        for i in range(start, min(size, start + per_feed)):
+            title, description = records[i]
+            items.append(
+                f"<item><title>{escape(title)}</title>"
+                f"<description>{escape('<p>' + description + '</p>')}</description>"
+                f"<link>https://example.com/news/{i}</link>"
+                f"<pubDate>{format_datetime(now - timedelta(seconds=i % 3600))}</pubDate></item>"
+            )
+        feeds.append((
+            f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+            f"<title>Feed {start // per_feed}</title><link>https://example.com/</link>{''.join(items)}</channel></rss>"
+        ).encode("utf-8"))
+    return feeds
+
+
+def make_llm(latency: float, token_latency: float, system_prompt: str, result_type: Any) -> Any:
+    """
+    Агент pydantic-ai на детерминированной FunctionModel.
+    Задержка ответа: latency + token_latency на каждый (оценочный) токен ответа.
+    Менеджеру возвращаются кластеры из входных ID (каждая пятая новость сливается со следующей),
+    при объединении пачек — группы историй с одинаковыми заголовками,
+    писателю — нумерованный список по строкам промпта.
+    """
+    from pydantic_ai import Agent
+    from pydantic_ai.messages import ModelResponse, TextPart, ToolCallPart
+    from pydantic_ai.models.function import FunctionModel
+    from tools.batching import estimate_tokens
+
+    async def respond(messages: list, info: Any) -> Any:
+        prompt = messages[-1].parts[-1].content
+        if info.result_tools:
+            titles = {int(i): title for i, title in re.findall(r"^\[(\d+)\] .*?Title: (.*?), Description:", prompt, re.M)}
+            clusters = []
+            ids = sorted(titles)
+            skip = set()
+            for i in ids:
+                if i in skip:
+                    continue
+                members = [i, i + 1] if i % 5 == 0 and i + 1 in titles else [i]
+                skip.update(members)
+                clusters.append({"ids": members, "title": titles[i], "description": f"Summary of {titles[i]}.", "tags": ["news"]})
+            if not titles:
+                # Объединение историй из разных пачек: в промпте только «[ID] заголовок»
+                groups: Dict[str, List[int]] = {}
+                for i, title in re.findall(r"^\[(\d+)\] (.*)$", prompt, re.M):
+                    groups.setdefault(title, []).append(int(i))
+                clusters = [
+                    {"ids": members, "title": title, "description": f"Summary of {title}.", "tags": ["news"]}
+                    for title, members in groups.items() if len(members) > 1
+                ]
+            arguments = {"response": clusters}
+            part = ToolCallPart.from_raw_args(info.result_tools[0].name, arguments)
+            output = json.dumps(arguments)
+        else:
+            lines = [line for line in prompt.splitlines() if line.strip()][:20]
+            output = "\n".join(f"{i + 1}. {line[:80]}" for i, line in enumerate(lines))
+            part = TextPart(output)
+        await asyncio.sleep(latency + token_latency * estimate_tokens(output))
+        return ModelResponse(parts=[part])
+
+    return Agent(FunctionModel(respond), result_type=result_type, system_prompt=system_prompt)
+
+
+async def serve(payloads: List[bytes], bot_api: FakeBotAPI, port: int) -> web.AppRunner:
+    """
+    Локальный сервер: ленты по адресу /feeds/<номер> и фейковый Bot API.
+    """
+    async def feed(request: web.Request) -> web.Response:
+        return web.Response(body=payloads[int(request.match_info["index"])], content_type="application/rss+xml")
+
+    app = web.Application()
+    app.router.add_get("/feeds/{index}", feed)
+    app.router.add_post("/bot{token}/sendMessage", bot_api.send_message)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+async def replay(payloads: List[bytes], args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Прогоняет сбор и конвейер на лентах и возвращает результаты измерений.
+    """
+    import main
+    from agents.manager import REDUCE_PROMPT
+    from agents.manager import SYSTEM_PROMPT as MANAGER_PROMPT
+    from agents.writer import SYSTEM_PROMPT as WRITER_PROMPT
+    from data_models import NewsCluster
+    from tools.feed_parsing import FeedParserPool
+    from tools.fetcher import FeedFetcher
+    from tools.llm import LLMLimiter
+    from tools.metrics import METRICS
+
+    bot_api = FakeBotAPI(rate_limited=0.0, retry_after=1)
+    runner = await serve(payloads, bot_api, args.port)
+    sources = [
+        {"region": REGIONS[i % len(REGIONS)], "url": f"http://127.0.0.1:{args.port}/feeds/{i}", "days_ago": args.days_ago}
+        for i in range(len(payloads))
+    ]
+    os.environ.update(TELEGRAM_BOT_TOKEN="123:fake", TELEGRAM_CHAT_ID="-100")
+    os.environ["TELEGRAM_API_BASE_URL"] = f"http://127.0.0.1:{args.port}/bot"
+    METRICS.reset()
+    try:
+        # Все ленты раздаются с одного хоста, поэтому лимит на хост не должен быть узким местом
+        async with FeedFetcher(max_concurrency=main.FETCH_MAX_CONCURRENCY, per_host_limit=main.FETCH_MAX_CONCURRENCY) as fetcher:
+            with FeedParserPool(main.parser_workers(len(sources))) as parser_pool:
+                services = main.build_services(fetcher, parser_pool, HashingEmbedder(".embedding_cache.sqlite3"))
+                services.enricher.spacy_model = args.spacy_model
+                services.enricher.use_keywords = False
+                limiter = LLMLimiter(max_concurrency=args.llm_concurrency, requests_per_minute=None, tokens_per_minute=None)
+                services.manager.llm_limiter = limiter
+                services.writer.llm_limiter = limiter
+                services.manager._agent = make_llm(args.llm_latency, args.llm_token_latency, MANAGER_PROMPT, List[NewsCluster])
+                services.manager._reduce_agent = make_llm(args.llm_latency, args.llm_token_latency, REDUCE_PROMPT, List[NewsCluster])
+                services.writer._agent = make_llm(args.llm_latency, args.llm_token_latency, WRITER_PROMPT, str)
+                try:
+                    started = time.perf_counter()
+                    collectors = main.make_collectors(services, sources)
+                    batches = await asyncio.gather(*(collector.process() for collector in collectors))
+                    collected = [item for batch in batches for item in batch]
+                    collected_at = time.perf_counter()
+                    pipeline = await main.run_digest(services, collected, collected)
+                    finished = time.perf_counter()
+                finally:
+                    services.close()
+    finally:
+        await runner.cleanup()
+
+    agents = METRICS.snapshot()["agents"]
+    return {
+        "size": sum(payload.count(b"<item>") + payload.count(b"<entry>") for payload in payloads),
+        "collected": len(collected),
+        "messages_sent": len(bot_api.messages),
+        "elapsed": round(finished - started, 3),
+        "collect_seconds": round(collected_at - started, 3),
+        "throughput": round(len(collected) / (finished - started), 1) if finished > started else 0.0,
+        "stages": {
+            name: {key: agent["duration_seconds"][key] for key in ("count", "p50", "p95", "p99")}
+            for name, agent in agents.items()
+        },
+        "pipeline": {name: {"items_in": stats["items_in"], "items_out": stats["items_out"]} for name, stats in pipeline.report().items()},
+        "llm_requests": sum(agent["llm_requests"] for agent in agents.values()),
+    }
+
+
+def run_child(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Один прогон в текущем процессе (вызывается в дочернем процессе для каждого размера).
+    """
+    if args.recorded:
+        payloads = []
+        for path in sorted(glob.glob(os.path.join(args.recorded, "*.xml"))):
+            with open(path, "rb") as file:
+                payloads.append(file.read())
+    else:
+        payloads = make_feeds(args.child, args.per_feed, args.duplicates)
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        # Конвейер печатает ход работы; в отчёт он не нужен
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = asyncio.run(replay(payloads, args))
+    if args.tracemalloc:
+        result["tracemalloc_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 1)
+        tracemalloc.stop()
+    # ru_maxrss в Linux измеряется в килобайтах
+    result["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return result
+
+
+def record(directory: str) -> None:
+    """
+    Сохраняет текущие ленты из RSS_SOURCES для последующего воспроизведения.
+    """
+    import main
+    from tools.fetcher import FeedFetcher
+
+    async def fetch_all() -> list:
+        async with FeedFetcher() as fetcher:
+            return await fetcher.fetch_many([source["url"] for source in main.RSS_SOURCES])
+
+    os.makedirs(directory, exist_ok=True)
+    for i, result in enumerate(asyncio.run(fetch_all())):
+        if not result.ok:
+            print(f"  skip {result.url}: {result.error or result.status}")
+            continue
+        path = os.path.join(directory, f"{i:03d}.xml")
+        with open(path, "wb") as file:
+            file.write(result.content)
+        print(f"  {result.url} -> {path} ({len(result.content)} bytes)")
+
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], tolerance: float) -> List[str]:
+    """
+    Сравнивает прогон с базовой линией по размерам.
+
+    :return: Список описаний регрессий.
+    """
+    regressions = []
+    previous = {entry["size"]: entry for entry in baseline}
+    for result in results:
+        base = previous.get(result["size"])
+        if base is None:
+            continue
+        for key in HIGHER_IS_BETTER:
+            if key in base and result.get(key, 0) < base[key] * (1 - tolerance):
+                regressions.append(f"size {result['size']}: {key} {result[key]} < baseline {base[key]}")
+        for key in LOWER_IS_BETTER:
+            if key in base and key in result and result[key] > base[key] * (1 + tolerance):
+                regressions.append(f"size {result['size']}: {key} {result[key]} > baseline {base[key]}")
+        for name, stage in result["stages"].items():
+            base_stage = base["stages"].get(name)
+            # Миллисекундные стадии шумят, поэтому сравниваются только заметные длительности
+            if base_stage and stage["p95"] > max(base_stage["p95"] * (1 + tolerance), base_stage["p95"] + 0.01):
+                regressions.append(f"size {result['size']}: {name} p95 {stage['p95']}s > baseline {base_stage['p95']}s")
+    return regressions
+
+
+def print_result(result: Dict[str, Any]) -> None:
+    memory = f"peak RSS {result['peak_rss_mb']} MB"
+    if "tracemalloc_peak_mb" in result:
+        memory += f", tracemalloc peak {result['tracemalloc_peak_mb']} MB"
+    print(
+        f"size={result['size']}: collected {result['collected']} in {result['collect_seconds']}s, "
+        f"total {result['elapsed']}s, {result['throughput']} items/s, "
+        f"{result['llm_requests']} LLM requests, {result['messages_sent']} messages, {memory}"
+    )
+    for name, stage in result["stages"].items():
+        print(f"  {name:18s} calls {stage['count']:6d}  p50 {stage['p50']:.3f}s  p95 {stage['p95']:.3f}s  p99 {stage['p99']:.3f}s")
+
+
+def run_isolated(command: List[str], cwd: str, env: Dict[str, str]) -> tuple:
+    """
+    Запускает дочерний прогон в отдельной группе процессов и после его завершения
+    убивает оставшихся потомков (процессы пула разбора лент): если прогон упал,
+    осиротевшие процессы пула иначе держат открытым вывод и ожидание не заканчивается.
+
+    :return: Код возврата, stdout и stderr.
+    """
+    with tempfile.TemporaryFile("w+") as stdout, tempfile.TemporaryFile("w+") as stderr:
+        process = subprocess.Popen(command, stdout=stdout, stderr=stderr, text=True, cwd=cwd, env=env, start_new_session=True)
+        try:
+            returncode = process.wait()
+        finally:
+            with contextlib.suppress(ProcessLookupError):
+                os.killpg(process.pid, signal.SIGKILL)
+        stdout.seek(0)
+        stderr.seek(0)
+        return returncode, stdout.read(), stderr.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 50000], help="Количество записей в лентах")
+    parser.add_argument("--per-feed", type=int, default=100, help="Записей в одной синтетической ленте")
+    parser.add_argument("--duplicates", type=float, default=0.1, help="Доля перепечаток в синтетических лентах")
+    parser.add_argument("--recorded", help="Каталог с записанными лентами (*.xml) вместо синтетических")
+    parser.add_argument("--record", help="Записать живые ленты из RSS_SOURCES в каталог и выйти")
+    parser.add_argument("--days-ago", type=int, default=0, help="Окно сбора; для старых записей увеличьте")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Базовая задержка ответа модели в секундах")
+    parser.add_argument("--llm-token-latency", type=float, default=0.0002, help="Задержка на токен ответа в секундах")
+    parser.add_argument("--llm-concurrency", type=int, default=8)
+    parser.add_argument("--spacy-model", default="blank:en", help="Модель spaCy для EnricherAgent")
+    parser.add_argument("--tracemalloc", action="store_true", help="Измерять пик памяти Python через tracemalloc (медленнее)")
+    parser.add_argument("--baseline", help="JSON базовой линии для сравнения")
+    parser.add_argument("--save-baseline", help="Сохранить результаты как базовую линию")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Допустимое ухудшение относительно базовой линии")
+    parser.add_argument("--port", type=int, default=8768)
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.record)
+        return
+    if args.child is not None:
+        print(json.dumps(run_child(args)))
+        return
+
+    # Каждый размер — в отдельном процессе, чтобы пик памяти не накапливался между прогонами
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = []
+    for size in ([0] if args.recorded else args.sizes):
+        command = [sys.executable, "-m", "benchmarks.replay", "--child", str(size)]
+        for option in ("per_feed", "duplicates", "recorded", "days_ago", "llm_latency", "llm_token_latency",
+                       "llm_concurrency", "spacy_model", "port"):
+            value: Optional[Any] = getattr(args, option)
+            if value is not None:
+                command += [f"--{option.replace('_', '-')}", str(value)]
+        if args.tracemalloc:
+            command.append("--tracemalloc")
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")]))}
+        returncode, stdout, stderr = run_isolated(command, root, env)
+        if returncode != 0:
+            print(stderr, file=sys.stderr)
+            if returncode == -signal.SIGKILL:
+                print(f"size={size}: child process was killed (most likely out of memory)", file=sys.stderr)
+            sys.exit(1 if returncode < 0 else returncode)
+        result = json.loads(stdout.strip().splitlines()[-1])
+        print_result(result)
+        results.append(result)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+        print(f"Baseline saved to {args.save_baseline}.")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Бенчмарк семантического индекса на большом архиве.
+
+Запуск из корня проекта:
+    python -m benchmarks.vector_index --items 100000 --dim 384
+"""
+import argparse
+import tempfile
+import time
+import numpy as np
+from tools.vector_index import VectorIndex
+
+
+def random_vectors(rng: np.random.Generator, n: int, dim: int) -> np.ndarray:
+    vectors = rng.normal(size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def timed_queries(index: VectorIndex, queries: np.ndarray, **window) -> float:
+    started = time.perf_counter()
+    for query in queries:
+        index.search(query, k=5, **window)
+    return (time.perf_counter() - started) / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--batch", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    now = time.time()
+    with tempfile.TemporaryDirectory() as directory:
+        for use_faiss in (False, True):
+            index = VectorIndex(f"{directory}/faiss-{use_faiss}", use_faiss=use_faiss)
+            started = time.perf_counter()
+            for offset in range(0, args.items, args.batch):
+                n = min(args.batch, args.items - offset)
+                # Архив за последние 90 дней
+                timestamps = now - rng.uniform(0, 90 * 86400, size=n)
+                index.add(random_vectors(rng, n, args.dim), [{"id": offset + i} for i in range(n)], timestamps)
+            add_time = time.perf_counter() - started
+            if use_faiss and index._faiss is None:
+                print("faiss is not installed, skipping faiss run")
+                continue
+
+            queries = random_vectors(rng, args.queries, args.dim)
+            full = timed_queries(index, queries)
+            week = timed_queries(index, queries, since=now - 7 * 86400)
+            reopen_started = time.perf_counter()
+            VectorIndex(index.directory, use_faiss=use_faiss)
+            reopen = time.perf_counter() - reopen_started
+            print(f"backend={'faiss' if use_faiss else 'numpy'} items={index.count} dim={args.dim}")
+            print(f"  add: {add_time:.2f}s ({index.count / add_time:.0f} items/s), reopen: {reopen:.2f}s")
+            print(f"  top-5 query: {full:.2f} ms (all), {week:.2f} ms (last 7 days)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Проверка распределённого сбора через очередь заданий с арендой (SQLiteWorkQueue).
+Локальный сервер раздаёт синтетические ленты с задержкой ответа; для каждого
+количества воркеров запускаются отдельные процессы CollectorAgent.run_worker
+(по одному заданию за раз), которые делят общую очередь и приёмник новостей.
+Перед прогоном «упавший» воркер захватывает несколько заданий и не отвечает —
+их аренда истекает, и задания должны выполнить остальные воркеры.
+Выводятся время, пропускная способность, ускорение относительно одного воркера,
+а также проверка, что все задания выполнены и все новости попали в приёмник.
+
+Запуск из корня проекта:
+    python -m benchmarks.work_queue --feeds 200 --workers 1 2 4 8 --latency 0.2
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from aiohttp import web
+from benchmarks.replay import make_feeds
+from tools.work_queue import SQLiteNewsSink, SQLiteWorkQueue
+
+
+async def serve(payloads: list, latency: float, port: int) -> web.AppRunner:
+    async def feed(request: web.Request) -> web.Response:
+        await asyncio.sleep(latency)
+        return web.Response(body=payloads[int(request.match_info["index"])], content_type="application/rss+xml")
+
+    app = web.Application()
+    app.router.add_get("/feeds/{index}", feed)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+async def run_worker_process(directory: str, worker_id: str, lease_seconds: float) -> None:
+    """
+    Тело дочернего процесса: один воркер с собственным загрузчиком лент.
+    """
+    from agents.collector import CollectorAgent
+    from tools.fetcher import FeedFetcher
+
+    queue = SQLiteWorkQueue(os.path.join(directory, "queue.sqlite3"))
+    sink = SQLiteNewsSink(os.path.join(directory, "sink.sqlite3"))
+    async with FeedFetcher() as fetcher:
+        collector = CollectorAgent(region="", source_urls=[], fetcher=fetcher)
+        await collector.run_worker(queue, sink, worker_id, lease_seconds=lease_seconds, poll_interval=0.1)
+    queue.close()
+    sink.close()
+
+
+async def measure(workers: int, args: argparse.Namespace, expected: int) -> float:
+    with tempfile.TemporaryDirectory() as directory:
+        queue = SQLiteWorkQueue(os.path.join(directory, "queue.sqlite3"))
+        sink = SQLiteNewsSink(os.path.join(directory, "sink.sqlite3"))
+        for i in range(args.feeds):
+            queue.enqueue(f"feed-{i}", {"region": "World", "url": f"http://127.0.0.1:{args.port}/feeds/{i}", "days_ago": 1})
+        # «Упавший» воркер: захватывает задания и больше не продлевает аренду
+        abandoned = [queue.claim("crashed", args.lease) for _ in range(args.crashed)]
+
+        started = time.perf_counter()
+        processes = [
+            await asyncio.create_subprocess_exec(
+                sys.executable, "-m", "benchmarks.work_queue", "--child", directory,
+                "--worker-id", f"worker-{i}", "--lease", str(args.lease),
+            )
+            for i in range(workers)
+        ]
+        await asyncio.gather(*(process.wait() for process in processes))
+        elapsed = time.perf_counter() - started
+
+        counts = queue.counts()
+        items = sink.count()
+        queue.close()
+        sink.close()
+    ok = counts.get("done") == args.feeds and items == expected
+    print(
+        f"  workers={workers:2d} {elapsed:6.2f}s {args.feeds / elapsed:6.1f} feeds/s, "
+        f"jobs {counts}, items {items}/{expected}, reclaimed {len([job for job in abandoned if job])}: "
+        f"{'OK' if ok else 'MISMATCH'}"
+    )
+    return elapsed
+
+
+async def run(args: argparse.Namespace) -> None:
+    payloads = make_feeds(args.feeds * args.per_feed, args.per_feed, duplicates=0.0)
+    runner = await serve(payloads, args.latency, args.port)
+    print(f"feeds={args.feeds} per_feed={args.per_feed} latency={args.latency}s lease={args.lease}s crashed={args.crashed}")
+    try:
+        first = None
+        for workers in args.workers:
+            elapsed = await measure(workers, args, args.feeds * args.per_feed)
+            first = first or elapsed
+            print(f"             speedup x{first / elapsed:.2f} (ideal x{workers / args.workers[0]:.0f})")
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--feeds", type=int, default=200)
+    parser.add_argument("--per-feed", type=int, default=20, help="Записей в одной ленте")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--latency", type=float, default=0.2, help="Задержка ответа сервера лент в секундах")
+    parser.add_argument("--lease", type=float, default=2.0, help="Срок аренды задания в секундах")
+    parser.add_argument("--crashed", type=int, default=3, help="Сколько заданий захватывает «упавший» воркер")
+    parser.add_argument("--port", type=int, default=8773)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--worker-id", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        asyncio.run(run_worker_process(args.child, args.worker_id, args.lease))
+        return
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+import asyncio
+import random
+import time
+from typing import Dict, List, Optional
+from pydantic import BaseModel, ConfigDict, Field
+from agents.collector import CollectorAgent
+from agents.enricher import load_spacy
+from data_models import NewsItem
+from main import (
+    FETCH_MAX_CONCURRENCY,
+    FETCH_PER_HOST_LIMIT,
+    FETCH_TIMEOUT,
+    RSS_SOURCES,
+    Services,
+    build_services,
+    load_env,
+    make_collectors,
+    parser_workers,
+    run_digest,
+    set_stop_handler,
+    write_metrics,
+)
+from tools.feed_parsing import FeedParserPool
+from tools.fetcher import FeedFetcher
+from tools.metrics import METRICS
+from tools.seen_store import normalize_url
+
+# Интервал опроса ленты по умолчанию (в RSS_SOURCES можно задать "interval" в секундах)
+DEFAULT_POLL_INTERVAL = 15 * 60
+# Верхняя граница интервала для редко обновляемых лент
+MAX_POLL_INTERVAL = 6 * 3600
+# Множитель интервала после опроса без новых новостей
+IDLE_BACKOFF = 1.5
+# Случайный разброс интервала (доля), чтобы ленты не опрашивались синхронно
+POLL_JITTER = 0.1
+# Дайджест публикуется по расписанию или раньше, если накопилось достаточно новостей
+DIGEST_INTERVAL = 3 * 3600
+DIGEST_MIN_ITEMS = 30
+# Пауза перед повтором после неудачного дайджеста; удваивается после каждой неудачи подряд (не больше DIGEST_INTERVAL)
+DIGEST_RETRY_DELAY = 5 * 60
+
+
+class FeedSchedule(BaseModel):
+    """
+    Расписание опроса одной ленты с адаптивным интервалом.
+    """
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    collector: CollectorAgent
+    base_interval: float = Field(..., description="Базовый интервал опроса в секундах")
+    interval: float = Field(..., description="Текущий интервал с учётом отсрочки")
+    next_due: float = Field(default=0.0, description="Время следующего опроса (time.monotonic)")
+    idle_polls: int = Field(default=0, description="Количество опросов подряд без новых новостей")
+
+    def reschedule(self, new_items: int, now: float) -> None:
+        """
+        Планирует следующий опрос: интервал растёт, пока лента не приносит новостей,
+        и сбрасывается к базовому при появлении новых.
+        """
+        if new_items:
+            self.idle_polls = 0
+            self.interval = self.base_interval
+        else:
+            self.idle_polls += 1
+            self.interval = min(MAX_POLL_INTERVAL, self.interval * IDLE_BACKOFF)
+        self.next_due = now + self.interval * random.uniform(1 - POLL_JITTER, 1 + POLL_JITTER)
+
+
+class NewsDaemon:
+    """
+    Резидентный режим: агенты, модели и пулы соединений создаются один раз,
+    каждая лента опрашивается по своему расписанию, а дайджест публикуется
+    по таймеру или при накоплении достаточного количества новостей.
+    """
+
+    def __init__(
+        self,
+        services: Services,
+        sources: List[dict],
+        digest_interval: float = DIGEST_INTERVAL,
+        digest_min_items: int = DIGEST_MIN_ITEMS,
+    ):
+        self.services = services
+        self.digest_interval = digest_interval
+        self.digest_min_items = digest_min_items
+        self.schedules = [
+            FeedSchedule(
+                collector=collector,
+                base_interval=source.get("interval", DEFAULT_POLL_INTERVAL),
+                interval=source.get("interval", DEFAULT_POLL_INTERVAL),
+                # Первый опрос тоже разносим по времени
+                next_due=time.monotonic() + random.uniform(0, POLL_JITTER * source.get("interval", DEFAULT_POLL_INTERVAL)),
+            )
+            for source, collector in zip(sources, make_collectors(services, sources))
+        ]
+        self.pending: Dict[str, NewsItem] = {}
+        self.next_digest = time.monotonic() + digest_interval
+        self.digest_failures = 0
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    async def warm_up(self) -> None:
+        """
+        Заранее загружает модели, чтобы первый дайджест не ждал их загрузки.
+        """
+        await asyncio.to_thread(lambda: self.services.embedder.model)
+        await asyncio.to_thread(load_spacy, self.services.enricher.spacy_model)
+
+    async def poll_due_feeds(self) -> None:
+        now = time.monotonic()
+        due = [schedule for schedule in self.schedules if schedule.next_due <= now]
+        if not due:
+            return
+        results = await asyncio.gather(*(schedule.collector.process() for schedule in due), return_exceptions=True)
+        now = time.monotonic()
+        for schedule, result in zip(due, results):
+            if isinstance(result, Exception):
+                print(f"Error polling {schedule.collector.source_urls}: {result}")
+                result = []
+            new_items = 0
+            for item in result:
+                key = normalize_url(item.url)
+                if key not in self.pending:
+                    self.pending[key] = item
+                    new_items += 1
+            schedule.reschedule(new_items, now)
+            if new_items:
+                print(f"{new_items} новых новостей для региона {schedule.collector.region}, в очереди {len(self.pending)}.")
+
+    async def publish_pending(self) -> None:
+        items = list(self.pending.values())
+        self.next_digest = time.monotonic() + self.digest_interval
+        print(f"Формируем дайджест из {len(items)} новостей...")
+        pipeline = None
+        try:
+            # SIGTERM во время дайджеста останавливает и конвейер, и демон
+            pipeline = await run_digest(self.services, items, items, on_stop=self.stop)
+        except Exception as e:
+            print(f"Error during pipeline run: {e}")
+        # Опубликованные новости уже отмечены; после сбоя новости ждут следующего дайджеста
+        remaining = await asyncio.to_thread(self.services.seen_store.filter_unseen, items)
+        self.pending = {normalize_url(item.url): item for item in remaining}
+        if pipeline is None or remaining:
+            # Постоянная ошибка (ключ API, квота, Telegram) не должна превращаться в цикл
+            # немедленных повторов: следующая попытка — только по таймеру, с удвоением паузы
+            self.digest_failures += 1
+            delay = min(self.digest_interval, DIGEST_RETRY_DELAY * 2 ** (self.digest_failures - 1))
+            self.next_digest = time.monotonic() + delay
+            print(f"Дайджест не опубликован ({self.digest_failures} раз подряд), повтор через {delay:.0f}s.")
+        else:
+            self.digest_failures = 0
+        write_metrics({
+            "pipeline": pipeline.report() if pipeline else None,
+            "feed_cache": self.services.feed_cache.stats(),
+            "llm_cache": self.services.llm_cache.stats(),
+            "pending": len(self.pending),
+        })
+        # Каждый отчёт охватывает время с предыдущего дайджеста, а не всю работу демона
+        METRICS.reset()
+
+    async def run(self) -> None:
+        await self.warm_up()
+        print(f"Демон запущен: {len(self.schedules)} лент.")
+        while not self._stopping.is_set():
+            set_stop_handler(self.stop)
+            await self.poll_due_feeds()
+            now = time.monotonic()
+            # После неудачи дайджест ждёт таймера, даже если новостей накопилось достаточно
+            enough = not self.digest_failures and len(self.pending) >= self.digest_min_items
+            if self.pending and (enough or now >= self.next_digest):
+                await self.publish_pending()
+                continue
+            if now >= self.next_digest:
+                self.next_digest = now + self.digest_interval
+            wake_at = min([schedule.next_due for schedule in self.schedules] + [self.next_digest])
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=max(0.0, wake_at - time.monotonic()))
+            except asyncio.TimeoutError:
+                pass
+        set_stop_handler(None)
+        print("Демон остановлен.")
+
+
+async def run_daemon(sources: Optional[List[dict]] = None) -> None:
+    async with FeedFetcher(
+        max_concurrency=FETCH_MAX_CONCURRENCY,
+        per_host_limit=FETCH_PER_HOST_LIMIT,
+        timeout=FETCH_TIMEOUT,
+    ) as fetcher:
+        with FeedParserPool(parser_workers(len(sources or RSS_SOURCES))) as parser_pool:
+            services = build_services(fetcher, parser_pool)
+            try:
+                await NewsDaemon(services, sources or RSS_SOURCES).run()
+            finally:
+                services.close()
+
+
+if __name__ == "__main__":
+    load_env()
+    asyncio.run(run_daemon())
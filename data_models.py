@@ -1,6 +1,6 @@
-from pydantic import BaseModel, HttpUrl, Field
+from pydantic import BaseModel, HttpUrl, Field, TypeAdapter, ValidationError, ValidatorFunctionWrapHandler, WrapValidator
 from datetime import datetime
-from typing import List, Optional
+from typing import Annotated, Any, Dict, List, Optional, Tuple
 
 class NewsItem(BaseModel):
     source: str = Field(..., min_length=1, description="The source of the news item")
@@ -13,6 +13,19 @@ class NewsItem(BaseModel):
     category: Optional[str] = Field(None, description="The category of the news item (e.g., AI, ML, Stats)")
     language: Optional[str] = Field(None, description="The language of the news item")
     sentiment: Optional[float] = Field(0.0, ge=-1.0, le=1.0, description="The sentiment score of the news item (-1.0 to 1.0)")
+    related_sources: List[str] = Field(default_factory=list, description="Sources of duplicate news items merged into this one")
+
+
+class NewsCluster(BaseModel):
+    """
+    Компактный ответ ManagerAgent: ссылки на входные новости и только новые поля.
+    Источник, URL, дата и регион берутся из исходных новостей, а не генерируются моделью.
+    """
+    ids: List[int] = Field(..., min_length=1, description="IDs of the input news items describing this story, the most informative first")
+    title: str = Field(..., min_length=1, description="A concise merged title of the story")
+    description: str = Field(..., description="A short merged summary of the story")
+    tags: List[str] = Field(default_factory=list, description="A list of tags for the story")
+    category: Optional[str] = Field(None, description="The category of the story (e.g., AI, ML, Stats)")
 
 
 class NewsDigest(BaseModel):
@@ -20,4 +33,55 @@ class NewsDigest(BaseModel):
     items: List[NewsItem] = Field(..., description="A list of news items included in the digest")
     summary: str = Field(..., description="A summary of the news digest")
     region: Optional[str] = Field(None, description="The region of the news digest, if applicable")
+    category: Optional[str] = Field(None, description="The category of the news digest, if applicable")
+
+
+def merge_related(representative: NewsItem, others: List[NewsItem], **update: Any) -> NewsItem:
+    """
+    Возвращает копию представителя с источниками остальных новостей в related_sources.
+
+    :param representative: Новость, поля которой сохраняются.
+    :param others: Объединяемые с ней новости.
+    :param update: Дополнительные поля для замены.
+    :return: Новый объект NewsItem.
+    """
+    sources = list(representative.related_sources)
+    for item in others:
+        for source in [item.source, *item.related_sources]:
+            if source != representative.source and source not in sources:
+                sources.append(source)
+    if sources != representative.related_sources:
+        update["related_sources"] = sources
+    return representative.model_copy(update=update) if update else representative
+
+
+def _keep_error(value: Any, handler: ValidatorFunctionWrapHandler) -> Any:
+    """
+    Возвращает ошибку валидации записи вместо исключения, чтобы пакет не прерывался на ней.
+    """
+    try:
+        return handler(value)
+    except ValidationError as e:
+        return e
+
+
+# Пакетная валидация: один вызов pydantic-core на весь список вместо вызова на каждую новость;
+# ошибка записи возвращается на её месте в списке, поэтому повторная валидация не нужна
+NEWS_ITEMS_ADAPTER = TypeAdapter(List[Annotated[NewsItem, WrapValidator(_keep_error)]])
+
+
+def validate_news_items(records: List[Dict[str, Any]]) -> Tuple[List[NewsItem], List[Tuple[Dict[str, Any], ValidationError]]]:
+    """
+    Валидирует список словарей в объекты NewsItem за один проход.
+    Некорректные записи отбрасываются и возвращаются отдельно вместе с ошибками.
 
+    :param records: Словари с полями NewsItem.
+    :return: Пара (корректные новости, список пар (запись, ошибка)).
+    """
+    items, errors = [], []
+    for record, result in zip(records, NEWS_ITEMS_ADAPTER.validate_python(records)):
+        if isinstance(result, ValidationError):
+            errors.append((record, result))
+        else:
+            items.append(result)
+    return items, errors
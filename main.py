@@ -1,87 +1,616 @@
-
+import argparse
 import asyncio
+import os
+import signal
+import socket
+import time
+from datetime import datetime
 from agents.collector import CollectorAgent  
+from agents.deduplicator import DeduplicatorAgent
+from agents.enricher import EnricherAgent
 from agents.manager import ManagerAgent  
+from agents.compressor import CompressorAgent
 from agents.writer import WriterAgent
 from agents.publisher import PublisherAgent
-from typing import List
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from pydantic import BaseModel, ConfigDict
 from data_models import NewsItem, NewsDigest
-import nest_asyncio
-
-# Разрешаем повторное использование событийного цикла
-nest_asyncio.apply()
+from pipeline import Pipeline, Stage
+from tools.fetcher import FeedFetcher
+from tools.archive import ArchiveStore
+from tools.delivery import SentLog
+from tools.embeddings import Embedder
+from tools.feed_cache import FeedCache
+from tools.feed_parsing import FeedParserPool
+from tools.llm import LLMLimiter
+from tools.llm_cache import LLMCache
+from tools.metrics import METRICS
+from tools.seen_store import SeenStore, normalize_url
+from tools.vector_index import CoverageIndex, VectorIndex
+from tools.work_queue import NewsSink, SQLiteNewsSink, SQLiteWorkQueue, WorkQueue
 
 # Конфигурация RSS-источников
+# "interval" — интервал опроса в секундах для режима демона (daemon.py)
+# "streaming" — потоковый разбор с остановкой на записях старше окна дат (для больших архивных лент)
 RSS_SOURCES = [
-    {"region": "World", "url": "https://feeds.bbci.co.uk/news/world/rss.xml", "days_ago": 0},
-    {"region": "Asia", "url": "https://feeds.bbci.co.uk/news/world/asia/rss.xml", "days_ago": 0},
+    {"region": "World", "url": "https://feeds.bbci.co.uk/news/world/rss.xml", "days_ago": 0, "interval": 600},
+    {"region": "Asia", "url": "https://feeds.bbci.co.uk/news/world/asia/rss.xml", "days_ago": 0, "interval": 900},
     # {"region": "World", "url": "https://www.theguardian.com/world/rss", "days_ago": 0},
     # {"region": "World", "url": "https://rss.nytimes.com/services/xml/rss/nyt/World.xml", "days_ago": 0},
 ]
 
-async def main():
-    # Создание агентов
-    print("Создаём агентов для сбора новостей...")
-    collector_agents = [
-        CollectorAgent(region=source["region"], source_urls=[source["url"]], days_ago=source["days_ago"])
-        for source in RSS_SOURCES
+# Лимиты параллельной загрузки лент
+FETCH_MAX_CONCURRENCY = 50
+FETCH_PER_HOST_LIMIT = 6
+FETCH_TIMEOUT = 20.0
+# Потоковый разбор лент по умолчанию (для отдельного источника задаётся ключом "streaming")
+FEED_STREAMING = False
+# Количество процессов для разбора лент (0 — разбор в событийном цикле);
+# None — по числу лент, но не больше числа CPU, а при малом числе лент пул не запускается
+PARSER_WORKERS: Optional[int] = None
+PARSER_POOL_MIN_FEEDS = 8
+# Каталог кеша лент для условных GET-запросов
+FEED_CACHE_DIR = ".feed_cache"
+# Индекс уже обработанных новостей и срок хранения записей в нём
+SEEN_STORE_PATH = "seen_items.sqlite3"
+SEEN_TTL_DAYS = 7
+# Кеш ответов LLM: повторный запуск с тем же входом не оплачивает запросы заново
+LLM_CACHE_PATH = ".llm_cache.sqlite3"
+LLM_CACHE_MAX_ENTRIES = 1000
+LLM_CACHE_TTL_SECONDS = 7 * 86400
+# Общие для менеджера и писателя лимиты запросов к LLM: параллелизм, RPM/TPM,
+# повторы, таймаут попытки, общий дедлайн вызова и задержка хеджирующего запроса (None — без хеджирования)
+LLM_MAX_CONCURRENCY = 8
+LLM_REQUESTS_PER_MINUTE = 500
+LLM_TOKENS_PER_MINUTE = 200_000
+LLM_MAX_RETRIES = 4
+LLM_TIMEOUT = 120.0
+LLM_DEADLINE = 600.0
+LLM_HEDGE_AFTER: Optional[float] = None
+# Архив обработанных новостей (старый news_archive.csv импортируется командой
+# python -m tools.archive import news_archive.csv)
+ARCHIVE_PATH = "news_archive.sqlite3"
+# Семантический индекс опубликованных новостей
+VECTOR_INDEX_DIR = "vector_index"
+# Рассылка дайджестов: все дайджесты уходят в чаты из TELEGRAM_CHAT_ID (можно несколько через запятую),
+# дайджесты региона — дополнительно в его чаты; параллелизм отправки и журнал отправленных сообщений
+TELEGRAM_REGION_CHATS: Dict[str, List[str]] = {}
+PUBLISH_CONCURRENCY = 8
+SENT_LOG_PATH = ".telegram_sent.sqlite3"
+# Параметры потокового конвейера: размеры пачек, ожидание неполной пачки и параллелизм
+DEDUP_BATCH_SIZE = 200
+MANAGER_BATCH_SIZE = 50
+MANAGER_CONCURRENCY = 2
+BATCH_TIMEOUT = 2.0
+# Сжатие описаний перед ManagerAgent: лимит токенов на новость и оценка скорости
+# обработки входных токенов моделью для отчёта о сэкономленном времени
+COMPRESS_MAX_TOKENS = 80
+PROMPT_TOKENS_PER_SECOND = 1000.0
+# Раздельные дайджесты: "region", "category" или None — один общий дайджест;
+# сколько дайджестов создаётся и публикуется одновременно
+DIGEST_PARTITION_BY: Optional[str] = None
+DIGEST_CONCURRENCY = 4
+# Распределённый сбор (--worker / --distributed): очередь заданий с арендой и общий приёмник новостей
+WORK_QUEUE_PATH = "work_queue.sqlite3"
+NEWS_SINK_PATH = "news_sink.sqlite3"
+LEASE_SECONDS = 60.0
+# Сколько лент одновременно собирает один процесс воркера
+WORKER_CONCURRENCY = 8
+# Завершать воркер, когда очередь опустела (False — ждать новых заданий до SIGTERM)
+WORKER_EXIT_WHEN_IDLE = True
+SINK_BATCH_SIZE = 200
+SINK_POLL_INTERVAL = 1.0
+# Сколько координатор ждёт воркеров, прежде чем строить дайджест по уже собранному
+DISTRIBUTED_DEADLINE = 1800.0
+
+# Каталог JSON-отчётов о запусках и (опционально) файл метрик для textfile-коллектора Prometheus
+# (если не задан, берётся из переменной окружения PROMETHEUS_TEXTFILE)
+METRICS_REPORT_DIR = "metrics"
+PROMETHEUS_TEXTFILE: Optional[str] = None
+
+class Services(BaseModel):
+    """
+    Общие ресурсы и агенты конвейера.
+    В режиме демона создаются один раз и переиспользуются между запусками.
+    """
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    fetcher: FeedFetcher
+    parser_pool: FeedParserPool
+    feed_cache: FeedCache
+    seen_store: SeenStore
+    llm_cache: LLMCache
+    archive: ArchiveStore
+    sent_log: SentLog
+    embedder: Embedder
+    coverage: CoverageIndex
+    deduplicator: DeduplicatorAgent
+    enricher: EnricherAgent
+    compressor: CompressorAgent
+    manager: ManagerAgent
+    writer: WriterAgent
+    publisher: PublisherAgent
+
+    def close(self) -> None:
+        self.archive.close()
+        self.sent_log.close()
+
+
+def build_services(fetcher: FeedFetcher, parser_pool: FeedParserPool, embedder: Optional[Embedder] = None) -> Services:
+    """
+    Создаёт хранилища, кеши и агентов конвейера.
+
+    :param fetcher: Общий загрузчик лент.
+    :param parser_pool: Пул разбора лент.
+    :param embedder: Модель эмбеддингов (по умолчанию Embedder с настройками по умолчанию).
+    """
+    llm_cache = LLMCache(LLM_CACHE_PATH, max_entries=LLM_CACHE_MAX_ENTRIES, ttl_seconds=LLM_CACHE_TTL_SECONDS)
+    llm_limiter = LLMLimiter(
+        max_concurrency=LLM_MAX_CONCURRENCY,
+        requests_per_minute=LLM_REQUESTS_PER_MINUTE,
+        tokens_per_minute=LLM_TOKENS_PER_MINUTE,
+        max_retries=LLM_MAX_RETRIES,
+        timeout=LLM_TIMEOUT,
+        deadline=LLM_DEADLINE,
+        hedge_after=LLM_HEDGE_AFTER,
+    )
+    embedder = embedder or Embedder()
+    coverage = CoverageIndex(VectorIndex(VECTOR_INDEX_DIR), embedder)
+    archive = ArchiveStore(ARCHIVE_PATH)
+    sent_log = SentLog(SENT_LOG_PATH)
+    return Services(
+        fetcher=fetcher,
+        parser_pool=parser_pool,
+        feed_cache=FeedCache(FEED_CACHE_DIR),
+        seen_store=SeenStore(SEEN_STORE_PATH, ttl_days=SEEN_TTL_DAYS),
+        llm_cache=llm_cache,
+        archive=archive,
+        sent_log=sent_log,
+        embedder=embedder,
+        coverage=coverage,
+        deduplicator=DeduplicatorAgent(embedder=embedder),
+        enricher=EnricherAgent(embedder=embedder),
+        compressor=CompressorAgent(max_tokens=COMPRESS_MAX_TOKENS, prompt_tokens_per_second=PROMPT_TOKENS_PER_SECOND),
+        manager=ManagerAgent(llm_cache=llm_cache, llm_limiter=llm_limiter, archive=archive, coverage=coverage),
+        writer=WriterAgent(
+            llm_cache=llm_cache,
+            llm_limiter=llm_limiter,
+            coverage=coverage,
+            partition_by=DIGEST_PARTITION_BY,
+            max_parallel_digests=DIGEST_CONCURRENCY,
+        ),
+        publisher=PublisherAgent(
+            region_chat_ids=TELEGRAM_REGION_CHATS,
+            max_concurrency=PUBLISH_CONCURRENCY,
+            sent_log=sent_log,
+        ),
+    )
+
+
+def parser_workers(feeds: int) -> int:
+    """
+    Размер пула разбора лент для заданного числа одновременно разбираемых лент.
+    Несколько лент быстрее разобрать в событийном цикле, чем запускать процессы.
+    """
+    if PARSER_WORKERS is not None:
+        return PARSER_WORKERS
+    if feeds < PARSER_POOL_MIN_FEEDS:
+        return 0
+    return min(os.cpu_count() or 1, feeds)
+
+
+def make_collector(
+    source: dict,
+    fetcher: FeedFetcher,
+    parser_pool: FeedParserPool,
+    feed_cache: FeedCache,
+    seen_store: SeenStore,
+) -> CollectorAgent:
+    """
+    Создаёт коллектор для одного источника из RSS_SOURCES.
+    Принимает только ресурсы сбора, поэтому не требует агентов LLM и Telegram.
+    """
+    return CollectorAgent(
+        region=source["region"],
+        source_urls=[source["url"]],
+        days_ago=source.get("days_ago", 0),
+        streaming=source.get("streaming", FEED_STREAMING),
+        fetcher=fetcher,
+        parser_pool=parser_pool,
+        feed_cache=feed_cache,
+        seen_store=seen_store,
+    )
+
+
+def make_collectors(services: Services, sources: List[dict]) -> List[CollectorAgent]:
+    return [
+        make_collector(source, services.fetcher, services.parser_pool, services.feed_cache, services.seen_store)
+        for source in sources
     ]
-    manager_agent = ManagerAgent()
-    writer_agent = WriterAgent()
-    publisher_agent = PublisherAgent()
-    print("Агенты успешно созданы.")
 
-    # Сбор новостей
-    all_news = []
+
+async def publish_digest(services: Services, digest: NewsDigest) -> Dict[str, str]:
+    """
+    Выводит дайджест и публикует его в Telegram.
+
+    :return: Статус доставки по чатам (см. PublisherAgent.process).
+    """
+    # Вывод итогового дайджеста
+    print("Generated Digest:")
+    print(f"Date Generated: {digest.date_generated}")
+    print(f"Region: {digest.region}")
+    print("Summary:")
+    print(digest.summary)
+    print("Публикация дайджеста в Telegram...")
+    report = await services.publisher.process(digest)
+    print(f"Дайджест опубликован в Telegram: {report}")
+    return report
+
+
+def build_pipeline(services: Services) -> Pipeline:
+    """
+    Собирает потоковый конвейер: дедупликация -> обогащение -> сжатие -> менеджер -> писатель -> публикатор.
+    """
+    async def publish(digest: NewsDigest) -> Tuple[NewsDigest, Dict[str, str]]:
+        return digest, await publish_digest(services, digest)
+
+    return Pipeline([
+        Stage.from_agent(services.deduplicator, batch_size=DEDUP_BATCH_SIZE, batch_timeout=BATCH_TIMEOUT, flatten=True),
+        # Локальное заполнение языка, тегов, категории и тональности до обращения к LLM
+        Stage.from_agent(services.enricher, batch_size=MANAGER_BATCH_SIZE, batch_timeout=BATCH_TIMEOUT, flatten=True),
+        # Сжатие описаний до информативных предложений перед обращением к LLM
+        Stage.from_agent(services.compressor, batch_size=MANAGER_BATCH_SIZE, batch_timeout=BATCH_TIMEOUT, flatten=True),
+        Stage.from_agent(
+            services.manager,
+            batch_size=MANAGER_BATCH_SIZE,
+            batch_timeout=BATCH_TIMEOUT,
+            concurrency=MANAGER_CONCURRENCY,
+            flatten=True,
+        ),
+        # Дайджест строится по всем новостям, поэтому писатель ждёт весь поток;
+        # раздельные дайджесты уходят на публикацию по мере готовности
+        Stage(name=services.writer.name, handler=services.writer.process_partitioned, batch_size=0, flatten=True),
+        Stage(name=services.publisher.name, handler=publish, concurrency=DIGEST_CONCURRENCY),
+    ])
+
+
+def set_stop_handler(callback: Optional[Callable[[], None]]) -> None:
+    """
+    Назначает (или снимает при callback=None) обработчик SIGINT/SIGTERM, если платформа это поддерживает.
+    """
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            if callback is None:
+                loop.remove_signal_handler(sig)
+            else:
+                loop.add_signal_handler(sig, callback)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+
+async def run_digest(
+    services: Services,
+    source: Any,
+    processed: List[NewsItem],
+    on_stop: Optional[Callable[[], None]] = None,
+) -> Pipeline:
+    """
+    Прогоняет новости через конвейер и отмечает их обработанными после успешной публикации.
+    Если любая стадия, включая писателя и публикатора, завершилась ошибкой, новости
+    остаются необработанными и попадут в следующий запуск. Новости доставленных дайджестов
+    добавляются в индекс прошлого освещения после прогона, поэтому истории текущего прогона
+    не подавляют друг друга и не попадают в «Earlier coverage».
+
+    :param services: Общие ресурсы и агенты.
+    :param source: Итератор новостей (синхронный или асинхронный).
+    :param processed: Список, в котором к концу прогона лежат все поступившие новости.
+    :param on_stop: Дополнительный обработчик SIGINT/SIGTERM на время прогона (например, остановка демона).
+    :return: Конвейер со статистикой прогона.
+    """
+    pipeline = build_pipeline(services)
+    # Дедупликатор сравнивает пачки между собой только в пределах одного прогона
+    services.deduplicator.reset()
+
+    def stop() -> None:
+        pipeline.stop()
+        if on_stop is not None:
+            on_stop()
+
+    published: List[Tuple[NewsDigest, Dict[str, str]]] = []
+    # SIGTERM/SIGINT останавливают чтение лент, а уже принятые новости дообрабатываются
+    set_stop_handler(stop)
     try:
+        published = await pipeline.run(source)
+    finally:
+        set_stop_handler(None)
+        delivered = [
+            digest for digest, report in published
+            if not any(status.startswith("failed") for status in report.values())
+        ]
+        # Отмечаем новости как обработанные только после доставки всех дайджестов во все чаты;
+        # при повторной публикации уже доставленные части пропускает журнал отправленных сообщений
+        if pipeline.stats[services.publisher.name].completed:
+            if len(delivered) < len(published):
+                print("Дайджест доставлен не во все чаты, новости будут опубликованы повторно.")
+            else:
+                await asyncio.to_thread(services.seen_store.mark_seen, processed)
+        await services.coverage.add([item for digest in delivered for item in digest.items])
+        print(f"Кеш LLM: {services.llm_cache.stats()}")
+        for name, stats in pipeline.report().items():
+            print(f"  {name}: {stats}")
+    return pipeline
+
+
+async def main(distributed: bool = False):
+    async with FeedFetcher(
+        max_concurrency=FETCH_MAX_CONCURRENCY,
+        per_host_limit=FETCH_PER_HOST_LIMIT,
+        timeout=FETCH_TIMEOUT,
+    ) as fetcher:
+        # Координатор распределённого сбора ленты не разбирает
+        with FeedParserPool(0 if distributed else parser_workers(len(RSS_SOURCES))) as parser_pool:
+            # Создание агентов
+            print("Создаём агентов для сбора новостей...")
+            services = build_services(fetcher, parser_pool)
+            print("Агенты успешно созданы.")
+            try:
+                await (run_distributed(services) if distributed else run_pipeline(services))
+            finally:
+                services.close()
+
+async def collect_only():
+    """
+    Только собирает новости и выводит их заголовки.
+    Агенты LLM и Telegram не создаются, а их библиотеки не импортируются;
+    новости не отмечаются обработанными.
+    """
+    async with FeedFetcher(
+        max_concurrency=FETCH_MAX_CONCURRENCY,
+        per_host_limit=FETCH_PER_HOST_LIMIT,
+        timeout=FETCH_TIMEOUT,
+    ) as fetcher:
+        with FeedParserPool(parser_workers(len(RSS_SOURCES))) as parser_pool:
+            feed_cache = FeedCache(FEED_CACHE_DIR)
+            seen_store = SeenStore(SEEN_STORE_PATH, ttl_days=SEEN_TTL_DAYS)
+            collectors = [
+                make_collector(source, fetcher, parser_pool, feed_cache, seen_store)
+                for source in RSS_SOURCES
+            ]
+            results = await asyncio.gather(*(collector.process() for collector in collectors))
+
+    submitted_urls = set()
+    total = 0
+    for collector, news in zip(collectors, results):
+        news = [item for item in news if normalize_url(item.url) not in submitted_urls]
+        submitted_urls.update(normalize_url(item.url) for item in news)
+        total += len(news)
+        print(f"Собрано {len(news)} новостей для региона {collector.region}.")
+        for item in news:
+            print(f"  [{item.date:%Y-%m-%d %H:%M}] {item.title} ({item.url})")
+    print(f"Всего собрано {total} новостей.")
+    for url, elapsed in fetcher.slowest():
+        print(f"  {elapsed:.2f}s  {url}")
+    print(f"Кеш лент: {feed_cache.stats()}")
+
+async def run_pipeline(services: Services):
+    collector_agents = make_collectors(services, RSS_SOURCES)
+
+    async def collect(collector: CollectorAgent):
+        return collector, await collector.process()
+
+    all_news: List[NewsItem] = []
+
+    async def collected_news():
+        # Новости уходят в конвейер, как только собран очередной регион
         print("Начинаем сбор новостей...")
-        for collector in collector_agents:
-            news: List[NewsItem] = await collector.process()
+        submitted_urls = set()
+        for finished in asyncio.as_completed([collect(collector) for collector in collector_agents]):
+            collector, news = await finished
+            # Одна и та же статья может прийти из нескольких лент
+            news = [item for item in news if normalize_url(item.url) not in submitted_urls]
+            submitted_urls.update(normalize_url(item.url) for item in news)
             all_news.extend(news)
             print(f"Собрано {len(news)} новостей для региона {collector.region}.")
-    except Exception as e:
-        print(f"Error during news collection: {e}")
-        return
+            for item in news:
+                yield item
+        print(f"Всего собрано {len(all_news)} новостей.")
+        for url, elapsed in services.fetcher.slowest():
+            print(f"  {elapsed:.2f}s  {url}")
+        print(f"Кеш лент: {services.feed_cache.stats()}")
 
-    print(f"Всего собрано {len(all_news)} новостей.")
+    await digest_and_report(services, collected_news(), all_news)
 
-    # Обработка новостей менеджером
-    try:
-        print("Передача новостей в ManagerAgent для анализа...")
-        filtered_news: List[NewsItem] = await manager_agent.process(all_news)
-        print(f"Анализ новостей завершен. Обработано {len(filtered_news)} новостей.")
-    except Exception as e:
-        print(f"Error during news filtering and analysis: {e}")
-        return
 
-    # Генерация итогового дайджеста
+async def digest_and_report(services: Services, source: AsyncIterator[NewsItem], all_news: List[NewsItem]) -> None:
+    """
+    Прогоняет поток новостей через конвейер и сохраняет отчёт о запуске.
+    """
+    pipeline = None
     try:
-        print("Передача новостей в WriterAgent для создания дайджеста...")
-        digest: NewsDigest = await writer_agent.process(filtered_news)
-        print("Дайджест успешно создан.")
-
-        # Вывод итогового дайджеста
-        print("Generated Digest:")
-        print(f"Date Generated: {digest.date_generated}")
-        print(f"Region: {digest.region}")
-        print("Summary:")
-        print(digest.summary)
+        pipeline = await run_digest(services, source, all_news)
+        if not all_news:
+            print("Новых новостей нет.")
     except Exception as e:
-        print(f"Error during digest generation: {e}")
-        return
+        print(f"Error during pipeline run: {e}")
+    finally:
+        write_metrics({
+            "pipeline": pipeline.report() if pipeline else None,
+            "feed_cache": services.feed_cache.stats(),
+            "llm_cache": services.llm_cache.stats(),
+            "feed_timings": services.fetcher.timings,
+        })
+
+
+def enqueue_sources(queue: WorkQueue, sources: List[dict]) -> int:
+    """
+    Ставит источники в очередь заданий; ключ задания — нормализованный URL ленты.
+
+    :return: Количество поставленных заданий (уже ожидающие и выполняющиеся не дублируются).
+    """
+    return sum(queue.enqueue(normalize_url(source["url"]), source) for source in sources)
+
+
+async def drain_sink(
+    queue: WorkQueue,
+    sink: NewsSink,
+    batch_size: int = SINK_BATCH_SIZE,
+    poll_interval: float = SINK_POLL_INTERVAL,
+    deadline: Optional[float] = DISTRIBUTED_DEADLINE,
+) -> AsyncIterator[List[NewsItem]]:
+    """
+    Забирает пачки новостей из приёмника, пока в очереди есть ожидающие или выполняющиеся задания.
+    Задания с истёкшей арендой (упавшие воркеры) возвращаются в очередь.
+    Воркеры кладут новости до отметки о выполнении, поэтому после опустения очереди
+    достаточно дочитать приёмник до конца.
+    """
+    started = time.monotonic()
+    idle = False
+    while True:
+        items = await asyncio.to_thread(sink.take, batch_size)
+        if items:
+            yield items
+            continue
+        if idle:
+            return
+        reclaimed = await asyncio.to_thread(queue.reclaim_expired)
+        if reclaimed:
+            print(f"Возвращено в очередь {reclaimed} заданий с истёкшей арендой.")
+        idle = await asyncio.to_thread(queue.is_idle)
+        if idle:
+            continue
+        if deadline is not None and time.monotonic() - started > deadline:
+            print(f"Воркеры не завершили сбор за {deadline:.0f}s, дайджест строится по собранному: {queue.counts()}")
+            return
+        await asyncio.sleep(poll_interval)
+
+
+async def run_distributed(services: Services):
+    """
+    Координатор распределённого сбора: ставит RSS_SOURCES в общую очередь,
+    а новости, собранные воркерами (python main.py --worker), прогоняет через конвейер.
+    """
+    queue = SQLiteWorkQueue(WORK_QUEUE_PATH)
+    sink = SQLiteNewsSink(NEWS_SINK_PATH)
+    added = await asyncio.to_thread(enqueue_sources, queue, RSS_SOURCES)
+    print(f"В очередь поставлено {added} заданий из {len(RSS_SOURCES)}, ожидаем воркеров...")
+    all_news: List[NewsItem] = []
+
+    async def collected_news():
+        submitted_urls = set()
+        async for news in drain_sink(queue, sink):
+            # Одна и та же статья может прийти из нескольких лент или повторно после сбоя воркера
+            news = [item for item in news if normalize_url(item.url) not in submitted_urls]
+            submitted_urls.update(normalize_url(item.url) for item in news)
+            all_news.extend(news)
+            for item in news:
+                yield item
+        print(f"Всего собрано {len(all_news)} новостей. Очередь: {queue.counts()}")
 
-    # Публикация в Telegram
     try:
-        print("Публикация дайджеста в Telegram...")
-        await publisher_agent.process(digest)  # Отправляем дайджест через PublisherAgent
-        print("Дайджест успешно опубликован в Telegram.")
-    except Exception as e:
-        print(f"Error during publishing: {e}")
-        return
+        await digest_and_report(services, collected_news(), all_news)
+    finally:
+        queue.close()
+        sink.close()
+
+
+async def run_worker(worker_id: Optional[str] = None):
+    """
+    Воркер распределённого сбора: берёт ленты из общей очереди заданий и складывает
+    новости в общий приёмник. Агенты LLM и Telegram не создаются.
+    Завершается, когда в очереди не остаётся заданий (если WORKER_EXIT_WHEN_IDLE), или по SIGINT/SIGTERM.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    queue = SQLiteWorkQueue(WORK_QUEUE_PATH)
+    sink = SQLiteNewsSink(NEWS_SINK_PATH)
+    stop = asyncio.Event()
+    async with FeedFetcher(
+        max_concurrency=FETCH_MAX_CONCURRENCY,
+        per_host_limit=FETCH_PER_HOST_LIMIT,
+        timeout=FETCH_TIMEOUT,
+    ) as fetcher:
+        with FeedParserPool(parser_workers(WORKER_CONCURRENCY)) as parser_pool:
+            # Шаблон коллектора: регион и URL берутся из каждого задания
+            collector = CollectorAgent(
+                region="",
+                source_urls=[],
+                streaming=FEED_STREAMING,
+                fetcher=fetcher,
+                parser_pool=parser_pool,
+                feed_cache=FeedCache(FEED_CACHE_DIR),
+                seen_store=SeenStore(SEEN_STORE_PATH, ttl_days=SEEN_TTL_DAYS),
+            )
+            set_stop_handler(stop.set)
+            try:
+                completed = await asyncio.gather(*(
+                    collector.run_worker(
+                        queue,
+                        sink,
+                        f"{worker_id}/{i}",
+                        lease_seconds=LEASE_SECONDS,
+                        exit_when_idle=WORKER_EXIT_WHEN_IDLE,
+                        stop=stop,
+                    )
+                    for i in range(WORKER_CONCURRENCY)
+                ))
+            finally:
+                set_stop_handler(None)
+                queue.close()
+                sink.close()
+    print(f"Воркер {worker_id}: выполнено {sum(completed)} заданий.")
+
+def write_metrics(extra: dict) -> None:
+    """
+    Сохраняет отчёт о запуске в JSON и, если задано, метрики в формате Prometheus.
+    """
+    report_path = os.path.join(METRICS_REPORT_DIR, f"run-{datetime.now():%Y%m%d-%H%M%S}.json")
+    METRICS.write_report(report_path, extra=extra)
+    print(f"Отчёт о запуске сохранён в {report_path}.")
+    textfile = PROMETHEUS_TEXTFILE or os.getenv("PROMETHEUS_TEXTFILE")
+    if textfile:
+        with open(textfile, "w", encoding="utf-8") as file:
+            file.write(METRICS.render_prometheus())
+
+
+def load_env() -> None:
+    """
+    Загружает переменные окружения из .env.
+    Вызывается в точке входа, а не при импорте модулей.
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv(override=True)
+
+
+def cli() -> None:
+    parser = argparse.ArgumentParser(description="News digest pipeline")
+    parser.add_argument(
+        "--collect-only",
+        action="store_true",
+        help="only fetch feeds and print collected news; LLM and Telegram are not used",
+    )
+    parser.add_argument(
+        "--worker",
+        action="store_true",
+        help="run a collection worker that takes feeds from the shared work queue",
+    )
+    parser.add_argument(
+        "--distributed",
+        action="store_true",
+        help="enqueue RSS_SOURCES for workers and build the digest from the shared news sink",
+    )
+    args = parser.parse_args()
+    load_env()
+    if args.collect_only:
+        asyncio.run(collect_only())
+    elif args.worker:
+        asyncio.run(run_worker())
+    else:
+        asyncio.run(main(distributed=args.distributed))
 
 # Запуск событийного цикла
 if __name__ == "__main__":
-    asyncio.run(main())
+    cli()
 
 # import asyncio
 # from agents.collector import CollectorAgent  
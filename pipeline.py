@@ -0,0 +1,239 @@
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, Iterable, List, Optional, Union
+from pydantic import BaseModel, ConfigDict, Field
+from base_agent import BaseAgent
+
+# Маркер конца потока в очередях между стадиями
+_DONE = object()
+
+
+class Stage(BaseModel):
+    """
+    Стадия конвейера: обработчик, число параллельных воркеров и размер входной очереди.
+    """
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    name: str = Field(..., description="Имя стадии в отчёте")
+    handler: Callable[[Any], Union[Awaitable[Any], AsyncIterable[Any]]] = Field(
+        ..., description="Асинхронный обработчик элемента или пачки (корутина или асинхронный генератор)"
+    )
+    concurrency: int = Field(default=1, ge=1, description="Количество параллельных воркеров")
+    queue_size: int = Field(default=100, ge=1, description="Размер входной очереди (обратное давление)")
+    batch_size: int = Field(default=1, ge=0, description="Размер пачки; 1 — по одному элементу, 0 — все элементы разом")
+    batch_timeout: Optional[float] = Field(default=None, description="Через сколько секунд отправлять неполную пачку")
+    flatten: bool = Field(
+        default=False,
+        description="Раскладывать списки и асинхронные генераторы, возвращённые обработчиком, на отдельные элементы",
+    )
+
+    @classmethod
+    def from_agent(cls, agent: BaseAgent, **options: Any) -> "Stage":
+        """
+        Создаёт стадию, вызывающую agent.process.
+        """
+        return cls(name=options.pop("name", agent.name), handler=agent.process, **options)
+
+
+class StageStats(BaseModel):
+    """
+    Статистика стадии конвейера.
+    """
+    items_in: int = 0
+    items_out: int = 0
+    errors: int = 0
+    busy_seconds: float = 0.0
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    completed: bool = False
+
+    @property
+    def throughput(self) -> float:
+        """
+        Элементов на выходе в секунду за время жизни стадии.
+        """
+        if self.started_at is None:
+            return 0.0
+        elapsed = (self.finished_at or time.perf_counter()) - self.started_at
+        return self.items_out / elapsed if elapsed > 0 else 0.0
+
+
+class Pipeline:
+    """
+    Потоковый конвейер на asyncio-очередях.
+    Элементы проходят по стадиям, как только появляются в источнике; ограниченные очереди
+    обеспечивают обратное давление, а ошибка любой стадии останавливает весь конвейер.
+    """
+
+    def __init__(self, stages: List[Stage], logger: Optional[logging.Logger] = None):
+        if not stages:
+            raise ValueError("Pipeline requires at least one stage.")
+        for stage in stages:
+            if stage.batch_size == 0 and stage.concurrency != 1:
+                raise ValueError(f"Stage {stage.name} collects all items and must have concurrency 1.")
+        self.stages = stages
+        self.logger = logger or logging.getLogger("Pipeline")
+        self.stats: Dict[str, StageStats] = {stage.name: StageStats() for stage in stages}
+        self._queues: List[asyncio.Queue] = []
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        """
+        Мягкая остановка: источник больше не читается, уже принятые элементы дообрабатываются.
+        """
+        self._stopping.set()
+
+    async def run(self, source: Union[AsyncIterable[Any], Iterable[Any]]) -> List[Any]:
+        """
+        Прогоняет элементы источника через все стадии.
+
+        :param source: Синхронный или асинхронный итератор входных элементов.
+        :return: Элементы на выходе последней стадии.
+        """
+        self._queues = [asyncio.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        self._queues.append(asyncio.Queue())
+        results: List[Any] = []
+
+        tasks = [asyncio.create_task(self._feed(source), name="pipeline-source")]
+        for index, stage in enumerate(self.stages):
+            remaining = [stage.concurrency]
+            for worker in range(stage.concurrency):
+                tasks.append(asyncio.create_task(self._worker(index, remaining), name=f"{stage.name}-{worker}"))
+        tasks.append(asyncio.create_task(self._drain(results), name="pipeline-sink"))
+
+        try:
+            # Первая же ошибка отменяет остальные задачи
+            for finished in asyncio.as_completed(tasks):
+                await finished
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return results
+
+    async def _put(self, index: int, item: Any) -> None:
+        queue = self._queues[index]
+        await queue.put(item)
+        if index < len(self.stages):
+            stats = self.stats[self.stages[index].name]
+            stats.queue_depth = queue.qsize()
+            stats.max_queue_depth = max(stats.max_queue_depth, stats.queue_depth)
+
+    async def _feed(self, source: Union[AsyncIterable[Any], Iterable[Any]]) -> None:
+        if hasattr(source, "__aiter__"):
+            async for item in source:
+                if self._stopping.is_set():
+                    break
+                await self._put(0, item)
+        else:
+            for item in source:
+                if self._stopping.is_set():
+                    break
+                await self._put(0, item)
+        await self._put(0, _DONE)
+
+    async def _next_batch(self, index: int) -> tuple:
+        """
+        Забирает из очереди элемент или пачку элементов согласно настройкам стадии.
+
+        :return: Пара (элементы, встречен ли конец потока).
+        """
+        stage = self.stages[index]
+        queue = self._queues[index]
+        first = await queue.get()
+        if first is _DONE:
+            return [], True
+        items = [first]
+        deadline = None if stage.batch_timeout is None else time.perf_counter() + stage.batch_timeout
+        while stage.batch_size == 0 or len(items) < stage.batch_size:
+            try:
+                if deadline is None:
+                    item = await queue.get()
+                else:
+                    item = await asyncio.wait_for(queue.get(), max(0.0, deadline - time.perf_counter()))
+            except asyncio.TimeoutError:
+                break
+            if item is _DONE:
+                return items, True
+            items.append(item)
+        return items, False
+
+    async def _worker(self, index: int, remaining: List[int]) -> None:
+        stage = self.stages[index]
+        stats = self.stats[stage.name]
+        queue = self._queues[index]
+        while True:
+            items, done = await self._next_batch(index)
+            stats.queue_depth = queue.qsize()
+            if items:
+                if stats.started_at is None:
+                    stats.started_at = time.perf_counter()
+                stats.items_in += len(items)
+                started = time.perf_counter()
+                try:
+                    result = stage.handler(items if stage.batch_size != 1 else items[0])
+                    if stage.flatten and hasattr(result, "__aiter__"):
+                        # Асинхронный генератор: каждый результат уходит дальше сразу, не дожидаясь остальных
+                        async for output in result:
+                            stats.busy_seconds += time.perf_counter() - started
+                            await self._emit(index, output)
+                            started = time.perf_counter()
+                        outputs = []
+                    else:
+                        result = await result
+                        outputs = result if stage.flatten and isinstance(result, list) else [result]
+                except Exception as e:
+                    stats.errors += 1
+                    self.logger.error(f"Stage {stage.name} failed: {e}")
+                    raise
+                finally:
+                    stats.busy_seconds += time.perf_counter() - started
+                for output in outputs:
+                    await self._emit(index, output)
+            if done:
+                # Возвращаем маркер для соседних воркеров; последний передаёт его дальше
+                remaining[0] -= 1
+                if remaining[0] > 0:
+                    await queue.put(_DONE)
+                else:
+                    stats.finished_at = time.perf_counter()
+                    stats.completed = True
+                    await self._put(index + 1, _DONE)
+                return
+
+    async def _emit(self, index: int, output: Any) -> None:
+        """
+        Передаёт результат стадии в очередь следующей стадии (None отбрасывается).
+        """
+        if output is not None:
+            self.stats[self.stages[index].name].items_out += 1
+            await self._put(index + 1, output)
+
+    async def _drain(self, results: List[Any]) -> None:
+        queue = self._queues[-1]
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                return
+            results.append(item)
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Сводка по стадиям: количество элементов, ошибки, занятость, пропускная способность и очереди.
+        """
+        return {
+            name: {
+                "items_in": stats.items_in,
+                "items_out": stats.items_out,
+                "errors": stats.errors,
+                "busy_seconds": round(stats.busy_seconds, 3),
+                "throughput_per_second": round(stats.throughput, 3),
+                "queue_depth": stats.queue_depth,
+                "max_queue_depth": stats.max_queue_depth,
+                "completed": stats.completed,
+            }
+            for name, stats in self.stats.items()
+        }
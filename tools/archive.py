@@ -0,0 +1,284 @@
+import argparse
+import asyncio
+import csv
+import json
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from data_models import NewsItem
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS news (
+    id INTEGER PRIMARY KEY,
+    archived_at TEXT NOT NULL,
+    date TEXT,
+    source TEXT,
+    title TEXT NOT NULL,
+    description TEXT,
+    region TEXT,
+    url TEXT,
+    tags TEXT,
+    category TEXT,
+    language TEXT,
+    sentiment REAL,
+    related_sources TEXT
+);
+CREATE INDEX IF NOT EXISTS news_date ON news (date);
+CREATE INDEX IF NOT EXISTS news_region_date ON news (region, date);
+CREATE INDEX IF NOT EXISTS news_url ON news (url);
+"""
+
+# Одна и та же новость (URL, а для записей без URL — заголовок, плюс дата) хранится один раз:
+# повторный импорт или повторный прогон после сбоя не дублирует записи
+IDENTITY_INDEX = "CREATE UNIQUE INDEX IF NOT EXISTS news_identity ON news (COALESCE(url, title), date)"
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS news_fts USING fts5(
+    title, description, content='news', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS news_fts_insert AFTER INSERT ON news BEGIN
+    INSERT INTO news_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS news_fts_delete AFTER DELETE ON news BEGIN
+    INSERT INTO news_fts (news_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+END;
+"""
+
+COLUMNS = (
+    "archived_at", "date", "source", "title", "description", "region",
+    "url", "tags", "category", "language", "sentiment", "related_sources",
+)
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    """
+    Дата в ISO-формате без часового пояса (UTC), чтобы строки сортировались корректно.
+    """
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(sep=" ", timespec="seconds")
+
+
+def _fts_terms(text: str) -> str:
+    """
+    Превращает произвольный текст в запрос FTS5: каждое слово берётся в кавычки как фраза.
+    """
+    return " ".join('"' + term.replace('"', '""') + '"' for term in text.split())
+
+
+class ArchiveStore:
+    """
+    Архив новостей на SQLite (WAL + полнотекстовый индекс FTS5).
+    Все обращения к базе выполняются в отдельном потоке, чтобы не блокировать событийный цикл.
+    """
+
+    def __init__(self, path: str = "news_archive.sqlite3"):
+        self.path = path
+        self.fts = True
+        # Один поток: соединение SQLite используется только из него
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="archive")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._executor.submit(self._connect).result()
+
+    def _connect(self) -> None:
+        self._conn = sqlite3.connect(self.path)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        try:
+            self._conn.executescript(FTS_SCHEMA)
+        except sqlite3.OperationalError:
+            # Сборка SQLite без FTS5: поиск по тексту выполняется через LIKE
+            self.fts = False
+        self._create_identity_index()
+        self._conn.commit()
+
+    def _create_identity_index(self) -> None:
+        """
+        Создаёт уникальный индекс новости; в архивах, созданных до его появления,
+        сначала удаляются повторы (остаётся самая ранняя запись).
+        """
+        exists = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'news_identity'"
+        ).fetchone()
+        if exists:
+            return
+        with self._conn:
+            self._conn.execute(
+                "DELETE FROM news WHERE id NOT IN (SELECT MIN(id) FROM news GROUP BY COALESCE(url, title), date)"
+            )
+            self._conn.execute(IDENTITY_INDEX)
+
+    async def _run(self, fn, *args) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _insert(self, rows: List[tuple]) -> int:
+        placeholders = ", ".join("?" * len(COLUMNS))
+        with self._conn:
+            cursor = self._conn.executemany(
+                f"INSERT OR IGNORE INTO news ({', '.join(COLUMNS)}) VALUES ({placeholders})", rows
+            )
+        return cursor.rowcount
+
+    @staticmethod
+    def _row(item: NewsItem, archived_at: datetime) -> tuple:
+        return (
+            _iso(archived_at),
+            _iso(item.date),
+            item.source,
+            item.title,
+            item.description,
+            item.region,
+            str(item.url),
+            json.dumps(item.tags or [], ensure_ascii=False),
+            item.category,
+            item.language,
+            item.sentiment,
+            json.dumps(item.related_sources, ensure_ascii=False),
+        )
+
+    async def add_many(self, items: List[NewsItem], archived_at: Optional[datetime] = None) -> int:
+        """
+        Сохраняет пачку новостей одной транзакцией.
+
+        :param items: Список объектов NewsItem.
+        :param archived_at: Время архивации (по умолчанию — текущее).
+        :return: Количество сохранённых записей (уже архивированные новости пропускаются).
+        """
+        if not items:
+            return 0
+        archived_at = archived_at or datetime.now()
+        rows = [self._row(item, archived_at) for item in items]
+        return await self._run(self._insert, rows)
+
+    def _query(self, start, end, region, text, limit) -> List[Dict[str, Any]]:
+        conditions, params = [], []
+        if start is not None:
+            conditions.append("news.date >= ?")
+            params.append(_iso(start))
+        if end is not None:
+            conditions.append("news.date <= ?")
+            params.append(_iso(end))
+        if region is not None:
+            conditions.append("news.region = ?")
+            params.append(region)
+        source = "news"
+        fts_query = None
+        if text:
+            if self.fts:
+                source = "news JOIN news_fts ON news_fts.rowid = news.id"
+                conditions.append("news_fts MATCH ?")
+                fts_query = len(params)
+                params.append(text)
+            else:
+                conditions.append("(news.title LIKE ? OR news.description LIKE ?)")
+                params.extend([f"%{text}%"] * 2)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        sql = f"SELECT news.* FROM {source} {where} ORDER BY news.date DESC LIMIT ?"
+        try:
+            rows = self._conn.execute(sql, (*params, limit)).fetchall()
+        except sqlite3.OperationalError as e:
+            # Обычный текст (например, с апострофом) не всегда является корректным запросом FTS5:
+            # тогда ищем его слова как отдельные фразы
+            if fts_query is None or "fts5" not in str(e):
+                raise
+            params[fts_query] = _fts_terms(text)
+            rows = self._conn.execute(sql, (*params, limit)).fetchall()
+        result = []
+        for row in rows:
+            record = dict(row)
+            record["tags"] = json.loads(record["tags"] or "[]")
+            record["related_sources"] = json.loads(record["related_sources"] or "[]")
+            result.append(record)
+        return result
+
+    async def query(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        region: Optional[str] = None,
+        text: Optional[str] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """
+        Ищет новости в архиве по диапазону дат, региону и полнотекстовому запросу.
+
+        :param start: Начало диапазона дат публикации.
+        :param end: Конец диапазона дат публикации.
+        :param region: Регион.
+        :param text: Полнотекстовый запрос (синтаксис FTS5; некорректный запрос ищется как набор слов).
+        :param limit: Максимальное количество записей.
+        :return: Список записей (словарей), новые первыми.
+        """
+        return await self._run(self._query, start, end, region, text, limit)
+
+    def _import_csv(self, csv_path: str) -> int:
+        rows = []
+        with open(csv_path, newline="", encoding="utf-8") as file:
+            reader = csv.reader(file, quoting=csv.QUOTE_NONE, escapechar="\\")
+            next(reader, None)  # Заголовок
+            for record in reader:
+                if len(record) < 2:
+                    continue
+                generated = datetime.strptime(record[0], "%Y-%m-%d %H:%M:%S")
+                # В старом формате хранилась только строка "заголовок: описание"
+                text = ",".join(record[1:])
+                title, _, description = text.partition(": ")
+                rows.append((
+                    _iso(generated), _iso(generated), None, title.strip(), description.strip(),
+                    None, None, "[]", None, None, None, "[]",
+                ))
+        return self._insert(rows) if rows else 0
+
+    async def import_csv(self, csv_path: str = "news_archive.csv") -> int:
+        """
+        Переносит записи из старого news_archive.csv.
+        Дата генерации используется и как дата новости; источник, регион и URL остаются пустыми.
+
+        :param csv_path: Путь к CSV-файлу.
+        :return: Количество импортированных записей.
+        """
+        return await self._run(self._import_csv, csv_path)
+
+    async def count(self) -> int:
+        return await self._run(lambda: self._conn.execute("SELECT COUNT(*) FROM news").fetchone()[0])
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._executor.submit(self._conn.close).result()
+            self._conn = None
+        self._executor.shutdown(wait=True)
+
+
+async def _cli(args: argparse.Namespace) -> None:
+    store = ArchiveStore(args.db)
+    try:
+        if args.command == "import":
+            imported = await store.import_csv(args.csv)
+            print(f"Imported {imported} records from {args.csv}.")
+        else:
+            start = datetime.fromisoformat(args.start) if args.start else None
+            end = datetime.fromisoformat(args.end) if args.end else None
+            for record in await store.query(start, end, args.region, args.text, args.limit):
+                print(f"{record['date']}  [{record['region'] or '-'}]  {record['title']}")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Архив новостей")
+    parser.add_argument("--db", default="news_archive.sqlite3")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser("import", help="Импортировать старый news_archive.csv")
+    import_parser.add_argument("csv", nargs="?", default="news_archive.csv")
+    search_parser = commands.add_parser("search", help="Поиск по архиву")
+    search_parser.add_argument("--text")
+    search_parser.add_argument("--region")
+    search_parser.add_argument("--start")
+    search_parser.add_argument("--end")
+    search_parser.add_argument("--limit", type=int, default=20)
+    asyncio.run(_cli(parser.parse_args()))
@@ -0,0 +1,84 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, List, Sequence, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Грубая оценка: в среднем около 4 символов на токен для моделей OpenAI
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Оценивает количество токенов в тексте без обращения к токенизатору.
+    """
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def chunk_by_tokens(items: Sequence[T], render: Callable[[T], str], budget: int) -> List[List[T]]:
+    """
+    Жадно разбивает элементы на пачки, суммарный размер которых не превышает бюджет токенов.
+    Элемент, который сам по себе больше бюджета, попадает в отдельную пачку.
+
+    :param items: Элементы для разбиения.
+    :param render: Функция, возвращающая текст элемента в промпте.
+    :param budget: Бюджет токенов на пачку.
+    :return: Список пачек в исходном порядке.
+    """
+    chunks: List[List[T]] = []
+    current: List[T] = []
+    used = 0
+    for item in items:
+        cost = estimate_tokens(render(item))
+        if current and used + cost > budget:
+            chunks.append(current)
+            current, used = [], 0
+        current.append(item)
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+async def map_concurrent(fn: Callable[[T], Awaitable[R]], chunks: Sequence[T], concurrency: int) -> List[R]:
+    """
+    Применяет асинхронную функцию к пачкам с ограничением параллелизма.
+
+    :param fn: Асинхронная функция обработки пачки.
+    :param chunks: Пачки.
+    :param concurrency: Максимальное количество одновременно обрабатываемых пачек.
+    :return: Результаты в порядке пачек.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(chunk: T) -> R:
+        async with semaphore:
+            return await fn(chunk)
+
+    return await asyncio.gather(*(run(chunk) for chunk in chunks))
+
+
+async def imap_concurrent(fn: Callable[[T], Awaitable[R]], chunks: Sequence[T], concurrency: int) -> AsyncIterator[R]:
+    """
+    Как map_concurrent, но отдаёт результаты по мере готовности, а не после завершения всех пачек.
+    При ошибке или закрытии генератора незавершённые задачи отменяются.
+
+    :param fn: Асинхронная функция обработки пачки.
+    :param chunks: Пачки.
+    :param concurrency: Максимальное количество одновременно обрабатываемых пачек.
+    :return: Асинхронный итератор результатов в порядке завершения.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(chunk: T) -> R:
+        async with semaphore:
+            return await fn(chunk)
+
+    tasks = [asyncio.ensure_future(run(chunk)) for chunk in chunks]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,180 @@
+import html
+import re
+from collections import Counter
+from itertools import chain
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from tools.batching import CHARS_PER_TOKEN, estimate_tokens
+
+# Типичные хвосты RSS-описаний, не несущие информации
+BOILERPLATE_PATTERNS = [
+    re.compile(r"The post .{0,300}? appeared first on .{0,200}?(\.|$)", re.IGNORECASE),
+    re.compile(r"\b(Continue reading|Read more|Read the full (story|article)|Click here|Full story)\b.{0,200}$", re.IGNORECASE),
+    re.compile(r"\b(Subscribe|Sign up) (to|for) our newsletter.{0,200}$", re.IGNORECASE),
+    re.compile(r"\[(…|\.\.\.)\]|\[\+\d+ chars\]"),
+]
+_TAG_RE = re.compile(r"<(script|style)\b.*?</\1>|<[^>]+>", re.IGNORECASE | re.DOTALL)
+_SENTENCE_RE = re.compile(r"(?<=[.!?…])\s+(?=[\"'«“(\[]?[A-ZА-ЯЁ0-9])")
+_WORD_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def strip_html(text: Optional[str]) -> str:
+    """
+    Убирает HTML-разметку (вместе со script/style), HTML-сущности и лишние пробелы.
+    """
+    return re.sub(r"\s+", " ", html.unescape(_TAG_RE.sub(" ", text or ""))).strip()
+
+
+def clean_text(text: Optional[str]) -> str:
+    """
+    Убирает HTML-разметку, HTML-сущности, типовые хвосты RSS («Read more», «The post ... appeared first on»)
+    и лишние пробелы.
+    """
+    text = strip_html(text)
+    for pattern in BOILERPLATE_PATTERNS:
+        text = pattern.sub(" ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Делит текст на предложения по концевым знакам препинания перед заглавной буквой или цифрой.
+    """
+    return [sentence.strip() for sentence in _SENTENCE_RE.split(text) if sentence.strip()]
+
+
+class CompressionStats:
+    """
+    Итоги сжатия: оценка токенов до и после и затраченное время.
+    """
+
+    def __init__(self, tokens_in: int = 0, tokens_out: int = 0, seconds: float = 0.0):
+        self.tokens_in = tokens_in
+        self.tokens_out = tokens_out
+        self.seconds = seconds
+
+    @property
+    def ratio(self) -> float:
+        """
+        Доля оставшихся токенов (1.0 — без сжатия).
+        """
+        return self.tokens_out / self.tokens_in if self.tokens_in else 1.0
+
+
+class TextCompressor:
+    """
+    Экстрактивное сжатие описаний новостей перед отправкой в LLM.
+    Частоты слов (IDF) считаются по всем предложениям и заголовкам пачки, а матрица
+    TF-IDF (NumPy) строится отдельно для каждого текста по его собственному словарю,
+    поэтому память не растёт как «предложения пачки x словарь пачки».
+    Вес предложения — его косинусная близость к центроиду своего текста вместе
+    с заголовком. Повторы заголовка и уже выбранных предложений отбрасываются,
+    затем лучшие предложения добираются до лимита токенов и выводятся в исходном порядке.
+    """
+
+    def __init__(self, max_tokens: int = 80, max_sentences: Optional[int] = None, duplicate_threshold: float = 0.8):
+        """
+        :param max_tokens: Лимит токенов на одно описание.
+        :param max_sentences: Максимум предложений в описании (None — без ограничения).
+        :param duplicate_threshold: Косинусное сходство, при котором предложение считается повтором.
+        """
+        self.max_tokens = max_tokens
+        self.max_sentences = max_sentences
+        self.duplicate_threshold = duplicate_threshold
+
+    def compress(self, texts: Sequence[Optional[str]], titles: Optional[Sequence[str]] = None) -> List[str]:
+        """
+        Сжимает тексты пачки.
+
+        :param texts: Исходные тексты (могут содержать HTML).
+        :param titles: Заголовки тех же новостей; предложения, повторяющие заголовок, отбрасываются.
+        :return: Сжатые тексты в исходном порядке.
+        """
+        titles = list(titles) if titles is not None else [""] * len(texts)
+        sentences = [split_sentences(clean_text(text)) for text in texts]
+        title_words = [_WORD_RE.findall(title.lower()) for title in titles]
+        sentence_words = [[_WORD_RE.findall(sentence.lower()) for sentence in group] for group in sentences]
+
+        # Документная частота слов по всей пачке: заголовки и все предложения
+        documents = list(chain(title_words, chain.from_iterable(sentence_words)))
+        if not documents:
+            return ["" for _ in texts]
+        frequency = Counter(word for words in documents for word in set(words))
+
+        result = []
+        for index, item_sentences in enumerate(sentences):
+            # Последняя строка матрицы — заголовок
+            vectors = self._tfidf(sentence_words[index] + [title_words[index]], frequency, len(documents))
+            result.append(self._select(item_sentences, vectors[:-1], vectors[-1]))
+        return result
+
+    def _tfidf(self, documents: List[List[str]], frequency: Counter, total: int) -> np.ndarray:
+        """
+        Строит L2-нормированную матрицу TF-IDF (документы x словарь этих документов).
+
+        :param documents: Слова каждого документа.
+        :param frequency: Документная частота слов по всей пачке.
+        :param total: Количество документов в пачке.
+        """
+        vocabulary: Dict[str, int] = {}
+        row_ids: List[int] = []
+        column_ids: List[int] = []
+        for row, words in enumerate(documents):
+            for word in words:
+                row_ids.append(row)
+                column_ids.append(vocabulary.setdefault(word, len(vocabulary)))
+        matrix = np.zeros((len(documents), max(1, len(vocabulary))), dtype=np.float32)
+        np.add.at(matrix, (np.asarray(row_ids, dtype=np.int64), np.asarray(column_ids, dtype=np.int64)), 1.0)
+        idf = np.fromiter((frequency[word] for word in vocabulary), dtype=np.float32, count=len(vocabulary))
+        matrix[:, :len(vocabulary)] *= np.log((1 + total) / (1 + idf)).astype(np.float32) + 1.0
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms > 0, norms, 1.0)
+
+    def _select(self, sentences: List[str], vectors: np.ndarray, title: np.ndarray) -> str:
+        """
+        Выбирает предложения одного текста в пределах лимитов.
+        """
+        if not sentences:
+            return ""
+        centroid = vectors.sum(axis=0) + title
+        norm = np.linalg.norm(centroid)
+        scores = vectors @ (centroid / norm) if norm > 0 else np.zeros(len(sentences), dtype=np.float32)
+        # Предложения, почти повторяющие заголовок, не добавляют информации
+        title_similarity = vectors @ title
+
+        chosen: List[int] = []
+        used = 0
+        for index in np.argsort(-scores, kind="stable"):
+            if self.max_sentences is not None and len(chosen) >= self.max_sentences:
+                break
+            if title_similarity[index] >= self.duplicate_threshold and len(sentences) > 1:
+                continue
+            if chosen and float(np.max(vectors[chosen] @ vectors[index])) >= self.duplicate_threshold:
+                continue
+            cost = estimate_tokens(sentences[index])
+            if chosen and used + cost > self.max_tokens:
+                continue
+            chosen.append(int(index))
+            used += cost
+        if not chosen:
+            chosen = [0]
+        text = " ".join(sentences[index] for index in sorted(chosen))
+        return self._clip(text)
+
+    def _clip(self, text: str) -> str:
+        """
+        Обрезает по словам единственное предложение, которое само превышает лимит токенов.
+        """
+        if estimate_tokens(text) <= self.max_tokens:
+            return text
+        return text[:self.max_tokens * CHARS_PER_TOKEN].rsplit(" ", 1)[0] + "…"
+
+    def stats(self, texts: Sequence[Optional[str]], compressed: Sequence[str], seconds: float) -> CompressionStats:
+        """
+        Сводка сжатия пачки по оценке токенов до и после.
+        """
+        return CompressionStats(
+            tokens_in=sum(estimate_tokens(text or "") for text in texts),
+            tokens_out=sum(estimate_tokens(text) for text in compressed),
+            seconds=seconds,
+        )
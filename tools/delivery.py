@@ -0,0 +1,153 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+from data_models import NewsDigest
+from tools.seen_store import normalize_url
+
+# Максимальная длина текста сообщения в Telegram
+MESSAGE_LIMIT = 4096
+
+
+def split_message(text: str, limit: int = MESSAGE_LIMIT) -> List[str]:
+    """
+    Делит текст на части не длиннее limit символов.
+    Разрывы ставятся по границам строк, затем слов; слово длиннее limit режется жёстко.
+
+    :param text: Текст сообщения.
+    :param limit: Максимальная длина части.
+    :return: Список частей в исходном порядке.
+    """
+    if len(text) <= limit:
+        return [text]
+    parts: List[str] = []
+    current = ""
+    for line in text.split("\n"):
+        pieces = [line]
+        if len(line) > limit:
+            pieces = []
+            piece = ""
+            for word in line.split(" "):
+                while len(word) > limit:
+                    if piece:
+                        pieces.append(piece)
+                        piece = ""
+                    pieces.append(word[:limit])
+                    word = word[limit:]
+                candidate = f"{piece} {word}" if piece else word
+                if len(candidate) > limit:
+                    pieces.append(piece)
+                    piece = word
+                else:
+                    piece = candidate
+            pieces.append(piece)
+        for piece in pieces:
+            candidate = f"{current}\n{piece}" if current else piece
+            if len(candidate) > limit:
+                parts.append(current)
+                current = piece
+            else:
+                current = candidate
+    if current:
+        parts.append(current)
+    return [part for part in parts if part.strip()]
+
+
+def digest_fingerprint(digest: NewsDigest) -> str:
+    """
+    Отпечаток содержимого дайджеста: регион, категория и отсортированные URL новостей.
+    Не зависит от времени генерации и текста сводки, поэтому дайджест, заново собранный
+    из тех же новостей при повторном запуске, получает тот же отпечаток.
+    Для дайджеста без новостей используется текст сводки.
+    """
+    urls = sorted(normalize_url(item.url) for item in digest.items)
+    content = "\n".join([digest.region or "", digest.category or ""] + (urls or [digest.summary]))
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def idempotency_key(chat_id: str, fingerprint: str, part: int) -> str:
+    """
+    Ключ идемпотентности части дайджеста: часть одного и того же дайджеста
+    (см. digest_fingerprint) в тот же чат отправляется один раз.
+    """
+    return hashlib.sha256(f"{chat_id}\n{part}\n{fingerprint}".encode("utf-8")).hexdigest()
+
+
+class SentLog:
+    """
+    Постоянный журнал отправленных сообщений на SQLite.
+    Ключ — ключ идемпотентности части дайджеста; повторная публикация того же
+    дайджеста (например, после сбоя в другом чате) пропускает уже доставленные части.
+    Telegram не поддерживает идемпотентность на своей стороне, поэтому при таймауте
+    ответа на уже доставленное сообщение дубль всё ещё возможен.
+    """
+
+    def __init__(self, path: str = ".telegram_sent.sqlite3", ttl_days: float = 30.0):
+        self.path = path
+        self.ttl_days = ttl_days
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sent ("
+            " key TEXT PRIMARY KEY,"
+            " chat_id TEXT NOT NULL,"
+            " message_id INTEGER,"
+            " sent_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sent_sent_at ON sent (sent_at)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chat_migrations ("
+            " old_chat_id TEXT PRIMARY KEY,"
+            " new_chat_id TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def is_sent(self, key: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM sent WHERE key = ?", (key,)).fetchone() is not None
+
+    def mark_sent(self, key: str, chat_id: str, message_id: Optional[int] = None) -> None:
+        """
+        Отмечает часть сообщения как доставленную и удаляет устаревшие записи.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sent (key, chat_id, message_id, sent_at) VALUES (?, ?, ?, ?)",
+                (key, str(chat_id), message_id, now),
+            )
+            self._conn.execute("DELETE FROM sent WHERE sent_at < ?", (now - self.ttl_days * 86400,))
+            self._conn.commit()
+
+    def resolve_chat(self, chat_id: str) -> str:
+        """
+        Возвращает текущий идентификатор чата с учётом переезда группы в супергруппу.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT new_chat_id FROM chat_migrations WHERE old_chat_id = ?", (str(chat_id),)
+            ).fetchone()
+        return row[0] if row else str(chat_id)
+
+    def migrate_chat(self, old_chat_id: str, new_chat_id: str, keys: Dict[str, str]) -> None:
+        """
+        Запоминает переезд чата и переносит отметки уже доставленных частей на ключи нового идентификатора.
+
+        :param old_chat_id: Прежний идентификатор чата.
+        :param new_chat_id: Новый идентификатор чата.
+        :param keys: Соответствие прежних ключей идемпотентности новым.
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chat_migrations (old_chat_id, new_chat_id) VALUES (?, ?)",
+                (str(old_chat_id), str(new_chat_id)),
+            )
+            self._conn.executemany(
+                "UPDATE OR REPLACE sent SET key = ?, chat_id = ? WHERE key = ?",
+                [(new_key, str(new_chat_id), old_key) for old_key, new_key in keys.items()],
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
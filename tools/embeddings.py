@@ -0,0 +1,85 @@
+import hashlib
+import sqlite3
+import threading
+from typing import List, Optional
+import numpy as np
+
+
+class Embedder:
+    """
+    Пакетное вычисление эмбеддингов на CPU через sentence-transformers.
+    Векторы кешируются в SQLite по хешу текста и имени модели,
+    поэтому неизменившиеся тексты повторно не кодируются.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        cache_path: Optional[str] = ".embedding_cache.sqlite3",
+        batch_size: int = 64,
+    ):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.hits = 0
+        self.misses = 0
+        self._model = None
+        self._lock = threading.Lock()
+        self._conn = None
+        if cache_path:
+            self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+            self._conn.commit()
+
+    @property
+    def model(self):
+        # Модель загружается один раз при первом обращении
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            self._model = SentenceTransformer(self.model_name, device="cpu")
+        return self._model
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha1(f"{self.model_name}\n{text}".encode("utf-8")).hexdigest()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Возвращает нормализованные эмбеддинги для списка текстов.
+
+        :param texts: Тексты для кодирования.
+        :return: Матрица float32 размером (len(texts), dim).
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        keys = [self._key(text) for text in texts]
+        vectors = {}
+        if self._conn is not None:
+            with self._lock:
+                for start in range(0, len(keys), 500):
+                    chunk = keys[start:start + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = self._conn.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                    ).fetchall()
+                    vectors.update((key, np.frombuffer(blob, dtype=np.float32)) for key, blob in rows)
+
+        missing = [i for i, key in enumerate(keys) if key not in vectors]
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            encoded = self.model.encode(
+                [texts[i] for i in missing],
+                batch_size=self.batch_size,
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            ).astype(np.float32)
+            for i, vector in zip(missing, encoded):
+                vectors[keys[i]] = vector
+            if self._conn is not None:
+                with self._lock:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                        [(keys[i], vector.tobytes()) for i, vector in zip(missing, encoded)],
+                    )
+                    self._conn.commit()
+        return np.vstack([vectors[key] for key in keys])
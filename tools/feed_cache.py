@@ -0,0 +1,78 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, Optional
+
+
+class FeedCache:
+    """
+    Дисковый кеш лент для условных GET-запросов.
+    Для каждого URL хранит валидаторы ETag/Last-Modified и уже разобранные записи,
+    чтобы при ответе 304 не загружать и не разбирать ленту повторно.
+    """
+
+    def __init__(self, directory: str = ".feed_cache"):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Возвращает запись кеша для URL или None.
+
+        :param url: URL ленты.
+        :return: Словарь с ключами etag, last_modified и feed.
+        """
+        try:
+            with open(self._path(url), encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """
+        Формирует заголовки If-None-Match / If-Modified-Since для URL.
+
+        :param url: URL ленты.
+        :return: Словарь заголовков (пустой, если ленты нет в кеше).
+        """
+        cached = self.get(url)
+        if not cached:
+            return {}
+        headers = {}
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+        return headers
+
+    def put(self, url: str, response_headers: Dict[str, str], feed: Dict[str, Any]) -> None:
+        """
+        Сохраняет разобранную ленту вместе с валидаторами из ответа.
+        Ленты без ETag и Last-Modified не кешируются.
+
+        :param url: URL ленты.
+        :param response_headers: Заголовки ответа (ключи в нижнем регистре).
+        :param feed: Результат tools.feed_parsing.parse_feed.
+        """
+        etag = response_headers.get("etag")
+        last_modified = response_headers.get("last-modified")
+        if not etag and not last_modified:
+            return
+        path = self._path(url)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump({"url": url, "etag": etag, "last_modified": last_modified, "feed": feed}, file)
+        os.replace(tmp_path, path)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
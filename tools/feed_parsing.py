@@ -0,0 +1,202 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Optional
+from xml.etree.ElementTree import Element, ParseError, XMLPullParser
+
+_ATOM = "{http://www.w3.org/2005/Atom}"
+_RSS1 = "{http://purl.org/rss/1.0/}"
+# Теги записей и контейнеров ленты в RSS 2.0, RSS 1.0 (RDF) и Atom
+ENTRY_TAGS = {"item", _RSS1 + "item", _ATOM + "entry"}
+FEED_TAGS = {"channel", _RSS1 + "channel", _ATOM + "feed"}
+
+
+def parse_feed(content: bytes) -> Dict[str, Any]:
+    """
+    Разбирает RSS/Atom-ленту и возвращает компактное представление,
+    пригодное для сериализации в JSON.
+
+    :param content: Тело ответа с лентой.
+    :return: Словарь с названием ленты и списком записей.
+    """
+    # Импорт внутри функции: модуль загружается только в процессах, которые разбирают ленты
+    import feedparser
+
+    feed = feedparser.parse(content)
+    entries: List[Dict[str, Any]] = []
+    for entry in feed.entries:
+        published = entry.get("published_parsed")
+        entries.append({
+            "title": entry.get("title"),
+            "summary": entry.get("summary"),
+            "link": entry.get("link"),
+            "published": list(published[:6]) if published else None,
+        })
+    return {"title": feed.feed.get("title"), "entries": entries}
+
+
+class FeedParseError(Exception):
+    """
+    Лента не является корректным XML; её нужно разобрать feedparser'ом.
+    """
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _text(element: Element) -> str:
+    return "".join(element.itertext()).strip()
+
+
+def parse_date(value: Optional[str]) -> Optional[List[int]]:
+    """
+    Разбирает дату RFC 822 (RSS) или ISO 8601 (Atom, dc:date) в список
+    [год, месяц, день, час, минута, секунда] по UTC — как published_parsed у feedparser.
+    """
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc)
+    return list(parsed.timetuple()[:6])
+
+
+def _entry(element: Element) -> Dict[str, Any]:
+    """
+    Извлекает из элемента item/entry те же поля, что и parse_feed.
+    """
+    fields: Dict[str, str] = {}
+    for child in element:
+        name = _local(child.tag)
+        if name == "link":
+            href = child.get("href")
+            if href is None:
+                fields.setdefault("link", (child.text or "").strip())
+            elif child.get("rel", "alternate") == "alternate" or "link" not in fields:
+                fields["link"] = href
+        elif name == "title":
+            fields["title"] = _text(child)
+        elif name in ("description", "summary"):
+            fields["summary"] = _text(child)
+        elif name in ("encoded", "content"):
+            fields.setdefault("content", _text(child))
+        elif name in ("pubDate", "published", "date", "issued"):
+            fields.setdefault("published", _text(child))
+        elif name in ("updated", "modified"):
+            fields.setdefault("updated", _text(child))
+    return {
+        "title": fields.get("title"),
+        "summary": fields.get("summary") or fields.get("content"),
+        "link": fields.get("link"),
+        "published": parse_date(fields.get("published") or fields.get("updated")),
+    }
+
+
+class StreamingFeedParser:
+    """
+    Потоковый разбор RSS/Atom: тело ленты подаётся частями в XMLPullParser,
+    записи отдаются по одной и сразу удаляются из дерева, поэтому память не
+    зависит от размера ленты. Если задан since, чтение прекращается, когда
+    подряд идут older_tolerance записей старше since (ленты упорядочены от новых
+    к старым, допуск нужен для слегка перемешанных). Некорректный XML вызывает
+    FeedParseError — такую ленту следует разобрать parse_feed.
+    """
+
+    def __init__(self, since: Optional[datetime] = None, older_tolerance: int = 5):
+        """
+        :param since: Начало окна дат (наивное время, сравнивается с датами записей по UTC, как в CollectorAgent).
+        :param older_tolerance: Сколько записей подряд старше since нужно встретить, чтобы прекратить чтение.
+        """
+        self.since = since
+        self.older_tolerance = older_tolerance
+        self.title: Optional[str] = None
+        self.bytes_read = 0
+        self.entries_seen = 0
+        self.stopped_early = False
+
+    async def entries(self, chunks: AsyncIterable[bytes]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Отдаёт записи ленты по мере чтения.
+
+        :param chunks: Асинхронный итератор частей тела ответа.
+        :return: Асинхронный итератор записей в формате parse_feed (записи старше since пропускаются).
+        """
+        parser = XMLPullParser(events=("start", "end"))
+        stack: List[Element] = []
+        older = 0
+        try:
+            async for chunk in chunks:
+                self.bytes_read += len(chunk)
+                parser.feed(chunk)
+                for event, element in parser.read_events():
+                    if event == "start":
+                        stack.append(element)
+                        continue
+                    stack.pop()
+                    if element.tag in ENTRY_TAGS:
+                        entry = _entry(element)
+                        # Разобранная запись больше не нужна дереву
+                        if stack:
+                            stack[-1].remove(element)
+                        self.entries_seen += 1
+                        if self.since and entry["published"] and datetime(*entry["published"]) < self.since:
+                            older += 1
+                            if older >= self.older_tolerance:
+                                self.stopped_early = True
+                                return
+                            continue
+                        older = 0
+                        yield entry
+                    elif self.title is None and _local(element.tag) == "title" and stack and stack[-1].tag in FEED_TAGS:
+                        self.title = _text(element)
+            parser.close()
+        except ParseError as e:
+            raise FeedParseError(str(e)) from e
+
+
+class FeedParserPool:
+    """
+    Пул процессов для разбора лент.
+    feedparser написан на чистом Python и нагружает CPU, поэтому разбор выносится из
+    событийного цикла в отдельные процессы; обратно передаются только компактные словари.
+    При workers=0 разбор выполняется прямо в цикле. Процессы запускаются при первом
+    разборе, поэтому запуски, где все ленты пришли из кеша (304), их не создают.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    async def parse(self, content: bytes) -> Dict[str, Any]:
+        """
+        Разбирает ленту в пуле процессов.
+
+        :param content: Тело ответа с лентой.
+        :return: Результат parse_feed.
+        """
+        if self.workers <= 0:
+            return parse_feed(content)
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, parse_feed, content)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def __enter__(self) -> "FeedParserPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,155 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+from pydantic import BaseModel, Field
+
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
+
+
+class FetchResult(BaseModel):
+    """
+    Результат загрузки одной RSS-ленты.
+    """
+    url: str = Field(..., description="URL ленты")
+    status: Optional[int] = Field(None, description="HTTP-статус ответа")
+    content: bytes = Field(default=b"", description="Тело ответа")
+    headers: Dict[str, str] = Field(default_factory=dict, description="Заголовки ответа")
+    elapsed: float = Field(0.0, description="Время загрузки в секундах")
+    error: Optional[str] = Field(None, description="Текст ошибки, если загрузка не удалась")
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class FeedFetcher:
+    """
+    Общий движок загрузки лент.
+    Держит один пул соединений aiohttp на все CollectorAgent'ы и ограничивает
+    число одновременных запросов глобально и для каждого хоста.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 50,
+        per_host_limit: int = 6,
+        timeout: float = 20.0,
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        self.max_concurrency = max_concurrency
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.headers = {**DEFAULT_HEADERS, **(headers or {})}
+        self.timings: Dict[str, float] = {}
+        self._session: Optional[Any] = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    async def __aenter__(self) -> "FeedFetcher":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def start(self) -> None:
+        """
+        Создаёт общую сессию с пулом соединений и кешем DNS.
+        aiohttp импортируется при первом запуске сессии, а не при импорте модуля.
+        """
+        if self._session is None or self._session.closed:
+            import aiohttp
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrency,
+                limit_per_host=self.per_host_limit,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._host_semaphores[host]
+
+    async def fetch(self, url: str, headers: Optional[Dict[str, str]] = None) -> FetchResult:
+        """
+        Загружает одну ленту с учётом лимитов и таймаута.
+
+        :param url: URL ленты.
+        :param headers: Дополнительные заголовки запроса.
+        :return: Объект FetchResult; ошибки не пробрасываются, а записываются в поле error.
+        """
+        return await self._get(url, headers, None)
+
+    async def fetch_stream(
+        self,
+        url: str,
+        consume: Callable[[AsyncIterator[bytes]], Awaitable[None]],
+        headers: Optional[Dict[str, str]] = None,
+        chunk_size: int = 64 * 1024,
+    ) -> FetchResult:
+        """
+        Загружает ленту потоком: тело не накапливается в памяти, а по частям передаётся consume.
+        Если consume вернулся раньше конца тела, соединение закрывается без дочитывания.
+
+        :param url: URL ленты.
+        :param consume: Корутина, читающая асинхронный итератор частей тела.
+        :param headers: Дополнительные заголовки запроса.
+        :param chunk_size: Размер части в байтах.
+        :return: Объект FetchResult с пустым content.
+        """
+        return await self._get(url, headers, lambda response: consume(response.content.iter_chunked(chunk_size)))
+
+    async def _get(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]],
+        consume: Optional[Callable[[Any], Awaitable[None]]],
+    ) -> FetchResult:
+        await self.start()
+        started = time.perf_counter()
+        result = FetchResult(url=url)
+        try:
+            async with self._semaphore, self._host_semaphore(url):
+                async with self._session.get(url, headers=headers) as response:
+                    result.status = response.status
+                    result.headers = {k.lower(): v for k, v in response.headers.items()}
+                    if response.status != 304:
+                        response.raise_for_status()
+                        if consume is None:
+                            result.content = await response.read()
+                        else:
+                            await consume(response)
+        except asyncio.TimeoutError:
+            result.error = f"timeout after {self.timeout}s"
+        except Exception as e:
+            result.error = str(e) or type(e).__name__
+        result.elapsed = time.perf_counter() - started
+        self.timings[url] = result.elapsed
+        return result
+
+    async def fetch_many(self, urls: List[str]) -> List[FetchResult]:
+        """
+        Загружает несколько лент параллельно.
+
+        :param urls: Список URL.
+        :return: Результаты в том же порядке, что и urls.
+        """
+        return await asyncio.gather(*(self.fetch(url) for url in urls))
+
+    def slowest(self, n: int = 5) -> List[tuple]:
+        """
+        Возвращает n самых медленных лент за время жизни движка.
+        """
+        return sorted(self.timings.items(), key=lambda kv: kv[1], reverse=True)[:n]
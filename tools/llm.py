@@ -0,0 +1,267 @@
+import asyncio
+import os
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, List, Optional, TypeVar
+from pydantic import TypeAdapter
+from tools.batching import estimate_tokens
+from tools.llm_cache import LLMCache, make_key
+from tools.metrics import METRICS
+from tools.rate_limit import TokenBucket
+
+T = TypeVar("T")
+
+# HTTP-статусы, при которых запрос к LLM имеет смысл повторить
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+# Ошибки соединения openai/httpx, при которых запрос повторяется
+RETRYABLE_ERRORS = {"APIConnectionError", "APITimeoutError", "TransportError"}
+
+
+def build_agent(model_name: str, system_prompt: str, result_type: Any = str) -> Any:
+    """
+    Создаёт агента pydantic-ai с моделью OpenAI.
+    pydantic_ai и openai импортируются здесь, а не при импорте модуля: их загрузка
+    занимает заметную часть времени старта, а запуски без новостей до LLM не доходят.
+    Встроенные повторы клиента openai отключены — ими управляет LLMLimiter.
+    Адрес API можно переопределить переменной OPENAI_BASE_URL (например, для локального фейкового сервера).
+
+    :param model_name: Имя модели OpenAI.
+    :param system_prompt: Системный промпт агента.
+    :param result_type: Тип результата агента.
+    :return: Агент pydantic-ai.
+    """
+    from openai import AsyncOpenAI
+    from pydantic_ai import Agent
+    from pydantic_ai.models.openai import OpenAIModel
+
+    client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+    return Agent(
+        model=OpenAIModel(model_name, openai_client=client),
+        result_type=result_type,
+        system_prompt=system_prompt,
+    )
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Определяет, стоит ли повторять запрос после ошибки.
+    Исчерпанная квота (insufficient_quota) не повторяется: ожидание её не восстановит.
+    """
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    if getattr(error, "code", None) == "insufficient_quota":
+        return False
+    if getattr(error, "status_code", None) in RETRYABLE_STATUSES:
+        return True
+    return any(cls.__name__ in RETRYABLE_ERRORS for cls in type(error).__mro__)
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """
+    Извлекает из ответа сервера рекомендованную паузу перед повтором (retry-after-ms или retry-after).
+
+    :return: Пауза в секундах или None, если сервер её не указал.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMLimiter:
+    """
+    Общий слой исполнения запросов к LLM для всех агентов:
+    глобальный семафор, лимиты запросов и токенов в минуту, повторы с
+    экспоненциальной задержкой и случайным разбросом, учёт retry-after,
+    таймаут попытки и общий дедлайн вызова, а также (опционально) хеджирование —
+    дублирующий запрос, если первый не ответил за hedge_after секунд.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        requests_per_minute: Optional[float] = 500,
+        tokens_per_minute: Optional[float] = 200_000,
+        max_retries: int = 4,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        timeout: Optional[float] = 120.0,
+        deadline: Optional[float] = 600.0,
+        hedge_after: Optional[float] = None,
+    ):
+        """
+        :param max_concurrency: Максимум одновременных запросов.
+        :param requests_per_minute: Лимит запросов в минуту (None — без лимита).
+        :param tokens_per_minute: Лимит токенов в минуту (None — без лимита).
+        :param max_retries: Количество повторов после первой попытки.
+        :param base_delay: Начальная задержка перед повтором в секундах.
+        :param max_delay: Максимальная задержка перед повтором.
+        :param timeout: Таймаут одной попытки (без учёта ожидания лимитов).
+        :param deadline: Общий дедлайн вызова вместе с повторами и ожиданием лимитов.
+        :param hedge_after: Через сколько секунд отправлять дублирующий запрос (None — не хеджировать).
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.deadline = deadline
+        self.hedge_after = hedge_after
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self._requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Задержка перед повтором: экспонента с полным случайным разбросом (full jitter).
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def call(self, fn: Callable[[], Awaitable[T]], tokens: int = 0, name: str = "LLM") -> T:
+        """
+        Выполняет запрос с учётом лимитов, повторов и дедлайна.
+
+        :param fn: Фабрика корутины запроса (вызывается заново на каждую попытку).
+        :param tokens: Оценка токенов запроса для лимита TPM.
+        :param name: Имя агента для метрик.
+        :return: Результат fn.
+        """
+        if self.deadline is None:
+            return await self._call_with_retries(fn, tokens, name)
+        try:
+            return await asyncio.wait_for(self._call_with_retries(fn, tokens, name), self.deadline)
+        except asyncio.TimeoutError:
+            METRICS.record_llm_event(name, timeouts=1)
+            raise
+
+    def settle(self, estimated: int, actual: Optional[int]) -> None:
+        """
+        Дописывает в лимит TPM разницу между фактическим расходом токенов и оценкой.
+        """
+        if self._tokens is not None and actual and actual > estimated:
+            self._tokens.consume(actual - estimated)
+
+    async def _call_with_retries(self, fn: Callable[[], Awaitable[T]], tokens: int, name: str) -> T:
+        attempt = 0
+        while True:
+            try:
+                if self.hedge_after is None:
+                    return await self._attempt(fn, tokens)
+                return await self._hedged(fn, tokens, name)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = retry_after(e)
+                if delay is None:
+                    delay = self.backoff(attempt)
+                attempt += 1
+                METRICS.record_llm_event(name, retries=1, timeouts=int(isinstance(e, asyncio.TimeoutError)))
+                await asyncio.sleep(delay)
+
+    async def _attempt(self, fn: Callable[[], Awaitable[T]], tokens: int, sent: Optional[asyncio.Event] = None) -> T:
+        """
+        Одна попытка: ожидание лимитов скорости, затем запрос под семафором с таймаутом.
+
+        :param sent: Событие, которое выставляется в момент фактической отправки запроса.
+        """
+        if self._requests is not None:
+            await self._requests.acquire(1)
+        if self._tokens is not None and tokens:
+            await self._tokens.acquire(tokens)
+        async with self._semaphore:
+            if sent is not None:
+                sent.set()
+            return await asyncio.wait_for(fn(), self.timeout)
+
+    async def _hedged(self, fn: Callable[[], Awaitable[T]], tokens: int, name: str) -> T:
+        """
+        Попытка с хеджированием: если первый запрос не завершился за hedge_after секунд,
+        отправляется второй, и используется первый успешный ответ.
+        """
+        sent = asyncio.Event()
+        tasks: List[asyncio.Task] = [asyncio.ensure_future(self._attempt(fn, tokens, sent))]
+        try:
+            # Таймер хеджирования отсчитывается от отправки запроса, а не от ожидания лимитов
+            waiter = asyncio.ensure_future(sent.wait())
+            await asyncio.wait([tasks[0], waiter], return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+            done, pending = await asyncio.wait(tasks, timeout=self.hedge_after)
+            if not done:
+                METRICS.record_llm_event(name, hedges=1)
+                tasks.append(asyncio.ensure_future(self._attempt(fn, tokens)))
+                pending = set(tasks)
+            error: Optional[BaseException] = None
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                if not pending:
+                    raise error
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+async def run_agent(
+    agent: Any,
+    user_prompt: str,
+    *,
+    model_name: str,
+    system_prompt: str,
+    result_type: Any = str,
+    cache: Optional[LLMCache] = None,
+    limiter: Optional[LLMLimiter] = None,
+    agent_name: str = "LLM",
+) -> Any:
+    """
+    Выполняет запрос к агенту pydantic-ai с учётом кеша ответов.
+
+    :param agent: Агент pydantic-ai.
+    :param user_prompt: Пользовательский промпт.
+    :param model_name: Имя модели (входит в ключ кеша).
+    :param system_prompt: Системный промпт агента (входит в ключ кеша).
+    :param result_type: Тип результата для сериализации в кеше.
+    :param cache: Кеш ответов; если не задан, запрос выполняется всегда.
+    :param limiter: Слой лимитов и повторов; если не задан, запрос выполняется напрямую.
+    :param agent_name: Имя агента для учёта токенов в метриках.
+    :return: Данные ответа модели (response.data).
+    """
+    adapter = TypeAdapter(result_type)
+    key = make_key(model_name, system_prompt, user_prompt)
+    if cache is not None:
+        # Кеш на SQLite: обращения выполняются вне событийного цикла, как у остальных хранилищ
+        cached = await asyncio.to_thread(cache.get, key)
+        if cached is not None:
+            METRICS.record_llm_usage(agent_name, cached=True)
+            return adapter.validate_json(cached)
+
+    if limiter is None:
+        response = await agent.run(user_prompt)
+    else:
+        estimated = estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
+        response = await limiter.call(lambda: agent.run(user_prompt), tokens=estimated, name=agent_name)
+        limiter.settle(estimated, response.usage().total_tokens)
+    METRICS.record_llm_usage(agent_name, response.usage())
+    if cache is not None and response.data:
+        tokens = response.usage().total_tokens or 0
+        await asyncio.to_thread(cache.put, key, adapter.dump_json(response.data).decode("utf-8"), tokens)
+    return response.data
@@ -0,0 +1,96 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+def make_key(model_name: str, system_prompt: str, user_prompt: str) -> str:
+    """
+    Ключ кеша: хеш имени модели, системного и пользовательского промптов.
+    """
+    digest = hashlib.sha256()
+    for part in (model_name, system_prompt, user_prompt):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class LLMCache:
+    """
+    Дисковый кеш ответов LLM с адресацией по содержимому промпта.
+    Размер ограничен max_entries с вытеснением давно неиспользуемых записей (LRU),
+    записи старше ttl_seconds считаются устаревшими.
+    """
+
+    def __init__(self, path: str = ".llm_cache.sqlite3", max_entries: int = 1000, ttl_seconds: float = 7 * 86400):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.saved_tokens = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " tokens INTEGER NOT NULL DEFAULT 0,"
+            " created REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Возвращает сохранённый ответ или None, если его нет или он устарел.
+
+        :param key: Ключ из make_key.
+        :return: Сериализованный ответ модели.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, tokens, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[2] > self.ttl_seconds:
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            self.saved_tokens += row[1]
+        return row[0]
+
+    def put(self, key: str, value: str, tokens: int = 0) -> None:
+        """
+        Сохраняет ответ и вытесняет самые давно использованные записи сверх лимита.
+
+        :param key: Ключ из make_key.
+        :param value: Сериализованный ответ модели.
+        :param tokens: Количество токенов, потраченных на ответ.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, tokens, created, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, value, tokens, now, now),
+            )
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "saved_tokens": self.saved_tokens,
+        }
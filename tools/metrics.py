@@ -0,0 +1,271 @@
+import bisect
+import json
+import os
+import random
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+# Границы корзин гистограммы длительности в секундах
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class Histogram:
+    """
+    Гистограмма длительностей с фиксированными корзинами
+    и ограниченной выборкой значений для расчёта перцентилей.
+    """
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS, max_samples: int = 10000):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max_samples = max_samples
+        self.samples: List[float] = []
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        # Резервуарная выборка: память не растёт при длительной работе
+        if len(self.samples) < self.max_samples:
+            self.samples.append(value)
+        else:
+            index = random.randrange(self.count)
+            if index < self.max_samples:
+                self.samples[index] = value
+
+    def percentile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(round(q / 100.0 * (len(ordered) - 1))))]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "p50": round(self.percentile(50), 6),
+            "p95": round(self.percentile(95), 6),
+            "p99": round(self.percentile(99), 6),
+            "buckets": {str(bound): count for bound, count in zip(self.buckets + ("+Inf",), self.counts)},
+        }
+
+
+class AgentMetrics:
+    """
+    Метрики одного агента.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.items_in = 0
+        self.items_out = 0
+        self.duration = Histogram()
+        self.llm_requests = 0
+        self.llm_cache_hits = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.llm_retries = 0
+        self.llm_timeouts = 0
+        self.llm_hedges = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "duration_seconds": self.duration.snapshot(),
+            "llm_requests": self.llm_requests,
+            "llm_cache_hits": self.llm_cache_hits,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "llm_retries": self.llm_retries,
+            "llm_timeouts": self.llm_timeouts,
+            "llm_hedges": self.llm_hedges,
+        }
+
+
+class MetricsRegistry:
+    """
+    Реестр метрик всех агентов: длительность вызовов process, количество элементов,
+    ошибки и расход токенов LLM. Метрики отдельных функций (доставка, сжатие) хранятся
+    в счётчиках с метками (inc), а не в полях каждого агента.
+    Умеет сохранять отчёт в JSON и формат Prometheus.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._agents: Dict[str, AgentMetrics] = {}
+        # Счётчики с метками для метрик отдельных функций: имя -> набор меток -> значение
+        self._counters: Dict[str, Dict[Tuple[Tuple[str, str], ...], float]] = {}
+        self.started_at = datetime.now()
+
+    def agent(self, name: str) -> AgentMetrics:
+        with self._lock:
+            if name not in self._agents:
+                self._agents[name] = AgentMetrics()
+            return self._agents[name]
+
+    def observe_call(self, name: str, seconds: float, items_in: int, items_out: int, error: bool = False) -> None:
+        """
+        Регистрирует один вызов process агента.
+        """
+        metrics = self.agent(name)
+        with self._lock:
+            metrics.calls += 1
+            metrics.errors += int(error)
+            metrics.items_in += items_in
+            metrics.items_out += items_out
+            metrics.duration.observe(seconds)
+
+    def record_llm_usage(self, name: str, usage: Any = None, cached: bool = False) -> None:
+        """
+        Регистрирует запрос к LLM и расход токенов.
+
+        :param name: Имя агента.
+        :param usage: Объект pydantic_ai.usage.Usage (или None для ответа из кеша).
+        :param cached: Был ли ответ взят из кеша.
+        """
+        metrics = self.agent(name)
+        with self._lock:
+            if cached:
+                metrics.llm_cache_hits += 1
+                return
+            metrics.llm_requests += 1
+            if usage is not None:
+                metrics.prompt_tokens += usage.request_tokens or 0
+                metrics.completion_tokens += usage.response_tokens or 0
+
+    def record_llm_event(self, name: str, retries: int = 0, timeouts: int = 0, hedges: int = 0) -> None:
+        """
+        Регистрирует повторы, таймауты и хеджированные запросы к LLM.
+        """
+        metrics = self.agent(name)
+        with self._lock:
+            metrics.llm_retries += retries
+            metrics.llm_timeouts += timeouts
+            metrics.llm_hedges += hedges
+
+    def record_delivery(self, name: str, sent: int = 0, skipped: int = 0, failed: int = 0, retries: int = 0) -> None:
+        """
+        Регистрирует доставку сообщений: отправленные, пропущенные как уже доставленные,
+        неотправленные и повторы отправки.
+        """
+        self.inc("messages_sent", sent, agent=name)
+        self.inc("messages_skipped", skipped, agent=name)
+        self.inc("messages_failed", failed, agent=name)
+        self.inc("send_retries", retries, agent=name)
+
+    def inc(self, metric: str, value: float = 1, **labels: str) -> None:
+        """
+        Увеличивает счётчик с метками (в формате Prometheus — news_agent_<metric>_total).
+
+        :param metric: Имя счётчика.
+        :param value: Приращение.
+        :param labels: Метки серии, например agent="CompressorAgent".
+        """
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(metric, {})
+            series[key] = series.get(key, 0) + value
+
+    def counter(self, metric: str, **labels: str) -> float:
+        """
+        Сумма значений счётчика по всем сериям, у которых совпадают заданные метки.
+        """
+        with self._lock:
+            return sum(
+                value for key, value in self._counters.get(metric, {}).items()
+                if all(dict(key).get(label) == expected for label, expected in labels.items())
+            )
+
+    def record_compression(self, name: str, tokens_in: int, tokens_out: int, seconds: float, saved_seconds: float) -> None:
+        """
+        Регистрирует сжатие текстов перед LLM: оценку токенов до и после, время сжатия
+        и оценку сэкономленного времени обработки промпта.
+        """
+        self.inc("compression_tokens_in", tokens_in, agent=name)
+        self.inc("compression_tokens_out", tokens_out, agent=name)
+        self.inc("compression_seconds", seconds, agent=name)
+        self.inc("compression_saved_seconds", saved_seconds, agent=name)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._agents.clear()
+            self._counters.clear()
+            self.started_at = datetime.now()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "started_at": self.started_at.isoformat(),
+                "generated_at": datetime.now().isoformat(),
+                "agents": {name: metrics.snapshot() for name, metrics in self._agents.items()},
+                "counters": {
+                    metric: [{"labels": dict(key), "value": round(value, 6)} for key, value in series.items()]
+                    for metric, series in self._counters.items()
+                },
+            }
+
+    def write_report(self, path: str, extra: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Сохраняет отчёт о запуске в JSON.
+
+        :param path: Путь к файлу отчёта.
+        :param extra: Дополнительные разделы отчёта (например, статистика конвейера).
+        """
+        report = self.snapshot()
+        report.update(extra or {})
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2, default=str)
+
+    def render_prometheus(self) -> str:
+        """
+        Возвращает метрики в текстовом формате Prometheus.
+        """
+        counters = {
+            "calls": "news_agent_calls_total",
+            "errors": "news_agent_errors_total",
+            "items_in": "news_agent_items_in_total",
+            "items_out": "news_agent_items_out_total",
+            "llm_requests": "news_agent_llm_requests_total",
+            "llm_cache_hits": "news_agent_llm_cache_hits_total",
+            "prompt_tokens": "news_agent_prompt_tokens_total",
+            "completion_tokens": "news_agent_completion_tokens_total",
+            "llm_retries": "news_agent_llm_retries_total",
+            "llm_timeouts": "news_agent_llm_timeouts_total",
+            "llm_hedges": "news_agent_llm_hedges_total",
+        }
+        lines = []
+        with self._lock:
+            agents = list(self._agents.items())
+            for attribute, metric in counters.items():
+                lines.append(f"# TYPE {metric} counter")
+                for name, metrics in agents:
+                    lines.append(f'{metric}{{agent="{name}"}} {getattr(metrics, attribute)}')
+            for metric, series in self._counters.items():
+                lines.append(f"# TYPE news_agent_{metric}_total counter")
+                for key, value in series.items():
+                    labels = ",".join(f'{label}="{label_value}"' for label, label_value in key)
+                    lines.append(f"news_agent_{metric}_total{{{labels}}} {value}")
+            lines.append("# TYPE news_agent_process_seconds histogram")
+            for name, metrics in agents:
+                histogram = metrics.duration
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                    cumulative += count
+                    lines.append(f'news_agent_process_seconds_bucket{{agent="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'news_agent_process_seconds_sum{{agent="{name}"}} {histogram.sum}')
+                lines.append(f'news_agent_process_seconds_count{{agent="{name}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+
+# Общий реестр метрик процесса
+METRICS = MetricsRegistry()
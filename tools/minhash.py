@@ -0,0 +1,156 @@
+import re
+import zlib
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+# Простое число Мерсенна 2^31 - 1: произведение a * h помещается в int64
+_PRIME = (1 << 31) - 1
+
+
+def shingles(text: str, size: int = 5) -> np.ndarray:
+    """
+    Разбивает нормализованный текст на символьные шинглы и хеширует их.
+
+    :param text: Исходный текст.
+    :param size: Длина шингла в символах.
+    :return: Массив уникальных 31-битных хешей шинглов.
+    """
+    normalized = re.sub(r"\W+", " ", text.lower()).strip()
+    if len(normalized) <= size:
+        grams = {normalized}
+    else:
+        grams = {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) & _PRIME for g in grams), dtype=np.int64, count=len(grams))
+
+
+def optimal_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    Подбирает число полос b и строк r (b * r = num_perm) так,
+    чтобы порог срабатывания LSH (1/b)^(1/r) был ближе всего к threshold.
+    """
+    best = (num_perm, 1)
+    best_error = float("inf")
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        error = abs((1.0 / bands) ** (1.0 / rows) - threshold)
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+class MinHashLSH:
+    """
+    Индекс почти-дубликатов на основе MinHash и LSH-полос.
+    Работает примерно за линейное время: сравниваются только кандидаты из общих корзин.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.6,
+        num_perm: int = 128,
+        bands: Optional[int] = None,
+        shingle_size: int = 5,
+        seed: int = 1,
+    ):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        if bands is None:
+            self.bands, self.rows = optimal_bands(threshold, num_perm)
+        else:
+            if num_perm % bands:
+                raise ValueError("num_perm must be divisible by bands.")
+            self.bands, self.rows = bands, num_perm // bands
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, size=num_perm, dtype=np.int64)
+        self._b = rng.integers(0, _PRIME, size=num_perm, dtype=np.int64)
+        self._buckets: List[Dict[bytes, List[int]]] = [defaultdict(list) for _ in range(self.bands)]
+        self._signatures: List[np.ndarray] = []
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        Вычисляет MinHash-сигнатуру текста.
+        """
+        hashes = shingles(text, self.shingle_size)
+        return ((np.outer(self._a, hashes) + self._b[:, None]) % _PRIME).min(axis=1)
+
+    def add(self, text: str) -> int:
+        """
+        Добавляет текст в индекс.
+
+        :return: Порядковый номер текста в индексе.
+        """
+        index = len(self._signatures)
+        signature = self.signature(text)
+        self._signatures.append(signature)
+        for band, bucket in enumerate(self._buckets):
+            bucket[signature[band * self.rows:(band + 1) * self.rows].tobytes()].append(index)
+        return index
+
+    def query(self, text: str) -> List[int]:
+        """
+        Ищет в индексе почти-дубликаты текста, не добавляя его.
+
+        :return: Порядковые номера найденных текстов по возрастанию.
+        """
+        signature = self.signature(text)
+        candidates = set()
+        for band, bucket in enumerate(self._buckets):
+            candidates.update(bucket.get(signature[band * self.rows:(band + 1) * self.rows].tobytes(), ()))
+        return sorted(i for i in candidates if np.mean(self._signatures[i] == signature) >= self.threshold)
+
+    def similarity(self, i: int, j: int) -> float:
+        """
+        Оценка коэффициента Жаккара по доле совпавших позиций сигнатур.
+        """
+        return float(np.mean(self._signatures[i] == self._signatures[j]))
+
+    def candidate_pairs(self) -> set:
+        pairs = set()
+        for bucket in self._buckets:
+            for members in bucket.values():
+                for x in range(len(members)):
+                    for y in range(x + 1, len(members)):
+                        pairs.add((members[x], members[y]))
+        return pairs
+
+    def groups(self) -> List[List[int]]:
+        """
+        Группирует добавленные тексты в кластеры почти-дубликатов.
+        Кандидаты из общих корзин проверяются по оценке Жаккара.
+
+        :return: Список групп индексов, каждая упорядочена по возрастанию.
+        """
+        parent = list(range(len(self._signatures)))
+
+        def find(x: int) -> int:
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for i, j in self.candidate_pairs():
+            if self.similarity(i, j) >= self.threshold:
+                parent[find(j)] = find(i)
+
+        clusters: Dict[int, List[int]] = defaultdict(list)
+        for i in range(len(parent)):
+            clusters[find(i)].append(i)
+        return sorted(clusters.values(), key=min)
+
+
+def near_duplicate_groups(texts: List[str], **options) -> List[List[int]]:
+    """
+    Находит группы почти-дубликатов среди текстов.
+
+    :param texts: Список текстов.
+    :param options: Параметры MinHashLSH (threshold, num_perm, bands, shingle_size).
+    :return: Список групп индексов.
+    """
+    index = MinHashLSH(**options)
+    for text in texts:
+        index.add(text)
+    return index.groups()
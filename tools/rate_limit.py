@@ -0,0 +1,50 @@
+import asyncio
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Ограничитель скорости по алгоритму token bucket.
+    Используется для лимитов запросов и токенов LLM в минуту и лимитов отправки в Telegram.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.level = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0) -> float:
+        """
+        Ждёт, пока в корзине накопится amount единиц, и списывает их.
+        Запросы обслуживаются по очереди, поэтому крупный запрос не голодает.
+
+        :param amount: Количество единиц (запросов или токенов).
+        :return: Время ожидания в секундах.
+        """
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.level >= amount:
+                    self.level -= amount
+                    return waited
+                delay = (amount - self.level) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+
+    def consume(self, amount: float) -> None:
+        """
+        Списывает единицы без ожидания (уровень может уйти в минус).
+        Нужен для учёта фактического расхода токенов сверх оценки.
+        """
+        self._refill()
+        self.level -= amount
@@ -0,0 +1,107 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Iterable, List
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from data_models import NewsItem
+
+# Параметры трекинга, которые не влияют на содержимое страницы
+TRACKING_PARAMS = ("utm_", "at_", "fbclid", "gclid", "ocid", "cmpid")
+
+
+def normalize_url(url: str) -> str:
+    """
+    Приводит URL к каноническому виду: нижний регистр схемы и хоста,
+    без фрагмента, параметров трекинга и завершающего слэша.
+    """
+    parts = urlsplit(str(url).strip())
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(TRACKING_PARAMS)
+    ))
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, query, ""))
+
+
+def content_hash(item: NewsItem) -> str:
+    """
+    Хеш содержимого новости: меняется при правке заголовка или описания.
+    """
+    return hashlib.sha1(f"{item.title}\n{item.description}".encode("utf-8")).hexdigest()
+
+
+class SeenStore:
+    """
+    Постоянный индекс уже обработанных новостей на SQLite.
+    Ключ — нормализованный URL, значение — хеш содержимого.
+    Записи старше ttl_days удаляются при каждом сохранении.
+    """
+
+    def __init__(self, path: str = "seen_items.sqlite3", ttl_days: float = 7.0):
+        self.path = path
+        self.ttl_days = ttl_days
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen ("
+            " url TEXT PRIMARY KEY,"
+            " content_hash TEXT NOT NULL,"
+            " last_seen REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS seen_last_seen ON seen (last_seen)")
+        self._conn.commit()
+
+    def filter_unseen(self, items: List[NewsItem]) -> List[NewsItem]:
+        """
+        Возвращает только новые или изменившиеся новости.
+
+        :param items: Список собранных новостей.
+        :return: Новости, которых нет в индексе или чьё содержимое изменилось.
+        """
+        if not items:
+            return []
+        keys = [normalize_url(item.url) for item in items]
+        known = {}
+        with self._lock:
+            # SQLite ограничивает число параметров запроса, поэтому идём пачками
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT url, content_hash FROM seen WHERE url IN ({placeholders})", chunk
+                ).fetchall()
+                known.update(rows)
+        return [item for item, key in zip(items, keys) if known.get(key) != content_hash(item)]
+
+    def mark_seen(self, items: Iterable[NewsItem]) -> None:
+        """
+        Отмечает новости как обработанные и удаляет устаревшие записи.
+
+        :param items: Обработанные новости.
+        """
+        now = time.time()
+        rows = [(normalize_url(item.url), content_hash(item), now) for item in items]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO seen (url, content_hash, last_seen) VALUES (?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET content_hash = excluded.content_hash, last_seen = excluded.last_seen",
+                rows,
+            )
+            self._conn.commit()
+        self.evict()
+
+    def evict(self) -> int:
+        """
+        Удаляет записи старше ttl_days.
+
+        :return: Количество удалённых записей.
+        """
+        cutoff = time.time() - self.ttl_days * 86400
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM seen WHERE last_seen < ?", (cutoff,))
+            self._conn.commit()
+        return cursor.rowcount
+
+    def close(self) -> None:
+        self._conn.close()
@@ -0,0 +1,239 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+import numpy as np
+from data_models import NewsItem
+from tools.embeddings import Embedder
+
+
+class VectorIndex:
+    """
+    Постоянный индекс векторов для поиска ближайших соседей.
+    Векторы и метки времени хранятся в memory-mapped .npy-файлах и дописываются инкрементально,
+    метаданные записей — в labels.jsonl. Если установлен faiss, он используется для поиска без фильтра по времени.
+    """
+
+    def __init__(self, directory: str = "vector_index", dim: Optional[int] = None, use_faiss: bool = True):
+        self.directory = directory
+        self.dim = dim
+        self.count = 0
+        self.labels: List[Dict[str, Any]] = []
+        self._vectors: Optional[np.memmap] = None
+        self._timestamps: Optional[np.memmap] = None
+        self._faiss = None
+        self._use_faiss = use_faiss
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _load(self) -> None:
+        meta_path = self._path("meta.json")
+        if not os.path.exists(meta_path):
+            return
+        with open(meta_path, encoding="utf-8") as file:
+            meta = json.load(file)
+        self.dim, self.count = meta["dim"], meta["count"]
+        self._vectors = np.load(self._path("vectors.npy"), mmap_mode="r+")
+        self._timestamps = np.load(self._path("timestamps.npy"), mmap_mode="r+")
+        with open(self._path("labels.jsonl"), encoding="utf-8") as file:
+            lines = file.readlines()
+        if len(lines) > self.count:
+            # Метки, дописанные до сбоя, но не учтённые в meta.json: отрезаем их в файле,
+            # иначе следующие метки дописывались бы после них и разошлись с векторами
+            self._write_atomic("labels.jsonl", "".join(lines[:self.count]))
+        self.labels = [json.loads(line) for line in lines[:self.count]]
+        self._build_faiss()
+
+    def _write_atomic(self, name: str, content: str) -> None:
+        """
+        Записывает файл индекса целиком через временный файл и os.replace.
+        """
+        tmp_path = self._path(name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            file.write(content)
+        os.replace(tmp_path, self._path(name))
+
+    def _build_faiss(self) -> None:
+        if not self._use_faiss or self.dim is None:
+            return
+        try:
+            import faiss
+        except ImportError:
+            return
+        self._faiss = faiss.IndexFlatIP(self.dim)
+        if self.count:
+            self._faiss.add(np.ascontiguousarray(self._vectors[:self.count]))
+
+    def _grow(self, needed: int) -> None:
+        """
+        Увеличивает ёмкость файлов вдвое (или до needed), копируя уже записанные данные.
+        """
+        capacity = 0 if self._vectors is None else len(self._vectors)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2, 1024)
+        vectors = np.lib.format.open_memmap(self._path("vectors.tmp.npy"), mode="w+", dtype=np.float32, shape=(capacity, self.dim))
+        timestamps = np.lib.format.open_memmap(self._path("timestamps.tmp.npy"), mode="w+", dtype=np.float64, shape=(capacity,))
+        if self.count:
+            vectors[:self.count] = self._vectors[:self.count]
+            timestamps[:self.count] = self._timestamps[:self.count]
+        vectors.flush()
+        timestamps.flush()
+        del vectors, timestamps
+        self._vectors = self._timestamps = None
+        os.replace(self._path("vectors.tmp.npy"), self._path("vectors.npy"))
+        os.replace(self._path("timestamps.tmp.npy"), self._path("timestamps.npy"))
+        self._vectors = np.load(self._path("vectors.npy"), mmap_mode="r+")
+        self._timestamps = np.load(self._path("timestamps.npy"), mmap_mode="r+")
+
+    def add(self, vectors: np.ndarray, labels: List[Dict[str, Any]], timestamps: Optional[List[float]] = None) -> None:
+        """
+        Добавляет векторы в индекс.
+
+        :param vectors: Нормализованные векторы размером (n, dim).
+        :param labels: Метаданные записей (например, заголовок, URL, дата).
+        :param timestamps: Метки времени (unix time); по умолчанию — текущее время.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(vectors) != len(labels):
+            raise ValueError("vectors and labels must have the same length.")
+        if not len(vectors):
+            return
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                self._build_faiss()
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Expected vectors of dimension {self.dim}, got {vectors.shape[1]}.")
+            n = len(vectors)
+            self._grow(self.count + n)
+            self._vectors[self.count:self.count + n] = vectors
+            self._timestamps[self.count:self.count + n] = timestamps if timestamps is not None else time.time()
+            self._vectors.flush()
+            self._timestamps.flush()
+            with open(self._path("labels.jsonl"), "a", encoding="utf-8") as file:
+                for label in labels:
+                    file.write(json.dumps(label, ensure_ascii=False, default=str) + "\n")
+            self.labels.extend(labels)
+            self.count += n
+            # meta.json записывается последним: count подтверждает уже записанные векторы и метки
+            self._write_atomic("meta.json", json.dumps({"dim": self.dim, "count": self.count}))
+            if self._faiss is not None:
+                self._faiss.add(vectors)
+
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int = 5,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Ищет k ближайших записей для каждого запроса в заданном окне времени.
+
+        :param queries: Нормализованные векторы запросов размером (m, dim).
+        :param k: Количество соседей.
+        :param since: Нижняя граница метки времени (unix time).
+        :param until: Верхняя граница метки времени (unix time).
+        :return: Для каждого запроса — список словарей с ключами score, timestamp и label.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if not self.count or not len(queries):
+            return [[] for _ in range(len(queries))]
+        with self._lock:
+            count = self.count
+            if self._faiss is not None and since is None and until is None:
+                scores, indices = self._faiss.search(queries, min(k, count))
+            else:
+                if since is None and until is None:
+                    # Без фильтра перемножаем срез memmap без копирования
+                    candidates = np.arange(count)
+                    similarity = queries @ self._vectors[:count].T
+                else:
+                    timestamps = self._timestamps[:count]
+                    mask = np.ones(count, dtype=bool)
+                    if since is not None:
+                        mask &= timestamps >= since
+                    if until is not None:
+                        mask &= timestamps <= until
+                    candidates = np.flatnonzero(mask)
+                    if not len(candidates):
+                        return [[] for _ in range(len(queries))]
+                    similarity = queries @ self._vectors[candidates].T
+                top = min(k, len(candidates))
+                order = np.argpartition(-similarity, top - 1, axis=1)[:, :top]
+                scores = np.take_along_axis(similarity, order, axis=1)
+                ranking = np.argsort(-scores, axis=1)
+                scores = np.take_along_axis(scores, ranking, axis=1)
+                indices = candidates[np.take_along_axis(order, ranking, axis=1)]
+            return [
+                [
+                    {"score": float(score), "timestamp": float(self._timestamps[index]), "label": self.labels[index]}
+                    for score, index in zip(row_scores, row_indices) if index >= 0
+                ]
+                for row_scores, row_indices in zip(scores, indices)
+            ]
+
+
+class CoverageIndex:
+    """
+    Семантический индекс прошлых публикаций: связывает новости с более ранним освещением
+    и помогает не повторять уже опубликованные истории.
+    """
+
+    def __init__(self, index: Optional[VectorIndex] = None, embedder: Optional[Embedder] = None):
+        self.index = index or VectorIndex()
+        self.embedder = embedder or Embedder()
+
+    @staticmethod
+    def _text(item: NewsItem) -> str:
+        return f"{item.title}. {item.description}"
+
+    async def add(self, items: List[NewsItem]) -> None:
+        """
+        Добавляет опубликованные новости в индекс.
+        """
+        if not items:
+            return
+        vectors = await asyncio.to_thread(self.embedder.encode, [self._text(item) for item in items])
+        labels = [{"title": item.title, "url": str(item.url), "date": item.date.isoformat()} for item in items]
+        await asyncio.to_thread(self.index.add, vectors, labels)
+
+    async def _search(self, items: List[NewsItem], k: int, days: Optional[float]) -> List[List[Dict[str, Any]]]:
+        """
+        Ищет ближайшие опубликованные новости для каждой новости, включая записи с тем же URL.
+        """
+        if not items or not self.index.count:
+            return [[] for _ in items]
+        vectors = await asyncio.to_thread(self.embedder.encode, [self._text(item) for item in items])
+        since = time.time() - days * 86400 if days is not None else None
+        return await asyncio.to_thread(self.index.search, vectors, k, since)
+
+    async def related(self, items: List[NewsItem], k: int = 3, days: Optional[float] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Находит прошлое освещение для каждой новости, исключая записи с тем же URL.
+
+        :param items: Новости.
+        :param k: Количество соседей на новость.
+        :param days: Глубина поиска в днях (None — весь индекс).
+        :return: Для каждой новости — список совпадений (score, timestamp, label).
+        """
+        hits = await self._search(items, k + 1, days)
+        return [
+            [hit for hit in item_hits if hit["label"].get("url") != str(item.url)][:k]
+            for item, item_hits in zip(items, hits)
+        ]
+
+    async def filter_published(self, items: List[NewsItem], days: float = 7.0, threshold: float = 0.9) -> List[NewsItem]:
+        """
+        Убирает новости, почти совпадающие с уже опубликованными за последние days дней.
+        Совпадения с тем же URL учитываются: перепубликованная статья тоже подавляется.
+        """
+        hits = await self._search(items, 1, days)
+        return [item for item, item_hits in zip(items, hits) if not item_hits or item_hits[0]["score"] < threshold]
@@ -0,0 +1,286 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field
+from data_models import NewsItem
+
+
+class Job(BaseModel):
+    """
+    Задание из очереди, захваченное воркером на время аренды.
+    """
+    key: str = Field(..., description="Уникальный ключ задания (например, URL ленты)")
+    payload: Dict[str, Any] = Field(default_factory=dict, description="Параметры задания")
+    lease_token: str = Field(..., description="Токен аренды; продлить или завершить задание может только его владелец")
+    attempts: int = Field(default=1, description="Номер попытки выполнения")
+
+
+class WorkQueue(ABC):
+    """
+    Очередь заданий с арендой: воркер захватывает задание на lease_seconds секунд
+    и продлевает аренду пульсом (heartbeat). Если воркер упал, аренда истекает
+    и задание снова выдаётся другому воркеру. Методы синхронные, как у остальных
+    хранилищ проекта; из асинхронного кода они вызываются через asyncio.to_thread.
+    """
+
+    @abstractmethod
+    def enqueue(self, key: str, payload: Dict[str, Any]) -> bool:
+        """
+        Ставит задание в очередь. Задание, которое уже ждёт или выполняется, не дублируется.
+
+        :return: True, если задание добавлено или поставлено повторно.
+        """
+
+    @abstractmethod
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[Job]:
+        """
+        Захватывает следующее свободное задание или задание с истёкшей арендой.
+
+        :return: Задание или None, если очередь пуста.
+        """
+
+    @abstractmethod
+    def heartbeat(self, job: Job, lease_seconds: float) -> bool:
+        """
+        Продлевает аренду.
+
+        :return: False, если аренда уже истекла и задание передано другому воркеру.
+        """
+
+    @abstractmethod
+    def complete(self, job: Job) -> bool:
+        """
+        Отмечает задание выполненным.
+
+        :return: False, если воркер больше не владеет заданием.
+        """
+
+    @abstractmethod
+    def fail(self, job: Job, error: str) -> bool:
+        """
+        Возвращает задание в очередь или, если попытки исчерпаны, отмечает его проваленным.
+        """
+
+    @abstractmethod
+    def reclaim_expired(self) -> int:
+        """
+        Возвращает в очередь задания с истёкшей арендой.
+
+        :return: Количество возвращённых заданий.
+        """
+
+    @abstractmethod
+    def counts(self) -> Dict[str, int]:
+        """
+        Количество заданий по статусам: pending, leased, done, failed.
+        """
+
+    def is_idle(self) -> bool:
+        """
+        Нет заданий, ожидающих выполнения или выполняющихся.
+        """
+        counts = self.counts()
+        return not counts.get("pending") and not counts.get("leased")
+
+    def close(self) -> None:
+        pass
+
+
+class NewsSink(ABC):
+    """
+    Общий приёмник собранных новостей: воркеры кладут пачки, потребитель их забирает.
+    """
+
+    @abstractmethod
+    def put(self, items: List[NewsItem]) -> None:
+        pass
+
+    @abstractmethod
+    def take(self, limit: int) -> List[NewsItem]:
+        """
+        Забирает (и удаляет) до limit новостей в порядке поступления.
+        """
+
+    @abstractmethod
+    def count(self) -> int:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    """
+    Соединение SQLite для совместной работы нескольких процессов:
+    WAL, ожидание блокировки и явное управление транзакциями.
+    """
+    conn = sqlite3.connect(path, timeout=30.0, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """
+    Очередь заданий на SQLite для воркеров на одной машине (или с общим диском).
+    Захват задания выполняется в транзакции BEGIN IMMEDIATE, поэтому одно задание
+    не выдаётся двум воркерам одновременно.
+    """
+
+    def __init__(self, path: str = "work_queue.sqlite3", max_attempts: int = 3):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = _connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " key TEXT PRIMARY KEY,"
+            " payload TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " owner TEXT,"
+            " lease_token TEXT,"
+            " lease_expires REAL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " last_error TEXT,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, lease_expires)")
+
+    def enqueue(self, key: str, payload: Dict[str, Any]) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (key, payload, status, attempts, updated_at) VALUES (?, ?, 'pending', 0, ?)"
+                " ON CONFLICT (key) DO UPDATE SET payload = excluded.payload, status = 'pending',"
+                " owner = NULL, lease_token = NULL, lease_expires = NULL, attempts = 0, updated_at = excluded.updated_at"
+                " WHERE jobs.status IN ('done', 'failed')",
+                (key, json.dumps(payload), time.time()),
+            )
+            return cursor.rowcount > 0
+
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[Job]:
+        now = time.time()
+        token = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                while True:
+                    row = self._conn.execute(
+                        "SELECT key, payload, attempts FROM jobs"
+                        " WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?)"
+                        " ORDER BY updated_at LIMIT 1",
+                        (now,),
+                    ).fetchone()
+                    if row is None:
+                        self._conn.execute("COMMIT")
+                        return None
+                    key, payload, attempts = row
+                    if attempts < self.max_attempts:
+                        break
+                    # Задание, на котором воркеры раз за разом падают, больше не выдаётся
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'failed', owner = NULL, lease_token = NULL, lease_expires = NULL,"
+                        " last_error = 'lease expired', updated_at = ? WHERE key = ?",
+                        (now, key),
+                    )
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'leased', owner = ?, lease_token = ?, lease_expires = ?,"
+                    " attempts = attempts + 1, updated_at = ? WHERE key = ?",
+                    (worker_id, token, now + lease_seconds, now, key),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return Job(key=key, payload=json.loads(payload), lease_token=token, attempts=attempts + 1)
+
+    def heartbeat(self, job: Job, lease_seconds: float) -> bool:
+        return self._update_owned(job, "lease_expires = ?", (time.time() + lease_seconds,))
+
+    def complete(self, job: Job) -> bool:
+        return self._update_owned(job, "status = 'done', lease_token = NULL, lease_expires = NULL", ())
+
+    def fail(self, job: Job, error: str) -> bool:
+        status = "failed" if job.attempts >= self.max_attempts else "pending"
+        return self._update_owned(
+            job,
+            "status = ?, owner = NULL, lease_token = NULL, lease_expires = NULL, last_error = ?",
+            (status, error),
+        )
+
+    def reclaim_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'pending', owner = NULL, lease_token = NULL, lease_expires = NULL,"
+                " updated_at = ? WHERE status = 'leased' AND lease_expires < ?",
+                (now, now),
+            )
+            return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _update_owned(self, job: Job, assignments: str, params: tuple) -> bool:
+        """
+        Обновляет задание, только если аренда всё ещё принадлежит этому воркеру.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE jobs SET {assignments}, updated_at = ?"
+                " WHERE key = ? AND lease_token = ? AND status = 'leased'",
+                (*params, time.time(), job.key, job.lease_token),
+            )
+            return cursor.rowcount == 1
+
+
+class SQLiteNewsSink(NewsSink):
+    """
+    Приёмник новостей на SQLite: новости хранятся в JSON до тех пор, пока их не заберёт потребитель.
+    """
+
+    def __init__(self, path: str = "news_sink.sqlite3"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = _connect(path)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS items (id INTEGER PRIMARY KEY AUTOINCREMENT, data TEXT NOT NULL)")
+
+    def put(self, items: List[NewsItem]) -> None:
+        if not items:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany("INSERT INTO items (data) VALUES (?)", [(item.model_dump_json(),) for item in items])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def take(self, limit: int) -> List[NewsItem]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute("SELECT id, data FROM items ORDER BY id LIMIT ?", (limit,)).fetchall()
+                if rows:
+                    self._conn.execute("DELETE FROM items WHERE id <= ?", (rows[-1][0],))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [NewsItem.model_validate_json(data) for _, data in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()